@@ -1,17 +1,91 @@
 """Main file with FastAPI setup."""
+import asyncio
+import os
+
 import uvicorn
 from fastapi import FastAPI
 from api.src.db import database
-from api.src.db.models import Base
-from api.src.routers import game_router, player_router, default_router
+from api.src.db.migrations import bootstrap, check
+from api.src.engine.solver import get_solver
+from api.src.routers import game_router, player_router, default_router, metrics_router, stats_router, \
+    matchmaking_router
+from api.src.services.archive_service import game_archiver
+from api.src.services.events import broker
+from api.src.services.idempotency import idempotency_store
+from api.src.services.matchmaking import matchmaker
+from api.src.services.metrics import MetricsMiddleware
 
 app = FastAPI(title='Tic-Tac-Toe')
 
 app.include_router(game_router.router)
 app.include_router(player_router.router)
 app.include_router(default_router.router)
-Base.metadata.drop_all(bind=database.engine)
-Base.metadata.create_all(bind=database.engine)
+app.include_router(stats_router.router)
+app.include_router(matchmaking_router.router)
+app.include_router(metrics_router.router)
+app.add_middleware(MetricsMiddleware, routes=lambda: app.routes)
+
+# migrate applies missing migrations, check fails on an outdated schema, skip leaves it to `python -m api.migrate`
+SCHEMA_BOOTSTRAP = os.getenv('SCHEMA_BOOTSTRAP', 'migrate')
+SCHEMA_BOOTSTRAP_MODES = ('migrate', 'check', 'skip')
+
+
+@app.on_event('startup')
+def bootstrap_schema():
+    if SCHEMA_BOOTSTRAP == 'migrate':
+        bootstrap(database.engine)
+    elif SCHEMA_BOOTSTRAP == 'check':
+        check(database.engine)
+    elif SCHEMA_BOOTSTRAP != 'skip':
+        raise RuntimeError('Unknown SCHEMA_BOOTSTRAP {!r}, expected one of {}'.format(
+            SCHEMA_BOOTSTRAP, ', '.join(SCHEMA_BOOTSTRAP_MODES)))
+
+
+@app.on_event('startup')
+async def build_solver():
+    # The table is only needed by the solver endpoints, build it without delaying the first request
+    asyncio.get_event_loop().run_in_executor(None, get_solver)
+
+
+@app.on_event('startup')
+async def start_events_broker():
+    await broker.start()
+
+
+@app.on_event('shutdown')
+async def stop_events_broker():
+    await broker.stop()
+
+
+@app.on_event('startup')
+async def start_matchmaker():
+    await matchmaker.start()
+
+
+@app.on_event('shutdown')
+async def stop_matchmaker():
+    await matchmaker.stop()
+
+
+@app.on_event('startup')
+async def start_idempotency_store():
+    await idempotency_store.start()
+
+
+@app.on_event('shutdown')
+async def stop_idempotency_store():
+    await idempotency_store.stop()
+
+
+@app.on_event('startup')
+async def start_game_archiver():
+    await game_archiver.start()
+
+
+@app.on_event('shutdown')
+async def stop_game_archiver():
+    await game_archiver.stop()
+
 
 if __name__ == "__main__":
     uvicorn.run('app:app', host="0.0.0.0", port=8000, reload=True)
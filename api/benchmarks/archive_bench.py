@@ -0,0 +1,109 @@
+"""
+Latency of the active-game queries as the history of finished games grows, with every finished game in the game
+table and after the archiver moved them to the archive tables.
+Run it from the repository root: `python -m api.benchmarks.archive_bench [games]`
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from api.benchmarks.common import api_client, percentile, use_sqlite
+
+use_sqlite('archive')
+
+from api.app import app  # noqa: E402
+from api.src.db import database  # noqa: E402
+from api.src.db.models import GameArchiveDB, GameDB, PlayDB, PlayerDB, player_game  # noqa: E402
+from api.src.services.archive_service import game_archiver  # noqa: E402
+from api.src.services.game_cache import game_cache  # noqa: E402
+from api.src.services.game_snapshots import game_snapshots  # noqa: E402
+
+BATCH = 10000
+ACTIVE = 50
+REQUESTS = 200
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+def seed(games: int):
+    """
+    Stores finished games between two players, with their plays, after the games already stored
+    :param games: games to store
+    """
+    with database.engine.begin() as connection:
+        first_id = 1 + max(connection.execute(select(func.coalesce(func.max(table.id), 0))).scalar()
+                           for table in (GameDB, GameArchiveDB))
+        if not connection.execute(select(PlayerDB.id).where(PlayerDB.id == 1)).first():
+            connection.execute(PlayerDB.__table__.insert(), [{'id': 1, 'name': 'a', 'symbol': 'X'},
+                                                             {'id': 2, 'name': 'b', 'symbol': 'O'}])
+        for start in range(first_id, first_id + games, BATCH):
+            ids = range(start, min(start + BATCH, first_id + games))
+            connection.execute(GameDB.__table__.insert(), [
+                {'id': game_id, 'movements_played': 5, 'next_turn': 'b', 'board': 'XXXOO----', 'rows': 3,
+                 'columns': 3, 'win_length': 3, 'winner': 'a', 'finished': True, 'version': 6} for game_id in ids])
+            connection.execute(player_game.insert(), [{'game_id': game_id, 'player_id': player_id}
+                                                      for game_id in ids for player_id in (1, 2)])
+            connection.execute(PlayDB.__table__.insert(), [
+                {'game_id': game_id, 'player_id': 1 + turn % 2, 'row': row, 'column': column}
+                for game_id in ids for turn, (row, column) in enumerate(MOVES)])
+
+
+async def _active_games(client, round_: int) -> list:
+    games = []
+    for number in range(ACTIVE):
+        players = ['{}c{}'.format(round_, number), '{}d{}'.format(round_, number)]
+        response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+        games.append((response.json()['id'], players))
+    return games
+
+
+async def _measure(client, games: list) -> dict:
+    """
+    Times the queries on active games: list of unfinished games, a game without cached copies, and a move
+    """
+    timings = {'unfinished list': [], 'game': [], 'move': []}
+    for request in range(REQUESTS):
+        game_id, players = games[request % len(games)]
+        started = time.perf_counter()
+        await client.get('/game/all', params={'finished': False, 'limit': ACTIVE})
+        timings['unfinished list'].append(time.perf_counter() - started)
+
+        game_cache.clear()
+        game_snapshots.clear()
+        started = time.perf_counter()
+        await client.get('/game/{}'.format(game_id))
+        timings['game'].append(time.perf_counter() - started)
+
+    for turn, (row, column) in enumerate(MOVES[:4]):
+        for game_id, players in games:
+            started = time.perf_counter()
+            move = {'game_id': game_id, 'row': row, 'column': column, 'player_name': players[turn % 2]}
+            response = await client.post('/game/submit-play', json=move)
+            timings['move'].append(time.perf_counter() - started)
+            assert response.status_code == 201, response.text
+    return {name: (percentile(values, 50) * 1000, percentile(values, 99) * 1000) for name, values in timings.items()}
+
+
+def _print(history: int, label: str, result: dict):
+    print('{:>7} finished games {:<9} '.format(history, label) + '  '.join(
+        '{} p50 {:.2f} ms p99 {:.2f} ms'.format(name, *latencies) for name, latencies in result.items()))
+
+
+async def main(games: int = 100000):
+    async with api_client(app) as client:
+        seeded = 0
+        for round_, history in enumerate((0, games // 5, games)):
+            seed(history - seeded)
+            seeded = history
+            _print(history, 'in table', await _measure(client, await _active_games(client, round_)))
+            started = time.perf_counter()
+            archived = await game_archiver.run_once()
+            print('archived {archived} games in {seconds:.2f}s'.format(seconds=time.perf_counter() - started,
+                                                                       **archived))
+            _print(history, 'archived', await _measure(client, await _active_games(client, round_ + 10)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*map(int, sys.argv[1:])))
@@ -0,0 +1,89 @@
+"""
+Microbenchmark of a full move (validate, play, check winner, store) with the JSON board path
+replaced by the bitboard engine, and of last-move against whole-board win detection on large boards.
+Run it from the repository root: `python -m api.benchmarks.board_bench`
+"""
+import json
+import random
+import timeit
+
+from api.src.engine.board import Board, MAX_BOARD_SIZE
+
+SYMBOLS = ['X', 'O']
+JSON_BOARD = json.dumps([['X', 'O', None], [None, 'X', None], ['O', None, None]])
+BOARD = 'XO--X-O--'
+ROW, COLUMN = 3, 3
+
+
+def _flatten(nested_list: list) -> list:
+    return [item for sublist in nested_list for item in sublist]
+
+
+def json_move() -> str:
+    """Previous GameService path: three loads, one dump and a scan of every line for each player"""
+    board = json.loads(JSON_BOARD)
+    if board[ROW - 1][COLUMN - 1] is not None:
+        raise ValueError
+    board = json.loads(JSON_BOARD)
+    board[ROW - 1][COLUMN - 1] = 'X'
+    stored = json.dumps(board)
+    flatboard = _flatten(json.loads(stored))
+    for symbol in SYMBOLS:
+        if flatboard[0] == flatboard[1] == flatboard[2] == symbol or \
+                flatboard[0] == flatboard[3] == flatboard[6] == symbol or \
+                flatboard[0] == flatboard[4] == flatboard[8] == symbol or \
+                flatboard[1] == flatboard[4] == flatboard[7] == symbol or \
+                flatboard[2] == flatboard[4] == flatboard[6] == symbol or \
+                flatboard[2] == flatboard[5] == flatboard[8] == symbol or \
+                flatboard[3] == flatboard[4] == flatboard[5] == symbol or \
+                flatboard[6] == flatboard[7] == flatboard[8] == symbol:
+            break
+    return stored
+
+
+def bitboard_move() -> str:
+    """Engine path: one decode, mask checks and one encode"""
+    board = Board.decode(BOARD, SYMBOLS)
+    if not board.is_free(ROW, COLUMN):
+        raise ValueError
+    board.play(0, ROW, COLUMN)
+    board.is_winning_move(0, ROW, COLUMN)
+    return board.encode(SYMBOLS)
+
+
+def bitboard_rules() -> bool:
+    """Engine rules only, without the persistence boundary"""
+    board = Board([0b000010001, 0b001000010])
+    board.is_free(ROW, COLUMN)
+    board.play(0, ROW, COLUMN)
+    return board.is_winning_move(0, ROW, COLUMN)
+
+
+def _large_board(moves: int = 150) -> Board:
+    """Random 19x19, 5 in a row position"""
+    generator = random.Random(0)
+    cells = [(row, column) for row in range(1, MAX_BOARD_SIZE + 1) for column in range(1, MAX_BOARD_SIZE + 1)]
+    board = Board(rows=MAX_BOARD_SIZE, columns=MAX_BOARD_SIZE, win_length=5)
+    for turn, (row, column) in enumerate(generator.sample(cells, moves)):
+        board.play(turn % 2, row, column)
+    return board
+
+
+def main(number: int = 100000):
+    print('3x3 move')
+    for name, function in (('json', json_move), ('bitboard', bitboard_move), ('bitboard rules', bitboard_rules)):
+        elapsed = min(timeit.repeat(function, number=number, repeat=5))
+        print('  {:<15} {:>8.3f} us/move'.format(name, elapsed / number * 1e6))
+
+    board = _large_board()
+    stored = board.encode(SYMBOLS)
+    print('19x19, 5 in a row win check')
+    for name, function in (('whole board', lambda: board.is_winner(0)),
+                           ('last move', lambda: board.is_winning_move(0, 10, 10)),
+                           ('decode+encode', lambda: Board.decode(stored, SYMBOLS, 19, 19, 5).encode(SYMBOLS))):
+        elapsed = min(timeit.repeat(function, number=number // 10, repeat=5))
+        print('  {:<15} {:>8.3f} us/move'.format(name, elapsed / (number // 10) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
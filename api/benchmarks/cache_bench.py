@@ -0,0 +1,54 @@
+"""
+SQL statements per move with and without the hot-game cache, playing complete games through GameService.
+Run it from the repository root: `python -m api.benchmarks.cache_bench`
+"""
+import time
+
+from sqlalchemy import event
+
+from api.benchmarks.common import use_sqlite
+
+use_sqlite('cache')
+
+from api.src.db import database  # noqa: E402
+from api.src.db.models import Base  # noqa: E402
+from api.src.entities.requests import GameRequest, SubmitPlay  # noqa: E402
+from api.src.entities.schemas import Player  # noqa: E402
+from api.src.services.game_cache import game_cache  # noqa: E402
+from api.src.services.game_service import GameService  # noqa: E402
+
+GAMES = 200
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (3, 3), (3, 1), (1, 3))
+
+
+def _play() -> float:
+    started = time.perf_counter()
+    for number in range(GAMES):
+        players = ['a{}'.format(number), 'b{}'.format(number)]
+        with database.SessionLocal() as db:
+            game = GameService(db).begin_game(GameRequest(players=[Player(name=name) for name in players]))
+            game_id = game.id
+        for turn, (row, column) in enumerate(MOVES):
+            with database.SessionLocal() as db:
+                GameService(db).submit_play(SubmitPlay(game_id=game_id, player_name=players[turn % 2],
+                                                       row=row, column=column))
+    return time.perf_counter() - started
+
+
+def main():
+    Base.metadata.create_all(bind=database.engine)
+    statements = []
+    event.listen(database.engine, 'before_cursor_execute', lambda *args: statements.append(1))
+    for name, cache_size in (('no cache', 0), ('cache', 10000)):
+        game_cache.max_size = cache_size
+        game_cache.clear()
+        del statements[:]
+        elapsed = _play()
+        moves = GAMES * len(MOVES)
+        print('{:<9} {:>6.2f} statements/move (including game creation) {:>8.1f} moves/s'.format(
+            name, len(statements) / moves, moves / elapsed))
+    print(game_cache.stats())
+
+
+if __name__ == '__main__':
+    main()
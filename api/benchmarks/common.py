@@ -0,0 +1,54 @@
+"""Helpers shared by the benchmarks that run the app in-process against a local SQLite database."""
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+
+def use_sqlite(name: str = 'benchmark') -> str:
+    """
+    Points the app to a fresh SQLite file unless DATABASE_URL and ASYNC_DATABASE_URL are already set.
+    Must be called before importing the app.
+    :param name: database file name
+    :return: sync database url
+    """
+    path = os.path.join(tempfile.mkdtemp(), '{}.db'.format(name))
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///{}'.format(path))
+    os.environ.setdefault('ASYNC_DATABASE_URL', 'sqlite+aiosqlite:///{}'.format(path))
+    return os.environ['DATABASE_URL']
+
+
+@asynccontextmanager
+async def api_client(app) -> AsyncIterator:
+    """
+    HTTP client calling the app in-process. The client does not run startup handlers, so the schema is
+    bootstrapped here, and the async engine is disposed on exit so no driver threads outlive the benchmark
+    :param app: ASGI app
+    :return: httpx async client
+    """
+    import httpx
+
+    from api.src.db import database
+    from api.src.db.migrations import bootstrap
+
+    bootstrap(database.engine)
+    try:
+        async with httpx.AsyncClient(app=app, base_url='http://benchmark') as client:
+            yield client
+    finally:
+        await database.async_engine.dispose()
+        if database.async_read_engine:
+            await database.async_read_engine.dispose()
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Returns the nearest-rank percentile of a list of values
+    :param values: measured values
+    :param percent: percentile between 0 and 100
+    :return: percentile value
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))]
@@ -0,0 +1,59 @@
+"""
+Throughput of GET /game/{game_id} and POST /game/submit-play with an increasing number of concurrent clients,
+with service calls running in the service thread pool.
+Run it from the repository root: `python -m api.benchmarks.concurrency_bench`
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import asyncio
+import time
+
+from api.benchmarks.common import api_client, use_sqlite
+
+use_sqlite('concurrency')
+
+from api.app import app  # noqa: E402
+
+CONCURRENCY = (1, 2, 4, 8, 16, 32)
+SECONDS = 3.0
+
+
+async def _new_game(client, number: int) -> int:
+    response = await client.post('/game/new', json={'players': [{'name': 'a{}'.format(number)},
+                                                                {'name': 'b{}'.format(number)}]})
+    return response.json()['id']
+
+
+async def _reader(client, game_id: int, deadline: float) -> int:
+    requests = 0
+    while time.perf_counter() < deadline:
+        await client.get('/game/{}'.format(game_id))
+        requests += 1
+    return requests
+
+
+async def _player(client, number: int, deadline: float) -> int:
+    requests = 0
+    while time.perf_counter() < deadline:
+        game_id = await _new_game(client, number)
+        requests += 1
+        for turn, (row, column) in enumerate(((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))):
+            name = '{}{}'.format('ab'[turn % 2], number)
+            await client.post('/game/submit-play', json={'game_id': game_id, 'player_name': name,
+                                                         'row': row, 'column': column})
+            requests += 1
+    return requests
+
+
+async def main():
+    async with api_client(app) as client:
+        game_id = await _new_game(client, 0)
+        for name, scenario in (('read', lambda number, deadline: _reader(client, game_id, deadline)),
+                               ('play', lambda number, deadline: _player(client, number, deadline))):
+            for concurrency in CONCURRENCY:
+                deadline = time.perf_counter() + SECONDS
+                requests = await asyncio.gather(*(scenario(number, deadline) for number in range(concurrency)))
+                print('{:<5} clients={:<3} {:>8.1f} req/s'.format(name, concurrency, sum(requests) / SECONDS))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
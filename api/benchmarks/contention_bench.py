@@ -0,0 +1,52 @@
+"""
+Stress of concurrent plays against the same game. Every round, CLIENTS clients send the same player's move at
+once: exactly one must be stored, the rest rejected by the turn validation (406) or as a conflict (409), and
+movements_played must always match the stored plays.
+Run it from the repository root: `python -m api.benchmarks.contention_bench`
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import asyncio
+import time
+from collections import Counter
+
+from api.benchmarks.common import api_client, use_sqlite
+
+use_sqlite('contention')
+
+from api.app import app  # noqa: E402
+
+CLIENTS = 16
+GAMES = 20
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (3, 3), (3, 1), (1, 3))
+
+
+async def _play_game(client, number: int, statuses: Counter) -> bool:
+    players = ['a{}'.format(number), 'b{}'.format(number)]
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    game_id = response.json()['id']
+    for turn, (row, column) in enumerate(MOVES):
+        move = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        responses = await asyncio.gather(*(client.post('/game/submit-play', json=move) for _ in range(CLIENTS)))
+        codes = Counter(response.status_code for response in responses)
+        statuses.update(codes)
+        if codes[201] != 1:
+            return False
+
+    game = (await client.get('/game/{}'.format(game_id))).json()
+    movements = (await client.get('/game/movements/{}'.format(game_id))).json()
+    return game['movements_played'] == len(movements) == len(MOVES)
+
+
+async def main():
+    statuses = Counter()
+    started = time.perf_counter()
+    async with api_client(app) as client:
+        consistent = await asyncio.gather(*(_play_game(client, number, statuses) for number in range(GAMES)))
+    elapsed = time.perf_counter() - started
+    print('games={} clients/move={} elapsed={:.2f}s'.format(GAMES, CLIENTS, elapsed))
+    print('status codes: {}'.format(dict(statuses)))
+    print('consistent games: {}/{}'.format(sum(consistent), GAMES))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
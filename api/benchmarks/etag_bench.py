@@ -0,0 +1,69 @@
+"""
+Polling hot path of GET /game/{game_id}: latency and SQL statements per request for in-progress and finished
+games, serializing every response, serving the cached body, and answering If-None-Match with 304.
+Run it from the repository root: `python -m api.benchmarks.etag_bench`
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import asyncio
+import time
+
+from api.benchmarks.common import api_client, percentile, use_sqlite
+
+use_sqlite('etag')
+
+from api.app import app  # noqa: E402
+from api.src.db.instrumentation import count_queries  # noqa: E402
+from api.src.services.game_snapshots import game_snapshots  # noqa: E402
+
+GAMES = 50
+POLLS = 20
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+async def _seed(client, finished: bool) -> list:
+    game_ids = []
+    for number in range(GAMES):
+        players = ['{}a{}'.format(finished, number), '{}b{}'.format(finished, number)]
+        response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+        game_ids.append(response.json()['id'])
+        for turn, (row, column) in enumerate(MOVES if finished else MOVES[:2]):
+            await client.post('/game/submit-play', json={'game_id': game_ids[-1], 'player_name': players[turn % 2],
+                                                         'row': row, 'column': column})
+    return game_ids
+
+
+async def _poll(client, game_ids: list, mode: str) -> dict:
+    latencies = []
+    statements = 0
+    etags = {game_id: (await client.get('/game/{}'.format(game_id))).headers['ETag'] for game_id in game_ids}
+    for _ in range(POLLS):
+        for game_id in game_ids:
+            if mode == 'serialize':
+                game_snapshots.clear()
+            headers = {'If-None-Match': etags[game_id]} if mode == 'if-none-match' else {}
+            with count_queries() as queries:
+                started = time.perf_counter()
+                response = await client.get('/game/{}'.format(game_id), headers=headers)
+                latencies.append(time.perf_counter() - started)
+            statements += len(queries)
+            assert response.status_code == (304 if mode == 'if-none-match' else 200), response.status_code
+    return {'mode': mode,
+            'statements': statements / len(latencies),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'requests_per_second': len(latencies) / sum(latencies)}
+
+
+async def main():
+    async with api_client(app) as client:
+        for finished in (False, True):
+            game_ids = await _seed(client, finished)
+            for mode in ('serialize', 'cached body', 'if-none-match'):
+                result = await _poll(client, game_ids, mode)
+                print('{:<12} {mode:<14} {statements:.2f} statements/request  p50 {p50_ms:.3f} ms  '
+                      'p99 {p99_ms:.3f} ms  {requests_per_second:>7.0f} requests/s'.format(
+                          'finished' if finished else 'in progress', **result))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
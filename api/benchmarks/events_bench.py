@@ -0,0 +1,73 @@
+"""
+Fan-out of game events to thousands of idle subscribers: memory per subscriber and latency from publish
+until the last subscriber receives the event, with the in-process broker.
+Run it from the repository root: `python -m api.benchmarks.events_bench`
+"""
+import asyncio
+import time
+import tracemalloc
+
+from api.benchmarks.common import percentile, use_sqlite
+
+use_sqlite('events')
+
+from api.src.entities.responses import GameEvent  # noqa: E402
+from api.src.services.events import GameEvents, MemoryBroker  # noqa: E402
+
+SUBSCRIBERS = (100, 1000, 10000)
+GAMES = 100
+EVENTS = 50
+
+
+async def _fan_out(subscribers: int) -> dict:
+    events = GameEvents()
+    broker = MemoryBroker(events)
+    tracemalloc.start()
+    queues = [events.subscribe(number % GAMES) for number in range(subscribers)]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    received = [0]
+    delivered = asyncio.Event()
+    per_game = [len([queue for number, queue in enumerate(queues) if number % GAMES == game]) for game in range(GAMES)]
+
+    async def consume(queue: asyncio.Queue, expected: int):
+        await queue.get()
+        received[0] += 1
+        if received[0] == expected:
+            delivered.set()
+
+    latencies = []
+    for number in range(EVENTS):
+        game_id = number % GAMES
+        received[0] = 0
+        delivered.clear()
+        consumers = [asyncio.ensure_future(consume(queue, per_game[game_id]))
+                     for index, queue in enumerate(queues) if index % GAMES == game_id]
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        await broker.publish(GameEvent(game_id=game_id, board='X--------', movements_played=1, next_turn='b',
+                                       winner=None, finished=False))
+        await delivered.wait()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.gather(*consumers)
+
+    return {'subscribers': events.subscribers(),
+            'bytes_per_subscriber': memory // subscribers,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000}
+
+
+async def _main():
+    for subscribers in SUBSCRIBERS:
+        result = await _fan_out(subscribers)
+        print('{subscribers:>6} subscribers  {bytes_per_subscriber:>5} bytes/subscriber  '
+              'fan-out p50 {p50_ms:.3f} ms  p99 {p99_ms:.3f} ms'.format(**result))
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
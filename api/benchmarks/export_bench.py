@@ -0,0 +1,63 @@
+"""
+Throughput and peak memory of GET /game/export over a large synthetic dataset of finished games with their plays.
+Run it from the repository root: `python -m api.benchmarks.export_bench [games]`
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import asyncio
+import resource
+import sys
+import time
+
+from api.benchmarks.common import api_client, use_sqlite
+
+use_sqlite('export')
+
+from api.app import app  # noqa: E402
+from api.src.db import database  # noqa: E402
+from api.src.db.migrations import bootstrap  # noqa: E402
+from api.src.db.models import GameDB, PlayDB, PlayerDB, player_game  # noqa: E402
+
+BATCH = 10000
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+def seed(games: int):
+    """
+    Stores finished games between two players, with their plays
+    :param games: games to store
+    """
+    bootstrap(database.engine)
+    with database.engine.begin() as connection:
+        connection.execute(PlayerDB.__table__.insert(), [{'id': 1, 'name': 'a', 'symbol': 'X'},
+                                                         {'id': 2, 'name': 'b', 'symbol': 'O'}])
+        for start in range(1, games + 1, BATCH):
+            ids = range(start, min(start + BATCH, games + 1))
+            connection.execute(GameDB.__table__.insert(), [
+                {'id': game_id, 'movements_played': 5, 'next_turn': 'b', 'board': 'XXXOO----', 'rows': 3,
+                 'columns': 3, 'win_length': 3, 'winner': 'a', 'finished': True, 'version': 6} for game_id in ids])
+            connection.execute(player_game.insert(), [{'game_id': game_id, 'player_id': player_id}
+                                                      for game_id in ids for player_id in (1, 2)])
+            connection.execute(PlayDB.__table__.insert(), [
+                {'game_id': game_id, 'player_id': 1 + turn % 2, 'row': row, 'column': column}
+                for game_id in ids for turn, (row, column) in enumerate(MOVES)])
+
+
+async def main(games: int = 1000000):
+    started = time.perf_counter()
+    seed(games)
+    print('seeded {} games in {:.1f}s, peak RSS {} MB'.format(
+        games, time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+    exported = 0
+    started = time.perf_counter()
+    async with api_client(app) as client:
+        async with client.stream('GET', '/game/export', params={'finished': True}) as response:
+            async for _ in response.aiter_lines():
+                exported += 1
+    elapsed = time.perf_counter() - started
+    print('exported {} games in {:.1f}s: {:.0f} games/s, peak RSS {} MB'.format(
+        exported, elapsed, exported / elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*(int(argument) for argument in sys.argv[1:])))
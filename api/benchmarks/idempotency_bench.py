@@ -0,0 +1,86 @@
+"""
+Retry storm: players create games and play complete matches while every POST /game/new and /game/submit-play is
+sent several times, as clients retrying on timeouts do. Half of the retries go out while the first request is
+still running and the rest after it answered. Compares runs without and with Idempotency-Key: games created,
+status codes, SQL statements and latency.
+Run it from the repository root: `python -m api.benchmarks.idempotency_bench`
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import asyncio
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional
+
+from api.benchmarks.common import api_client, percentile, use_sqlite
+
+use_sqlite('idempotency')
+
+from api.app import app  # noqa: E402
+from api.src.db.instrumentation import count_queries  # noqa: E402
+from api.src.services.idempotency import IDEMPOTENCY_KEY_HEADER  # noqa: E402
+
+PLAYERS = 20
+RETRIES = 4
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+async def _send(client, url: str, body: dict, with_keys: bool, statuses: Counter, latencies: List[float]):
+    """
+    Sends a request with its retries and returns the first successful response
+    """
+    headers = {IDEMPOTENCY_KEY_HEADER: uuid.uuid4().hex} if with_keys else {}
+
+    async def attempt():
+        started = time.perf_counter()
+        response = await client.post(url, json=body, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+        return response
+
+    concurrent = await asyncio.gather(*(attempt() for _ in range(1 + RETRIES // 2)))
+    later = [await attempt() for _ in range(RETRIES - RETRIES // 2)]
+    return next((response for response in concurrent + later if response.status_code == 201), None)
+
+
+async def _match(client, number: int, with_keys: bool, statuses: Counter, latencies: List[float]) -> Optional[int]:
+    players = ['{}a{}'.format(with_keys, number), '{}b{}'.format(with_keys, number)]
+    response = await _send(client, '/game/new', {'players': [{'name': name} for name in players]}, with_keys,
+                           statuses, latencies)
+    game_id = response.json()['id']
+    for turn, (row, column) in enumerate(MOVES):
+        await _send(client, '/game/submit-play', {'game_id': game_id, 'player_name': players[turn % 2],
+                                                  'row': row, 'column': column}, with_keys, statuses, latencies)
+    return game_id
+
+
+async def _storm(client, with_keys: bool) -> dict:
+    statuses = Counter()
+    latencies = []
+    before = len((await client.get('/game/all', params={'limit': 100000})).json())
+    with count_queries() as statements:
+        started = time.perf_counter()
+        await asyncio.gather(*(_match(client, number, with_keys, statuses, latencies) for number in range(PLAYERS)))
+        seconds = time.perf_counter() - started
+    games = len((await client.get('/game/all', params={'limit': 100000})).json()) - before
+    requests = PLAYERS * (1 + len(MOVES))
+    return {'keys': 'Idempotency-Key' if with_keys else 'no key',
+            'games': games,
+            'statuses': dict(sorted(statuses.items())),
+            'statements': len(statements) / requests,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'seconds': seconds}
+
+
+async def main():
+    async with api_client(app) as client:
+        for with_keys in (False, True):
+            result = await _storm(client, with_keys)
+            print('{keys:<16} {games:>3} games for {players} matches  statuses {statuses}  {statements:.1f} statements '
+                  'per logical request  p50 {p50_ms:.2f} ms  p99 {p99_ms:.2f} ms  {seconds:.2f}s'.format(
+                      players=PLAYERS, **result))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
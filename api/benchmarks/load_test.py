@@ -0,0 +1,174 @@
+"""
+End-to-end load test: N concurrent players create games and play complete random matches through /game/new
+and /game/submit-play against the in-process app. Reports throughput, p50/p95/p99 latency and SQL statements
+per request for each route, and saves them as JSON to compare runs.
+Run it from the repository root: `python -m api.benchmarks.load_test --players 16 --games 20 --output run.json`
+and compare with a previous run adding `--baseline previous.json`.
+Needs aiosqlite and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from api.benchmarks.common import api_client, percentile, use_sqlite
+
+use_sqlite('load_test')
+
+from api.app import app  # noqa: E402
+from api.src.db import database  # noqa: E402
+from api.src.db.instrumentation import count_queries  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+
+class Recorder:
+    """Latency, SQL statements and status codes of every request, grouped by route"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statements: Dict[str, List[int]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, route: str, method: str, url: str, **kwargs):
+        """
+        Sends a request recording its latency and SQL statements
+        :param client: app's client
+        :param route: route template the measures are grouped by
+        :param method: HTTP method
+        :param url: request url
+        :return: response
+        """
+        with count_queries() as statements:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - started
+        self.latencies[route].append(elapsed)
+        self.statements[route].append(len(statements))
+        self.statuses[route][response.status_code] += 1
+        return response
+
+    def report(self, seconds: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            statements = self.statements[route]
+            routes[route] = {'requests': len(latencies),
+                             'statuses': dict(self.statuses[route]),
+                             'requests_per_second': round(len(latencies) / seconds, 1),
+                             'latency_ms': {'p{}'.format(p): round(percentile(latencies, p) * 1000, 3)
+                                            for p in PERCENTILES},
+                             'statements': {'mean': round(sum(statements) / len(statements), 2),
+                                            'max': max(statements)}}
+        requests = sum(len(latencies) for latencies in self.latencies.values())
+        return {'seconds': round(seconds, 3),
+                'requests': requests,
+                'requests_per_second': round(requests / seconds, 1) if seconds else None,
+                'routes': routes}
+
+
+async def _play_match(client, recorder: Recorder, generator: random.Random, number: int, poll: bool) -> bool:
+    """
+    Creates a game and plays random legal moves until it ends
+    :return: True if the match was completed
+    """
+    players = ['p{}a'.format(number), 'p{}b'.format(number)]
+    response = await recorder.request(client, 'POST /game/new', 'POST', '/game/new',
+                                      json={'players': [{'name': name} for name in players]})
+    if response.status_code != 201:
+        return False
+    game = response.json()
+    while not game['winner'] and game['movements_played'] < game['rows'] * game['columns']:
+        free = [cell for cell, symbol in enumerate(symbol for row in json.loads(game['board']) for symbol in row)
+                if symbol is None]
+        cell = generator.choice(free)
+        response = await recorder.request(client, 'POST /game/submit-play', 'POST', '/game/submit-play', json={
+            'game_id': game['id'], 'player_name': game['next_turn'],
+            'row': cell // game['columns'] + 1, 'column': cell % game['columns'] + 1})
+        if response.status_code != 201:
+            return False
+        game = response.json()
+        if poll:
+            await recorder.request(client, 'GET /game/{game_id}', 'GET', '/game/{}'.format(game['id']))
+    return True
+
+
+async def _player(client, recorder: Recorder, number: int, games: int, seed: int, poll: bool) -> int:
+    generator = random.Random(seed + number)
+    completed = 0
+    for game in range(games):
+        completed += await _play_match(client, recorder, generator, number * games + game, poll)
+    return completed
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(result: dict, baseline: dict):
+    print('route                          metric        baseline    current     change')
+    for route, current in result['routes'].items():
+        previous = baseline['routes'].get(route)
+        if not previous:
+            continue
+        metrics = [('p{}'.format(p), previous['latency_ms']['p{}'.format(p)], current['latency_ms']['p{}'.format(p)])
+                   for p in PERCENTILES]
+        metrics.append(('statements', previous['statements']['mean'], current['statements']['mean']))
+        for metric, before, after in metrics:
+            change = (after - before) / before * 100 if before else 0.0
+            print('{:<30} {:<12} {:>9.3f} {:>10.3f} {:>+9.1f}%'.format(route, metric, before, after, change))
+
+
+async def run(players: int, games: int, seed: int = 0, poll: bool = False) -> dict:
+    """
+    Runs the load test
+    :param players: concurrent players
+    :param games: games played by each player
+    :param seed: random seed of the moves
+    :param poll: also request the game after every move, like polling clients do
+    :return: report
+    """
+    recorder = Recorder()
+    async with api_client(app) as client:
+        started = time.perf_counter()
+        completed = await asyncio.gather(*(_player(client, recorder, number, games, seed, poll)
+                                           for number in range(players)))
+        seconds = time.perf_counter() - started
+    result = recorder.report(seconds)
+    result.update(completed_games=sum(completed),
+                  settings={'players': players, 'games': games, 'seed': seed, 'poll': poll},
+                  environment={'commit': _git_commit(), 'database': database.engine.dialect.name,
+                               'python': platform.python_version(), 'started': time.time()})
+    return result
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Game API load test')
+    parser.add_argument('--players', type=int, default=16, help='concurrent players')
+    parser.add_argument('--games', type=int, default=20, help='games played by each player')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the moves')
+    parser.add_argument('--poll', action='store_true', help='request the game after every move')
+    parser.add_argument('--output', help='file that receives the JSON report')
+    parser.add_argument('--baseline', help='JSON report of a previous run to compare with')
+    arguments = parser.parse_args(arguments)
+
+    result = asyncio.run(run(arguments.players, arguments.games, arguments.seed, arguments.poll))
+    print(json.dumps(result, indent=2))
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(result, file, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            _compare(result, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Matchmaking pairing throughput: thousands of players with spread ratings and symbol preferences join at once,
+reports pairs per second until 99% of them are matched, leaving out the outliers that wait for their windows
+to widen, and time to match. Games are created in memory to measure the queue alone, then a
+smaller run goes through POST /matchmaking/join and the database.
+Run it from the repository root: `python -m api.benchmarks.matchmaking_bench`
+"""
+import asyncio
+import random
+import time
+from typing import List, Optional, Tuple
+
+from api.benchmarks.common import api_client, percentile, use_sqlite
+
+use_sqlite('matchmaking')
+
+from api.app import app  # noqa: E402
+from api.src.engine.rating import INITIAL_RATING  # noqa: E402
+from api.src.entities.requests import GameRequest, MatchRequest  # noqa: E402
+from api.src.services.matchmaking import Matchmaker  # noqa: E402
+
+WAITERS = (1000, 5000, 20000)
+API_WAITERS = 200
+RATING_SPREAD = 200
+SYMBOLS = (None, None, 'X', 'O')
+
+
+def _players(count: int, seed: int = 0) -> List[Tuple[str, int, Optional[str]]]:
+    generator = random.Random(seed)
+    return [('p{}'.format(number), int(generator.gauss(INITIAL_RATING, RATING_SPREAD)), generator.choice(SYMBOLS))
+            for number in range(count)]
+
+
+async def _in_memory(count: int) -> dict:
+    players = _players(count)
+    ratings = {name: rating for name, rating, _ in players}
+
+    async def begin_game(game_request: GameRequest):
+        return [player.name for player in game_request.players]
+
+    async def get_match_profile(name: str):
+        return ratings[name], None
+
+    matchmaker = Matchmaker(begin_game, get_match_profile)
+    await matchmaker.start()
+    latencies = []
+
+    async def join(name: str, symbol: Optional[str]):
+        started = time.perf_counter()
+        try:
+            await matchmaker.join(MatchRequest(name=name, symbol=symbol, max_wait=30))
+        except Exception:
+            return
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(join(name, symbol) for name, _, symbol in players))
+    await matchmaker.stop()
+    return {'waiters': count, 'matched': matchmaker.matched, 'timeouts': matchmaker.timeouts,
+            'pairs_per_second': 0.99 * len(latencies) / 2 / percentile(latencies, 99),
+            'p50_ms': percentile(latencies, 50) * 1000, 'p99_ms': percentile(latencies, 99) * 1000}
+
+
+async def _through_api(count: int) -> dict:
+    latencies = []
+    statuses = {}
+
+    async def join(client, name: str, symbol: Optional[str]):
+        started = time.perf_counter()
+        response = await client.post('/matchmaking/join', json={'name': name, 'symbol': symbol, 'max_wait': 30})
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with api_client(app) as client:
+        from api.src.services.matchmaking import matchmaker
+        await matchmaker.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(join(client, name, symbol) for name, _, symbol in _players(count)))
+        seconds = time.perf_counter() - started
+        await matchmaker.stop()
+    return {'waiters': count, 'statuses': statuses, 'games_per_second': statuses.get(201, 0) / 2 / seconds,
+            'p50_ms': percentile(latencies, 50) * 1000, 'p99_ms': percentile(latencies, 99) * 1000}
+
+
+async def _main():
+    for count in WAITERS:
+        result = await _in_memory(count)
+        print('{waiters:>6} waiters  {matched:>6} pairs  {timeouts:>4} timeouts  {pairs_per_second:>9.0f} pairs/s  '
+              'time to match p50 {p50_ms:.1f} ms  p99 {p99_ms:.1f} ms'.format(**result))
+    result = await _through_api(API_WAITERS)
+    print('{waiters:>6} waiters through the API  statuses {statuses}  {games_per_second:.0f} games/s  '
+          'time to match p50 {p50_ms:.1f} ms  p99 {p99_ms:.1f} ms'.format(**result))
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
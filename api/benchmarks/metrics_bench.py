@@ -0,0 +1,55 @@
+"""
+Overhead of MetricsMiddleware per request, calling GET /default/ on the ASGI app directly with and without it.
+Run it from the repository root: `python -m api.benchmarks.metrics_bench`
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from api.benchmarks.common import use_sqlite
+
+use_sqlite('metrics')
+
+from api.src.routers import default_router  # noqa: E402
+from api.src.services.metrics import MetricsMiddleware  # noqa: E402
+
+REQUESTS = 20000
+SCOPE = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': '/default/',
+         'raw_path': b'/default/', 'root_path': '', 'query_string': b'', 'headers': [],
+         'client': ('127.0.0.1', 1), 'server': ('benchmark', 80)}
+
+
+def _app(metrics: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(default_router.router)
+    if metrics:
+        app.add_middleware(MetricsMiddleware, routes=lambda: app.routes)
+    return app
+
+
+async def _requests_seconds(app: FastAPI) -> float:
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await app(dict(SCOPE), receive, send)
+    return time.perf_counter() - started
+
+
+async def main():
+    timings = {}
+    for metrics in (False, True) * 5:
+        timings.setdefault(metrics, []).append(await _requests_seconds(_app(metrics)))
+    plain, measured = min(timings[False]) / REQUESTS * 1e6, min(timings[True]) / REQUESTS * 1e6
+    print('without metrics {:>8.2f} us/request'.format(plain))
+    print('with metrics    {:>8.2f} us/request'.format(measured))
+    print('overhead        {:>8.2f} us/request'.format(measured - plain))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Storage size and replay latency of the per-game move log compared with the play table.
+Run it from the repository root: `python -m api.benchmarks.move_log_bench [games]`
+"""
+import random
+import sys
+import time
+
+from sqlalchemy import func, select, text
+
+from api.benchmarks.common import use_sqlite
+
+use_sqlite('move_log')
+
+from api.src.db import database  # noqa: E402
+from api.src.db.models import Base, GameDB, PlayDB  # noqa: E402
+from api.src.engine.board import Board  # noqa: E402
+from api.src.engine.move_log import append_move, replay  # noqa: E402
+
+BATCH = 10000
+CELLS = [(row, column) for row in range(1, 4) for column in range(1, 4)]
+
+
+def _size(connection, table: str) -> int:
+    if connection.dialect.name == 'postgresql':
+        return connection.execute(text("SELECT pg_total_relation_size(:table)"), {'table': table}).scalar()
+    pages = connection.execute(text("PRAGMA page_count")).scalar()
+    return pages * connection.execute(text("PRAGMA page_size")).scalar()
+
+
+def _seed(connection, games: int):
+    generator = random.Random(0)
+    moves = {game_id: generator.sample(CELLS, 9) for game_id in range(1, games + 1)}
+    for start in range(1, games + 1, BATCH):
+        ids = range(start, min(start + BATCH, games + 1))
+        rows = []
+        for game_id in ids:
+            log = b''
+            for row, column in moves[game_id]:
+                log = append_move(log, row, column, 3, 3)
+            rows.append({'id': game_id, 'movements_played': 9, 'next_turn': 'b', 'board': 'XOXOXOXOX', 'rows': 3,
+                         'columns': 3, 'win_length': 3, 'winner': None, 'finished': True, 'version': 10,
+                         'moves': log})
+        connection.execute(GameDB.__table__.insert(), rows)
+    before = _size(connection, 'play')
+    for start in range(1, games + 1, BATCH):
+        connection.execute(PlayDB.__table__.insert(), [
+            {'game_id': game_id, 'player_id': None, 'row': row, 'column': column}
+            for game_id in range(start, min(start + BATCH, games + 1)) for row, column in moves[game_id]])
+    return before
+
+
+def _replay_from_plays(connection, game_id: int, at: int) -> Board:
+    board = Board()
+    plays = connection.execute(select(PlayDB.row, PlayDB.column).where(PlayDB.game_id == game_id)
+                               .order_by(PlayDB.id).limit(at))
+    for turn, (row, column) in enumerate(plays):
+        board.play(turn % 2, row, column)
+    return board
+
+
+def _replay_from_log(connection, game_id: int, at: int) -> Board:
+    moves = connection.execute(select(GameDB.moves).where(GameDB.id == game_id)).scalar()
+    return replay(moves, 0, at, 3, 3, 3)[0]
+
+
+def main(games: int = 200000, samples: int = 5000):
+    Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as connection:
+        before = _seed(connection, games)
+        plays_bytes = _size(connection, 'play') - before
+        log_bytes = connection.execute(select(func.sum(func.length(GameDB.moves)))).scalar()
+        print('play table: {:.1f} bytes/game, move log: {:.1f} bytes/game'.format(plays_bytes / games,
+                                                                                  log_bytes / games))
+
+        generator = random.Random(1)
+        targets = [(generator.randint(1, games), generator.randint(0, 9)) for _ in range(samples)]
+        for name, function in (('play table', _replay_from_plays), ('move log', _replay_from_log)):
+            started = time.perf_counter()
+            for game_id, at in targets:
+                function(connection, game_id, at)
+            print('replay from {:<10} {:>8.1f} us'.format(name, (time.perf_counter() - started) / samples * 1e6))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,50 @@
+"""
+Page latency of game listings at increasing depths, with skip/limit against the `after` cursor, over a large
+synthetic table of finished games.
+Run it from the repository root: `python -m api.benchmarks.pagination_bench [games]`
+"""
+import sys
+import time
+
+from api.benchmarks.common import use_sqlite
+
+use_sqlite('pagination')
+
+from api.src.db import database  # noqa: E402
+from api.src.db.models import Base, GameDB  # noqa: E402
+from api.src.services.game_service import GameService  # noqa: E402
+from api.src.services.pagination import encode_cursor  # noqa: E402
+
+BATCH = 50000
+LIMIT = 100
+
+
+def _seed(games: int):
+    rows = {'movements_played': 9, 'next_turn': 'a', 'board': 'XOXXOOOXX', 'rows': 3, 'columns': 3,
+            'win_length': 3, 'winner': None, 'finished': True, 'version': 1}
+    with database.engine.begin() as connection:
+        for start in range(0, games, BATCH):
+            connection.execute(GameDB.__table__.insert(), [rows] * min(BATCH, games - start))
+
+
+def _timed(call) -> float:
+    started = time.perf_counter()
+    call()
+    return (time.perf_counter() - started) * 1000
+
+
+def main(games: int = 2000000):
+    Base.metadata.create_all(bind=database.engine)
+    started = time.perf_counter()
+    _seed(games)
+    print('seeded {} games in {:.1f}s'.format(games, time.perf_counter() - started))
+    with database.SessionLocal() as db:
+        service = GameService(db)
+        for depth in (0, games // 100, games // 10, games // 2, games - LIMIT):
+            offset = _timed(lambda: service.get_all_games(depth, LIMIT, finished=True))
+            keyset = _timed(lambda: service.get_all_games(0, LIMIT, finished=True, after=encode_cursor(depth)))
+            print('depth={:<9} skip/limit={:>8.2f}ms after={:>8.2f}ms'.format(depth, offset, keyset))
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:]))
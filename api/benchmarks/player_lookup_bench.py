@@ -0,0 +1,59 @@
+"""
+SQL statements per game creation, with new and with returning players, and per move, through GameService.
+Run it from the repository root: `python -m api.benchmarks.player_lookup_bench`
+"""
+import time
+
+from api.benchmarks.common import use_sqlite
+
+use_sqlite('player_lookup')
+
+from api.src.db import database  # noqa: E402
+from api.src.db.instrumentation import count_queries  # noqa: E402
+from api.src.db.migrations import bootstrap  # noqa: E402
+from api.src.entities.requests import GameRequest, SubmitPlay  # noqa: E402
+from api.src.entities.schemas import Player  # noqa: E402
+from api.src.services.game_service import GameService  # noqa: E402
+
+GAMES = 200
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+def _create_games(names: list) -> dict:
+    game_ids = []
+    with count_queries() as statements:
+        started = time.perf_counter()
+        for first, second in names:
+            with database.SessionLocal() as db:
+                game = GameService(db).begin_game(GameRequest(players=[Player(name=first), Player(name=second)]))
+                game_ids.append(game.id)
+        seconds = time.perf_counter() - started
+    return {'game_ids': game_ids, 'statements': len(statements) / len(names), 'per_second': len(names) / seconds}
+
+
+def _play(game_ids: list, names: list) -> dict:
+    with count_queries() as statements:
+        started = time.perf_counter()
+        for game_id, players in zip(game_ids, names):
+            for turn, (row, column) in enumerate(MOVES):
+                with database.SessionLocal() as db:
+                    GameService(db).submit_play(SubmitPlay(game_id=game_id, player_name=players[turn % 2],
+                                                           row=row, column=column))
+        seconds = time.perf_counter() - started
+    moves = len(game_ids) * len(MOVES)
+    return {'statements': len(statements) / moves, 'per_second': moves / seconds}
+
+
+def main():
+    bootstrap(database.engine)
+    names = [('a{}'.format(number), 'b{}'.format(number)) for number in range(GAMES)]
+    for label in ('new players', 'returning players'):
+        created = _create_games(names)
+        print('game creation, {:<17} {:>5.2f} statements/game {:>8.1f} games/s'.format(
+            label, created['statements'], created['per_second']))
+    played = _play(created['game_ids'], names)
+    print('move{:<30} {:>5.2f} statements/move {:>8.1f} moves/s'.format('', played['statements'], played['per_second']))
+
+
+if __name__ == '__main__':
+    main()
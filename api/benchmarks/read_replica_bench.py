@@ -0,0 +1,82 @@
+"""
+Mixed load of players moving while others list games and players and read game histories, with a read replica:
+SQL statements run by each engine per endpoint, and latency. SQLite cannot replicate, so the local replica is a
+copy of the primary taken after seeding, enough to check which engine serves each endpoint.
+Run it from the repository root: `python -m api.benchmarks.read_replica_bench`
+Needs aiosqlite and httpx, or DATABASE_URL, ASYNC_DATABASE_URL, READ_DATABASE_URL and ASYNC_READ_DATABASE_URL
+pointing to a PostgreSQL primary and its replica.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from collections import defaultdict
+
+from api.benchmarks.common import api_client, percentile, use_sqlite
+
+PRIMARY_URL = use_sqlite('replica_primary')
+REPLICA_PATH = PRIMARY_URL.replace('sqlite:///', '').replace('replica_primary', 'replica')
+os.environ.setdefault('READ_DATABASE_URL', 'sqlite:///{}'.format(REPLICA_PATH))
+os.environ.setdefault('ASYNC_READ_DATABASE_URL', 'sqlite+aiosqlite:///{}'.format(REPLICA_PATH))
+
+from api.app import app  # noqa: E402
+from api.src.db import database  # noqa: E402
+
+GAMES = 200
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+READS = ('/game/all', '/game/all?finished=false', '/player/all', '/player/leaderboard', '/game/movements/{}',
+         '/game/{}')
+
+
+def _queries() -> dict:
+    return {name: stats.count for name, stats in database.ENGINE_QUERIES.items()}
+
+
+async def _seed(client) -> list:
+    games = []
+    for number in range(GAMES):
+        players = ['a{}'.format(number), 'b{}'.format(number)]
+        response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+        games.append((response.json()['id'], players))
+        await client.post('/game/submit-play', json={'game_id': games[-1][0], 'player_name': players[0],
+                                                     'row': 3, 'column': 3})
+    if PRIMARY_URL.startswith('sqlite'):
+        with sqlite3.connect(PRIMARY_URL.replace('sqlite:///', '')) as primary, \
+                sqlite3.connect(REPLICA_PATH) as replica:
+            primary.backup(replica)
+    return games
+
+
+async def _request(client, method: str, url: str, body: dict, queries: dict, latencies: dict, route: str):
+    before = _queries()
+    started = time.perf_counter()
+    response = await client.request(method, url, json=body)
+    latencies[route].append(time.perf_counter() - started)
+    assert response.status_code < 300, (url, response.text)
+    for name, count in _queries().items():
+        queries[route][name] += count - before.get(name, 0)
+
+
+async def main():
+    queries = defaultdict(lambda: defaultdict(int))
+    latencies = defaultdict(list)
+    async with api_client(app) as client:
+        games = await _seed(client)
+        for turn, (row, column) in enumerate(MOVES[:4]):
+            for game_id, players in games:
+                await _request(client, 'POST', '/game/submit-play', {'game_id': game_id, 'row': row,
+                                                                     'column': column,
+                                                                     'player_name': players[(turn + 1) % 2]},
+                               queries, latencies, 'POST /game/submit-play')
+                route = READS[game_id % len(READS)]
+                await _request(client, 'GET', route.format(game_id), None, queries, latencies, 'GET ' + route)
+
+    engines = sorted(database.ENGINE_QUERIES)
+    print('{:<34} {:>8} {}'.format('route', 'p50 ms', ' '.join('{:>11}'.format(name) for name in engines)))
+    for route in sorted(latencies):
+        print('{:<34} {:>8.2f} {}'.format(route, percentile(latencies[route], 50) * 1000, ' '.join(
+            '{:>11.2f}'.format(queries[route][name] / len(latencies[route])) for name in engines)))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
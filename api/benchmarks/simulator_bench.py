@@ -0,0 +1,59 @@
+"""
+Random self-play throughput: one game at a time with the Board rules GameService uses, against the batched
+NumPy simulator in one process and in a process pool.
+Run it from the repository root: `python -m api.benchmarks.simulator_bench [games]`
+"""
+import os
+import random
+import sys
+import time
+
+from api.benchmarks.common import use_sqlite
+
+use_sqlite('simulator')
+
+from api.src.engine.board import Board, CELLS, COLUMNS  # noqa: E402
+from api.src.engine.simulator import GREEDY, PERFECT, RANDOM, opening_counts, parallel_opening_counts  # noqa: E402
+
+
+def scalar_games(games: int) -> int:
+    """Plays random games one by one, checking each move like GameService._check_winner"""
+    generator = random.Random(0)
+    first_wins = 0
+    for number in range(games):
+        board = Board()
+        cells = list(range(CELLS))
+        generator.shuffle(cells)
+        cells.remove(number % CELLS)
+        cells.insert(0, number % CELLS)
+        for turn, cell in enumerate(cells):
+            row, column = cell // COLUMNS + 1, cell % COLUMNS + 1
+            board.play(turn % 2, row, column)
+            if turn >= 4 and board.is_winning_move(turn % 2, row, column):
+                first_wins += turn % 2 == 0
+                break
+    return first_wins
+
+
+def _report(name: str, games: int, seconds: float):
+    print('{:<28} {:>9} games {:>7.2f}s {:>12.0f} games/s'.format(name, games, seconds, games / seconds))
+
+
+def main(games: int = 1000000):
+    started = time.perf_counter()
+    scalar_games(games // 10)
+    _report('scalar Board loop', games // 10, time.perf_counter() - started)
+
+    for first, second in ((RANDOM, RANDOM), (GREEDY, GREEDY), (PERFECT, RANDOM)):
+        started = time.perf_counter()
+        opening_counts(games, first, second, seed=0)
+        _report('numpy {} vs {}'.format(first, second), games, time.perf_counter() - started)
+
+    workers = os.cpu_count() or 1
+    started = time.perf_counter()
+    parallel_opening_counts(games * workers, seed=0, workers=workers)
+    _report('numpy random, {} processes'.format(workers), games * workers, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
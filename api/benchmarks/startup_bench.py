@@ -0,0 +1,75 @@
+"""
+Time from process start to the first request served by uvicorn, on an empty database, on an already
+bootstrapped one and with the bootstrap skipped.
+Run it from the repository root: `python -m api.benchmarks.startup_bench`
+Needs uvicorn and httpx, or DATABASE_URL and ASYNC_DATABASE_URL pointing to PostgreSQL.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from api.benchmarks.common import percentile, use_sqlite
+
+PORT = 8765
+RUNS = 5
+TIMEOUT = 60
+
+
+def _first_request_seconds(environment: dict) -> float:
+    """
+    Starts the app in a new process and polls it until the first request is served
+    :param environment: process' environment variables
+    :return: seconds from process start to the first 200 response
+    """
+    import httpx
+
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api.app:app', '--port', str(PORT)],
+                               env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < TIMEOUT:
+            try:
+                if httpx.get('http://127.0.0.1:{}/default/'.format(PORT), timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError('App exited with code {}'.format(process.returncode))
+            time.sleep(0.01)
+        raise RuntimeError('App did not serve a request in {}s'.format(TIMEOUT))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _fresh_sqlite(environment: dict) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), 'startup.db')
+    return dict(environment, DATABASE_URL='sqlite:///{}'.format(path),
+                ASYNC_DATABASE_URL='sqlite+aiosqlite:///{}'.format(path))
+
+
+def main():
+    configured = 'DATABASE_URL' in os.environ
+    use_sqlite('startup')
+    from api.src.db import database
+    from api.src.db.migrations import bootstrap
+
+    bootstrap(database.engine)
+    scenarios = [('bootstrapped', 'migrate'), ('bootstrap skipped', 'skip')]
+    if not configured:
+        scenarios.insert(0, ('empty database', 'migrate'))
+
+    for name, mode in scenarios:
+        timings = []
+        for _ in range(RUNS):
+            environment = dict(os.environ, SCHEMA_BOOTSTRAP=mode)
+            if name == 'empty database':
+                environment = _fresh_sqlite(environment)
+            timings.append(_first_request_seconds(environment))
+        print('{:<18} p50 {:.3f}s  max {:.3f}s'.format(name, percentile(timings, 50), max(timings)))
+
+
+if __name__ == '__main__':
+    main()
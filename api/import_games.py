@@ -0,0 +1,380 @@
+"""
+Bulk import of historical games and their plays from NDJSON or CSV files.
+
+NDJSON records have the same shape as /game/export lines:
+    {"players": [{"name": "a", "symbol": "X"}, {"name": "b", "symbol": "O"}],
+     "plays": [{"player": "a", "row": 1, "column": 1}, ...], "rows": 3, "columns": 3, "win_length": 3}
+and an optional "starting_player", who must make the first play.
+CSV files have a header with player_1,symbol_1,player_2,symbol_2,moves where moves are space separated
+row:column pairs, player_1 moving first.
+
+Usage: python -m api.import_games games.ndjson [--batch-size 5000] [--rejects rejects.ndjson]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import bindparam, func, select, text, update
+from sqlalchemy.engine import Connection
+
+from api.src.db import database
+from api.src.db.models import GameArchiveDB, GameDB, PlayDB, PlayerDB, player_game
+from api.src.engine.board import Board, COLUMNS, EMPTY_CELL, MAX_BOARD_SIZE, MIN_BOARD_SIZE, ROWS, WIN_LENGTH
+from api.src.engine.move_log import append_move
+from api.src.engine.rating import DRAW_SCORE, INITIAL_RATING, LOSS_SCORE, WIN_SCORE, elo
+
+DEFAULT_SYMBOLS = ('X', 'O')
+NAME_LENGTH = PlayerDB.__table__.c.name.type.length
+GAME_COLUMNS = ('id', 'movements_played', 'next_turn', 'board', 'rows', 'columns', 'win_length', 'winner',
+                'finished', 'version', 'moves', 'updated_at')
+
+
+class RejectedRecord(Exception):
+    pass
+
+
+class ImportedGame:
+    """Game record replayed and validated with the game rules, ready to be stored"""
+    __slots__ = ('game', 'players', 'plays')
+
+    def __init__(self, game: dict, players: List[Tuple[str, str]], plays: List[Tuple[str, int, int]]):
+        self.game = game
+        self.players = players
+        self.plays = plays
+
+
+def _ndjson_records(file: TextIO) -> Iterator[Tuple[int, dict]]:
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exception:
+            yield number, RejectedRecord("Invalid JSON: {}".format(exception))
+
+
+def _csv_records(file: TextIO) -> Iterator[Tuple[int, dict]]:
+    for number, row in enumerate(csv.DictReader(file), 2):
+        try:
+            names = [row['player_1'], row['player_2']]
+            moves = [move.split(':') for move in (row.get('moves') or '').split()]
+            yield number, {'players': [{'name': names[0], 'symbol': row.get('symbol_1')},
+                                       {'name': names[1], 'symbol': row.get('symbol_2')}],
+                           'plays': [{'player': names[turn % 2], 'row': int(move[0]), 'column': int(move[1])}
+                                     for turn, move in enumerate(moves)]}
+        except (KeyError, IndexError, ValueError) as exception:
+            yield number, RejectedRecord("Invalid CSV row: {}".format(exception))
+
+
+def _dimension(record: dict, key: str, default: int) -> int:
+    value = record.get(key, default)
+    if not isinstance(value, int) or not MIN_BOARD_SIZE <= value <= MAX_BOARD_SIZE:
+        raise RejectedRecord("Invalid {}".format(key))
+    return value
+
+
+def replay(record: dict) -> ImportedGame:
+    """
+    Validates a game record replaying its plays with the same rules as GameService
+    :param record: game record
+    :return: game ready to be stored
+    :raises RejectedRecord: with the reason the record is invalid
+    """
+    if not isinstance(record, dict):
+        raise RejectedRecord("Record must be an object")
+    players = record.get('players')
+    if not isinstance(players, list) or len(players) != 2 or not all(isinstance(player, dict) for player in players):
+        raise RejectedRecord("Two players required")
+    names = [player.get('name') for player in players]
+    if not all(isinstance(name, str) and 0 < len(name) <= NAME_LENGTH for name in names):
+        raise RejectedRecord("Players' names must have 1 to {} characters".format(NAME_LENGTH))
+    if names[0] == names[1]:
+        raise RejectedRecord("Players' names must be different")
+    symbols = [player.get('symbol') or default for player, default in zip(players, DEFAULT_SYMBOLS)]
+    if not all(isinstance(symbol, str) and len(symbol) == 1 for symbol in symbols) \
+            or symbols[0].lower() == symbols[1].lower() or EMPTY_CELL in symbols:
+        raise RejectedRecord("Players' symbols must be different single characters")
+    record_plays = record.get('plays') or []
+    if not isinstance(record_plays, list):
+        raise RejectedRecord("Plays must be a list")
+
+    rows = _dimension(record, 'rows', ROWS)
+    columns = _dimension(record, 'columns', COLUMNS)
+    win_length = _dimension(record, 'win_length', WIN_LENGTH)
+    if win_length > max(rows, columns):
+        raise RejectedRecord("Win length must fit in the board")
+
+    board = Board(rows=rows, columns=columns, win_length=win_length)
+    plays = []
+    moves = b''
+    winner = None
+    # Without a starting player, whoever made the first play started
+    next_turn = record.get('starting_player') if record.get('starting_player') in names else None
+    for number, play in enumerate(record_plays):
+        if not isinstance(play, dict):
+            raise RejectedRecord("Play {}: Play must be an object".format(number + 1))
+        name, row, column = play.get('player'), play.get('row'), play.get('column')
+        if winner or number == rows * columns:
+            raise RejectedRecord("Play {}: Game Finished".format(number + 1))
+        if name not in names:
+            raise RejectedRecord("Play {}: Player not found".format(number + 1))
+        if next_turn is not None and name != next_turn:
+            raise RejectedRecord("Play {}: Not player's turn".format(number + 1))
+        if not isinstance(row, int) or not isinstance(column, int) or not board.contains(row, column):
+            raise RejectedRecord("Play {}: Movement out of board".format(number + 1))
+        if not board.is_free(row, column):
+            raise RejectedRecord("Play {}: Movement already made".format(number + 1))
+
+        player_index = names.index(name)
+        board.play(player_index, row, column)
+        next_turn = names[1 - player_index]
+        if number + 1 >= 2 * win_length - 1 and board.is_winning_move(player_index, row, column):
+            winner = name
+        plays.append((name, row, column))
+        moves = append_move(moves, row, column, rows, columns)
+
+    game = {'movements_played': len(plays),
+            'next_turn': next_turn or names[0],
+            'board': board.encode(symbols),
+            'rows': rows,
+            'columns': columns,
+            'win_length': win_length,
+            'winner': winner,
+            'finished': bool(winner) or len(plays) == rows * columns,
+            'version': 1,
+            'moves': moves,
+            'updated_at': datetime.utcnow()}
+    return ImportedGame(game, list(zip(names, symbols)), plays)
+
+
+class Importer:
+    """Stores validated games in batches, one transaction per batch, using COPY on PostgreSQL"""
+
+    def __init__(self, connection: Connection):
+        self._connection = connection
+        self._copy = connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2'
+        self._player_ids: Dict[str, int] = {}
+        self._symbols: Dict[str, str] = {}
+        self._ratings: Dict[int, int] = {}
+        self._next_ids: Dict[str, int] = {}
+        self.rows = 0
+
+    def _reserve_ids(self, table: str, count: int) -> List[int]:
+        """
+        Private function that reserves ids for new rows, from the table's sequence on PostgreSQL. Elsewhere ids
+        follow the highest stored one, so no other writer may insert in the meantime
+        :param table: table name
+        :param count: ids to reserve
+        :return: list of ids
+        """
+        if not count:
+            return []
+        if self._connection.dialect.name == 'postgresql':
+            return list(self._connection.execute(
+                text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+                {'table': table, 'count': count}).scalars())
+        if table not in self._next_ids:
+            # Archived games keep their ids
+            models = {'game': (GameDB, GameArchiveDB), 'player': (PlayerDB,)}[table]
+            self._next_ids[table] = max(self._connection.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+                                        for model in models)
+        first = self._next_ids[table] + 1
+        self._next_ids[table] += count
+        return list(range(first, first + count))
+
+    @staticmethod
+    def _copy_value(value):
+        if value is None:
+            return ''
+        if isinstance(value, bytes):
+            return '\\x' + value.hex()
+        return value
+
+    def _insert(self, table, columns: Tuple[str, ...], rows: List[tuple]):
+        """
+        Private function to insert rows with COPY on PostgreSQL, or a bulk insert elsewhere
+        :param table: table to insert into
+        :param columns: columns' names
+        :param rows: rows' values in the columns' order
+        """
+        if not rows:
+            return
+        if self._copy:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([[self._copy_value(value) for value in row] for row in rows])
+            buffer.seek(0)
+            cursor = self._connection.connection.cursor()
+            cursor.copy_expert('COPY {} ({}) FROM STDIN WITH CSV'.format(
+                table.name, ', '.join('"{}"'.format(column) for column in columns)), buffer)
+        else:
+            self._connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+        self.rows += len(rows)
+
+    def _resolve_players(self, games: List[ImportedGame]) -> Dict[int, str]:
+        """
+        Private function that finds stored players by name and stores the missing ones, once per name. Stored
+        players keep their symbol, so games' boards are encoded again with their players' stored symbols
+        :param games: games of the batch
+        :return: reasons of the games rejected, by position in the batch
+        """
+        names = {name for game in games for name, _ in game.players if name not in self._player_ids}
+        if names:
+            for player_id, name, symbol, rating in self._connection.execute(
+                    select(PlayerDB.id, PlayerDB.name, PlayerDB.symbol, PlayerDB.rating)
+                    .where(PlayerDB.name.in_(list(names))).order_by(PlayerDB.id)):
+                if name not in self._player_ids:
+                    self._player_ids[name] = player_id
+                    self._symbols[name] = symbol
+                    self._ratings[player_id] = rating
+
+        rejected = {}
+        new_symbols = {}
+        for position, game in enumerate(games):
+            symbols = [self._symbols.get(name) or new_symbols.get(name) or symbol for name, symbol in game.players]
+            if symbols[0].lower() == symbols[1].lower():
+                rejected[position] = "Players' stored symbols must be different"
+                continue
+            for (name, _), symbol in zip(game.players, symbols):
+                if name not in self._symbols:
+                    new_symbols.setdefault(name, symbol)
+            game.game['board'] = game.game['board'].translate(
+                str.maketrans(''.join(symbol for _, symbol in game.players), ''.join(symbols)))
+            game.players = [(name, symbol) for (name, _), symbol in zip(game.players, symbols)]
+
+        missing = list(new_symbols)
+        player_ids = self._reserve_ids('player', len(missing))
+        self._insert(PlayerDB.__table__, ('id', 'name', 'symbol'),
+                     [(player_id, name, new_symbols[name]) for player_id, name in zip(player_ids, missing)])
+        self._player_ids.update(zip(missing, player_ids))
+        self._symbols.update(new_symbols)
+        self._ratings.update((player_id, INITIAL_RATING) for player_id in player_ids)
+        return rejected
+
+    def _record_results(self, games: List[ImportedGame]):
+        """
+        Private function that adds the batch's finished games to their players' counters and ratings, in file
+        order. Ratings are kept in memory between batches, so no other writer may finish games in the meantime
+        :param games: games of the batch
+        """
+        counters = {}
+        for game in games:
+            if not game.game['finished']:
+                continue
+            player_id, opponent_id = (self._player_ids[name] for name, _ in game.players)
+            winner = game.game['winner']
+            score = DRAW_SCORE if winner is None else WIN_SCORE if winner == game.players[0][0] else LOSS_SCORE
+            self._ratings[player_id], self._ratings[opponent_id] = elo(
+                self._ratings[player_id], self._ratings[opponent_id], score)
+            for current_id, current_score in ((player_id, score), (opponent_id, 1 - score)):
+                counter = counters.setdefault(current_id, {'player_id': current_id, 'won': 0, 'lost': 0, 'drawn': 0})
+                counter[{WIN_SCORE: 'won', LOSS_SCORE: 'lost', DRAW_SCORE: 'drawn'}[current_score]] += 1
+
+        if counters:
+            self._connection.execute(
+                update(PlayerDB.__table__)
+                .where(PlayerDB.__table__.c.id == bindparam('player_id'))
+                .values(wins=PlayerDB.__table__.c.wins + bindparam('won'),
+                        losses=PlayerDB.__table__.c.losses + bindparam('lost'),
+                        draws=PlayerDB.__table__.c.draws + bindparam('drawn'),
+                        rating=bindparam('new_rating')),
+                [dict(counter, new_rating=self._ratings[player_id]) for player_id, counter in counters.items()])
+
+    def load(self, games: List[ImportedGame]) -> Dict[int, str]:
+        """
+        Stores a batch of games with their players and plays in one transaction
+        :param games: validated games
+        :return: reasons of the games rejected because of their stored players, by position in the batch
+        """
+        with self._connection.begin():
+            rejected = self._resolve_players(games)
+            games = [game for position, game in enumerate(games) if position not in rejected]
+            game_ids = self._reserve_ids('game', len(games))
+            self._insert(GameDB.__table__, GAME_COLUMNS,
+                         [tuple([game_id] + [game.game[column] for column in GAME_COLUMNS[1:]])
+                          for game_id, game in zip(game_ids, games)])
+            self._insert(player_game, ('player_id', 'game_id'),
+                         [(self._player_ids[name], game_id)
+                          for game_id, game in zip(game_ids, games) for name, _ in game.players])
+            self._insert(PlayDB.__table__, ('game_id', 'player_id', 'row', 'column'),
+                         [(game_id, self._player_ids[name], row, column)
+                          for game_id, game in zip(game_ids, games) for name, row, column in game.plays])
+            self._record_results(games)
+        return rejected
+
+
+def import_games(records: Iterable[Tuple[int, dict]], batch_size: int, rejects: TextIO) -> dict:
+    """
+    Validates and stores game records in batches
+    :param records: record number and record, or the RejectedRecord error of unreadable ones
+    :param batch_size: games stored per transaction
+    :param rejects: file that receives rejected records with their reason
+    :return: import's report
+    """
+    started = time.perf_counter()
+    imported = rejected = 0
+
+    def reject(number: int, reason: str):
+        nonlocal rejected
+        rejected += 1
+        rejects.write(json.dumps({'record': number, 'reason': reason}) + '\n')
+
+    def load(batch: List[Tuple[int, ImportedGame]]):
+        nonlocal imported
+        stored_rejected = importer.load([game for _, game in batch])
+        for position, reason in sorted(stored_rejected.items()):
+            reject(batch[position][0], reason)
+        imported += len(batch) - len(stored_rejected)
+
+    with database.engine.connect() as connection:
+        importer = Importer(connection)
+        batch = []
+        for number, record in records:
+            try:
+                if isinstance(record, RejectedRecord):
+                    raise record
+                batch.append((number, replay(record)))
+            except RejectedRecord as exception:
+                reject(number, str(exception))
+                continue
+            if len(batch) == batch_size:
+                load(batch)
+                batch = []
+        if batch:
+            load(batch)
+
+    elapsed = time.perf_counter() - started
+    return {'imported': imported,
+            'rejected': rejected,
+            'rows': importer.rows,
+            'seconds': round(elapsed, 3),
+            'games_per_second': round(imported / elapsed, 1) if elapsed else None,
+            'rows_per_second': round(importer.rows / elapsed, 1) if elapsed else None}
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Bulk import of historical games')
+    parser.add_argument('path', help='NDJSON or CSV file')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), help='defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=5000, help='games stored per transaction')
+    parser.add_argument('--rejects', help='file for rejected records, defaults to stderr')
+    arguments = parser.parse_args(arguments)
+
+    file_format = arguments.format or ('csv' if arguments.path.endswith('.csv') else 'ndjson')
+    rejects = open(arguments.rejects, 'w') if arguments.rejects else sys.stderr
+    try:
+        with open(arguments.path, newline='') as file:
+            records = _csv_records(file) if file_format == 'csv' else _ndjson_records(file)
+            report = import_games(records, arguments.batch_size, rejects)
+    finally:
+        if arguments.rejects:
+            rejects.close()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
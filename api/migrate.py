@@ -0,0 +1,26 @@
+"""
+Applies missing schema migrations, so request-serving processes can start with SCHEMA_BOOTSTRAP=check or skip.
+
+Usage: python -m api.migrate [--check]
+"""
+import argparse
+import json
+import logging
+from typing import List, Optional
+
+from api.src.db import database
+from api.src.db.migrations import bootstrap, check, latest_version
+
+
+def main(arguments: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Schema migrations')
+    parser.add_argument('--check', action='store_true', help='only check that the schema is up to date')
+    arguments = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO)
+    version = check(database.engine) if arguments.check else bootstrap(database.engine)
+    print(json.dumps({'version': version, 'latest': latest_version()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,25 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple, Union
 
 from pydantic import BaseModel
+from sqlalchemy import and_, delete, literal, or_, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 from api.src.db.database import Base
-from api.src.db.models import PlayerDB, GameDB, PlayDB
+from api.src.db.models import PlayerDB, GameDB, PlayDB, IdempotencyKeyDB, GameArchiveDB, PlayArchiveDB, \
+    player_game, player_game_archive
+from api.src.engine.rating import DRAW_SCORE, LOSS_SCORE, WIN_SCORE, elo
 from api.src.entities.schemas import Player, Game, Play
 from api.src.services.service_interface import AppCRUD
 
+# Columns of exported games, the move log and the last update are left out
+EXPORT_COLUMNS = ('id', 'movements_played', 'next_turn', 'board', 'rows', 'columns', 'win_length', 'winner',
+                  'finished', 'version')
+
 
 class Crud(AppCRUD):
 
@@ -19,17 +32,23 @@ class Crud(AppCRUD):
         """
         return self._db.query(model).filter(model.id == entity_id).first()
 
-    def _get_entities(self, model: Base, skip: int, limit: int, filters=None) -> List[Base]:
+    def _get_entities(self, model: Base, skip: int, limit: int, filters=(), options=(),
+                      after_id: Optional[int] = None) -> List[Base]:
         """
-        Private function to encapsulate get entities' logic
+        Private function to encapsulate get entities' logic. Entities are ordered by id, so pages can start after the
+        last id of the previous one with an index range scan instead of skipping rows
         :param model: database model to cast
         :param skip: lower limit
         :param limit: max limit
         :param filters: filters to apply
+        :param options: loader options of related entities
+        :param after_id: only entities with a greater id
         :return: list of entities
         """
-
-        return self._db.query(model).filter(*filters).offset(skip).limit(limit).all()
+        if after_id is not None:
+            filters = [*filters, model.id > after_id]
+        return self._db.query(model).options(*options).filter(*filters).order_by(model.id) \
+            .offset(skip).limit(limit).all()
 
     def _create_entity(self, new_entity: BaseModel, model: Base) -> Base:
         """
@@ -59,14 +78,46 @@ class Crud(AppCRUD):
         """
         return self._db.query(PlayerDB).filter(PlayerDB.name == name).first()
 
-    def get_players(self, skip: int = 0, limit: int = 100) -> List[PlayerDB]:
+    def get_players(self, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[PlayerDB]:
         """
         Returns all saved players from 0 to 100 by default
         :param skip: lower limit
         :param limit: max limit
+        :param after_id: only players with a greater id
         :return: list of players
         """
-        return self._get_entities(PlayerDB, skip, limit)
+        return self._get_entities(PlayerDB, skip, limit, after_id=after_id)
+
+    def get_leaderboard(self, limit: int) -> List[PlayerDB]:
+        """
+        Returns the players with the highest ratings, reading them from the rating index
+        :param limit: max players
+        :return: list of players, highest rating first
+        """
+        return self._db.query(PlayerDB).order_by(PlayerDB.rating.desc(), PlayerDB.id.desc()).limit(limit).all()
+
+    def record_game_result(self, player_ids: List[int], winner_id: Optional[int]):
+        """
+        Adds a finished game to its players' counters and updates their ratings, in the current transaction. Both
+        players are locked in id order, so games finishing concurrently between the same players cannot deadlock
+        :param player_ids: ids of the game's two players
+        :param winner_id: id of the winner, None for a draw
+        """
+        ratings = dict(self._db.execute(select(PlayerDB.id, PlayerDB.rating)
+                                        .where(PlayerDB.id.in_(player_ids))
+                                        .order_by(PlayerDB.id)
+                                        .with_for_update()).all())
+        player_id, opponent_id = player_ids
+        score = DRAW_SCORE if winner_id is None else WIN_SCORE if winner_id == player_id else LOSS_SCORE
+        new_ratings = dict(zip(player_ids, elo(ratings[player_id], ratings[opponent_id], score)))
+        for current_id in player_ids:
+            self._db.execute(update(PlayerDB)
+                             .where(PlayerDB.id == current_id)
+                             .values(wins=PlayerDB.wins + (winner_id == current_id),
+                                     losses=PlayerDB.losses + (winner_id not in (None, current_id)),
+                                     draws=PlayerDB.draws + (winner_id is None),
+                                     rating=new_ratings[current_id])
+                             .execution_options(synchronize_session=False))
 
     def create_player(self, new_player: Player) -> PlayerDB:
         """
@@ -76,26 +127,44 @@ class Crud(AppCRUD):
         """
         return self._create_entity(new_player, PlayerDB)
 
-    def create_game(self, new_game: Game, finished: bool) -> GameDB:
+    def upsert_players(self, players: List[Player]) -> List[Tuple[int, str, str]]:
+        """
+        Stores the players whose names are not stored yet, in one statement on PostgreSQL. Stored players keep
+        their symbol
+        :param players: players to store
+        :return: id, name and stored symbol of each player
+        """
+        values = [{'name': player.name, 'symbol': player.symbol} for player in players]
+        columns = (PlayerDB.id, PlayerDB.name, PlayerDB.symbol)
+        if self._db.bind.dialect.name == 'postgresql':
+            # The no-op update makes RETURNING include the players that already existed
+            statement = postgresql.insert(PlayerDB).values(values)
+            rows = self._db.execute(statement.on_conflict_do_update(index_elements=[PlayerDB.name],
+                                                                    set_={'name': statement.excluded.name})
+                                    .returning(*columns)).all()
+        else:
+            self._db.execute(sqlite.insert(PlayerDB).values(values).on_conflict_do_nothing(
+                index_elements=[PlayerDB.name]))
+            rows = self._db.execute(select(*columns).where(PlayerDB.name.in_([player.name for player in players])))
+        stored = {name: (player_id, name, symbol) for player_id, name, symbol in rows}
+        return [stored[player.name] for player in players]
+
+    def create_game(self, new_game: Game, player_ids: List[int], finished: bool) -> Tuple[int, int]:
         """
-        Stores a new game
+        Stores a new game of already stored players
         :param new_game: new game to store
+        :param player_ids: ids of the game's players
         :param finished: finished games
-        :return: stored new game
-        """
-        new_game.players = [self.get_player_by_name(player.name) if self.get_player_by_name(player.name)
-                            else PlayerDB(**player.dict()) for player in new_game.players]
-        new_game_db = GameDB(**new_game.dict(), finished=finished)
-        self._add_commit(new_game_db)
-        return new_game_db
-
-    def create_play(self, new_play: Play) -> PlayDB:
-        """
-        Stores a new play
-        :param new_play: new play to store
-        :return: stored new play
-        """
-        return self._create_entity(new_play, PlayDB)
+        :return: stored game's id and version
+        """
+        new_game_db = GameDB(**new_game.dict(exclude={'players'}), finished=finished)
+        self._db.add(new_game_db)
+        self._db.flush()
+        game_id, version = new_game_db.id, new_game_db.version
+        self._db.execute(player_game.insert(), [{'player_id': player_id, 'game_id': game_id}
+                                                for player_id in player_ids])
+        self._commit()
+        return game_id, version
 
     def _add_commit(self, entity_db: Base):
         """
@@ -103,61 +172,311 @@ class Crud(AppCRUD):
         :param entity_db: entity to be stored
         """
         self._db.add(entity_db)
-        self._db.commit()
+        self._commit()
 
-    def get_games(self, skip: int, limit: int, finished: Optional[bool] = None) -> List[GameDB]:
+    def _commit(self):
         """
-        Returns all saved games from 0 to 100 by default
+        Private function to commit, rolling back if a versioned entity was updated concurrently
+        :raises StaleDataError: if a versioned entity changed since it was read
+        """
+        try:
+            self._db.commit()
+        except StaleDataError:
+            self._db.rollback()
+            raise
+
+    def get_games(self, skip: int, limit: int, finished: Optional[bool] = None,
+                  after_id: Optional[int] = None) -> List[Union[GameDB, GameArchiveDB]]:
+        """
+        Returns all saved games from 0 to 100 by default, active and archived ones. Unfinished games are only
+        looked for among the active ones
         :param skip: lower limit
         :param limit: max limit
         :return: list of games
         :param finished: to filter finished games
+        :param after_id: only games with a greater id
         """
-        filters = [GameDB.finished == finished] if finished is not None else ()
-        return self._get_entities(GameDB, skip, limit, filters)
+        if finished is False:
+            return self._get_entities(GameDB, skip, limit, [GameDB.finished == finished],
+                                      [selectinload(GameDB.players)], after_id)
 
-    def get_game(self, game_id: int) -> GameDB:
+        # The page's ids are found in both tiers at once, then only the games on the page are loaded
+        models = (GameDB, GameArchiveDB)
+        selects = []
+        for tier, model in enumerate(models):
+            filters = [model.finished == finished] if finished is not None else []
+            if after_id is not None:
+                filters.append(model.id > after_id)
+            selects.append(select(model.id, literal(tier).label('tier')).where(*filters))
+        ids = union_all(*selects).subquery()
+        page = self._db.execute(select(ids).order_by(ids.c.id).offset(skip).limit(limit)).all()
+        games = []
+        for tier, model in enumerate(models):
+            game_ids = [game_id for game_id, game_tier in page if game_tier == tier]
+            if game_ids:
+                games.extend(self._db.query(model).options(selectinload(model.players))
+                             .filter(model.id.in_(game_ids)).all())
+        return sorted(games, key=lambda game: game.id)
+
+    def get_game(self, game_id: int) -> Optional[Union[GameDB, GameArchiveDB]]:
         """
-        Returns game with the requested id
+        Returns game with the requested id, looking for it among the archived games if it is not active
         :param game_id: id of the game to find
         :return: game found
         """
-        return self._get_entity(GameDB, game_id)
+        for model in (GameDB, GameArchiveDB):
+            game = self._db.query(model).options(joinedload(model.players)).filter(model.id == game_id).first()
+            if game:
+                return game
+        return None
+
+    def get_games_by_ids(self, game_ids: Iterable[int]) -> List[Union[GameDB, GameArchiveDB]]:
+        """
+        Returns games with the requested ids and their players, archived ones included
+        :param game_ids: ids of the games to find
+        :return: list of games found
+        """
+        game_ids = set(game_ids)
+        games = self._db.query(GameDB).options(selectinload(GameDB.players)).filter(GameDB.id.in_(game_ids)).all()
+        missing = game_ids - {game.id for game in games}
+        if missing:
+            games.extend(self._db.query(GameArchiveDB).options(selectinload(GameArchiveDB.players))
+                         .filter(GameArchiveDB.id.in_(missing)).all())
+        return games
+
+    def save_plays(self, new_plays: List[Play], results: Iterable[Tuple[List[int], Optional[int]]] = ()):
+        """
+        Stores new plays with a bulk insert, together with pending updates of their games, in one transaction
+        :param new_plays: new plays to store
+        :param results: players' ids and winner's id of the games the plays finished
+        :raises StaleDataError: if any of the games changed since it was read
+        """
+        if new_plays:
+            self._db.execute(PlayDB.__table__.insert(), [new_play.dict() for new_play in new_plays])
+        for player_ids, winner_id in results:
+            self.record_game_result(player_ids, winner_id)
+        self._commit()
 
-    def update_game(self, updated_game: GameDB, finished: bool) -> GameDB:
+    def update_game_state(self, game: Game, new_play: Play,
+                          result: Optional[Tuple[List[int], Optional[int]]] = None):
+        """
+        Stores a game's new state and its last play in one transaction, without reading it first. The update only
+        applies if the stored version is still the one the state was read with
+        :param game: game's state with id, version and new info
+        :param new_play: play that led to the new state
+        :param result: players' ids and winner's id if the play finished the game
+        :raises StaleDataError: if the game's version changed
+        """
+        updated = self._db.execute(update(GameDB)
+                                   .where(GameDB.id == game.id, GameDB.version == game.version)
+                                   .values(board=game.board,
+                                           movements_played=game.movements_played,
+                                           next_turn=game.next_turn,
+                                           winner=game.winner,
+                                           finished=game.finished,
+                                           moves=game.moves,
+                                           version=game.version + 1)
+                                   .execution_options(synchronize_session=False))
+        if updated.rowcount != 1:
+            self._db.rollback()
+            raise StaleDataError("Game {} was updated concurrently".format(game.id))
+
+        self._db.execute(PlayDB.__table__.insert(), new_play.dict())
+        if result:
+            self.record_game_result(*result)
+        self._commit()
+
+    def rollback(self):
         """
-        Updates an already stored game
-        :param updated_game: game with new info
-        :return: game with new info updated
-        :param finished: finished game
+        Discards the current transaction, expiring loaded entities so they are read again
         """
-        updated_game.finished = finished
-        self._add_commit(updated_game)
-
-        return updated_game
+        self._db.rollback()
 
-    def get_game_movements(self, game_id: int) -> List[PlayDB]:
+    def get_game_movements(self, game_id: int) -> List[Union[PlayDB, PlayArchiveDB]]:
         """
-        Returns a game's list of movements
+        Returns a game's list of movements, from the archive if the game has none among the active ones
         :param game_id: game the get movements
         :return: list of movements
         """
-        return self._db.query(PlayDB).filter(PlayDB.game_id == game_id).all()
+        for model in (PlayDB, PlayArchiveDB):
+            plays = self._db.query(model).options(joinedload(model.player)).filter(model.game_id == game_id) \
+                .order_by(model.id).all()
+            if plays:
+                return plays
+        return []
+
+    def archive_finished_games(self, batch_size: int) -> List[int]:
+        """
+        Moves a batch of finished games with their players' links and plays to the archive tables, in one
+        transaction. On PostgreSQL games being archived by another worker are skipped
+        :param batch_size: max games to move
+        :return: ids of the archived games
+        """
+        ids = select(GameDB.id).where(GameDB.finished == True).order_by(GameDB.id).limit(batch_size)  # noqa: E712
+        if self._db.bind.dialect.name == 'postgresql':
+            ids = ids.with_for_update(skip_locked=True)
+        game_ids = list(self._db.execute(ids).scalars())
+        if not game_ids:
+            self._db.rollback()
+            return []
+        for source, target, key in ((GameDB.__table__, GameArchiveDB.__table__, 'id'),
+                                    (player_game, player_game_archive, 'game_id'),
+                                    (PlayDB.__table__, PlayArchiveDB.__table__, 'game_id')):
+            columns = [column.name for column in target.c]
+            self._db.execute(target.insert().from_select(
+                columns, select(*(source.c[column] for column in columns)).where(source.c[key].in_(game_ids))))
+        self._delete_games(game_ids)
+        self._db.commit()
+        return game_ids
+
+    def delete_abandoned_games(self, updated_before: datetime, batch_size: int) -> List[int]:
+        """
+        Deletes a batch of unfinished games without plays since a date, with their players' links and plays, in
+        one transaction. Players are kept
+        :param updated_before: games updated before are abandoned
+        :param batch_size: max games to delete
+        :return: ids of the deleted games
+        """
+        game_ids = list(self._db.execute(select(GameDB.id)
+                                         .where(GameDB.finished == False,  # noqa: E712
+                                                GameDB.updated_at < updated_before)
+                                         .order_by(GameDB.updated_at)
+                                         .limit(batch_size)).scalars())
+        if game_ids:
+            self._delete_games(game_ids)
+        self._db.commit()
+        return game_ids
+
+    def _delete_games(self, game_ids: List[int], archived: bool = False):
+        """
+        Private function that deletes games, their players' links and plays with one statement per table
+        :param game_ids: ids of the games to delete
+        :param archived: games are in the archive tables
+        """
+        game, links, play = (GameArchiveDB, player_game_archive, PlayArchiveDB) if archived \
+            else (GameDB, player_game, PlayDB)
+        self._db.execute(delete(play).where(play.game_id.in_(game_ids)))
+        self._db.execute(links.delete().where(links.c.game_id.in_(game_ids)))
+        self._db.execute(delete(game).where(game.id.in_(game_ids)).execution_options(synchronize_session=False))
 
-    def delete_game(self, game: Game) -> GameDB:
+    def delete_game(self, game: Union[GameDB, GameArchiveDB]):
         """
-        Delete a Game
+        Deletes a game with its plays and its players' links. Players are kept, they may be in other games
         :param game: game to be deleted
-        :return: deleted game
         """
-        return self._delete_entity(game)
+        self._delete_games([game.id], archived=isinstance(game, GameArchiveDB))
+        self._db.commit()
+
+    def get_idempotency_key(self, route: str, key: str) -> Optional[IdempotencyKeyDB]:
+        """
+        Returns a stored idempotency key
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :return: key found
+        """
+        return self._db.get(IdempotencyKeyDB, (route, key))
+
+    def create_idempotency_key(self, route: str, key: str, request_hash: str, expired_before: datetime,
+                               abandoned_before: datetime) -> bool:
+        """
+        Stores an idempotency key without response, replacing it if it expired or its request never completed
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :param request_hash: hash of the request's body
+        :param expired_before: keys created before are expired
+        :param abandoned_before: keys without response created before were left by a worker that stopped
+        :return: False if the key already exists
+        """
+        self._db.execute(delete(IdempotencyKeyDB).where(
+            IdempotencyKeyDB.route == route, IdempotencyKeyDB.key == key,
+            or_(IdempotencyKeyDB.created_at < expired_before,
+                and_(IdempotencyKeyDB.status_code.is_(None), IdempotencyKeyDB.created_at < abandoned_before))))
+        try:
+            self._db.execute(IdempotencyKeyDB.__table__.insert(), {'route': route, 'key': key,
+                                                                   'request_hash': request_hash,
+                                                                   'created_at': datetime.utcnow()})
+            self._db.commit()
+        except IntegrityError:
+            self._db.rollback()
+            return False
+        return True
+
+    def complete_idempotency_key(self, route: str, key: str, status_code: int, body: bytes):
+        """
+        Stores the response of an idempotency key's request
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :param status_code: response's status code
+        :param body: response's body
+        """
+        self._db.execute(update(IdempotencyKeyDB).where(IdempotencyKeyDB.route == route, IdempotencyKeyDB.key == key)
+                         .values(status_code=status_code, body=body))
+        self._db.commit()
+
+    def delete_idempotency_key(self, route: str, key: str):
+        """
+        Deletes an idempotency key, so its request can run again
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        """
+        self._db.execute(delete(IdempotencyKeyDB).where(IdempotencyKeyDB.route == route, IdempotencyKeyDB.key == key))
+        self._db.commit()
 
-    def _delete_entity(self, entity: BaseModel) -> Base:
+    def delete_expired_idempotency_keys(self, expired_before: datetime) -> int:
         """
-        Private method to delete an entity
-        :param entity: entity to be deleted
-        :return: deleted entity
+        Deletes the idempotency keys created before a date
+        :param expired_before: keys created before are expired
+        :return: keys deleted
         """
-        self._db.delete(entity)
+        deleted = self._db.execute(delete(IdempotencyKeyDB).where(IdempotencyKeyDB.created_at < expired_before))
         self._db.commit()
-        return entity
+        return deleted.rowcount
+
+    @staticmethod
+    def export_games_statement(finished: Optional[bool] = None, min_id: Optional[int] = None,
+                               max_id: Optional[int] = None) -> Select:
+        """
+        Returns the query of games' rows to export, ordered by id. It selects columns instead of entities so
+        streamed rows are not kept in the session. Plays are exported on their own, so the move log is left out
+        :param finished: to filter finished games
+        :param min_id: lowest game id
+        :param max_id: highest game id
+        :return: select statement
+        """
+        selects = []
+        for game in (GameDB.__table__,) if finished is False else (GameDB.__table__, GameArchiveDB.__table__):
+            filters = []
+            if finished is not None:
+                filters.append(game.c.finished == finished)
+            if min_id is not None:
+                filters.append(game.c.id >= min_id)
+            if max_id is not None:
+                filters.append(game.c.id <= max_id)
+            selects.append(select(*(game.c[column] for column in EXPORT_COLUMNS)).where(*filters))
+        games = union_all(*selects).subquery() if len(selects) > 1 else selects[0].subquery()
+        return select(games).order_by(games.c.id)
+
+    @staticmethod
+    def games_players_statement(game_ids: List[int]) -> Select:
+        """
+        Returns the query of the players of a list of games
+        :param game_ids: ids of the games
+        :return: select statement of game_id, name and symbol
+        """
+        links = union_all(*(select(table.c.game_id, table.c.player_id).where(table.c.game_id.in_(game_ids))
+                            for table in (player_game, player_game_archive))).subquery()
+        return select(links.c.game_id, PlayerDB.name, PlayerDB.symbol).join(PlayerDB, PlayerDB.id == links.c.player_id)
+
+    @staticmethod
+    def games_plays_statement(game_ids: List[int]) -> Select:
+        """
+        Returns the query of the plays of a list of games, in the order they were made
+        :param game_ids: ids of the games
+        :return: select statement of game_id, player's name, row and column
+        """
+        plays = union_all(*(select(table.c.id, table.c.game_id, table.c.player_id, table.c.row, table.c.column)
+                            .where(table.c.game_id.in_(game_ids))
+                            for table in (PlayDB.__table__, PlayArchiveDB.__table__))).subquery()
+        return select(plays.c.game_id, PlayerDB.name, plays.c.row, plays.c.column) \
+            .join(PlayerDB, PlayerDB.id == plays.c.player_id) \
+            .order_by(plays.c.id)
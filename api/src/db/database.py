@@ -2,21 +2,75 @@ import os
 
 from dotenv import load_dotenv, find_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from api.src.db.instrumentation import track_queries
+from api.src.db.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+
 load_dotenv('database.env')
-SQLALCHEMY_DATABASE_URL = "postgresql+psycopg2://{user}:{password}@{server}:{port}/{db}".format(
-    user=os.getenv('USER_DB'),
-    password=os.getenv("PASSWORD"),
-    server=os.getenv("SERVER"),
-    port=os.getenv("PORT"),
-    db=os.getenv("DATABASE"))
+DATABASE_URL = "postgresql+{driver}://{user}:{password}@{server}:{port}/{db}"
+DATABASE_SETTINGS = dict(user=os.getenv('USER_DB'),
+                         password=os.getenv("PASSWORD"),
+                         server=os.getenv("SERVER"),
+                         port=os.getenv("PORT"),
+                         db=os.getenv("DATABASE"))
+SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL') or DATABASE_URL.format(driver='psycopg2', **DATABASE_SETTINGS)
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or DATABASE_URL.format(driver='asyncpg',
+                                                                                       **DATABASE_SETTINGS)
+# Optional read-only replica serving the listing and history reads, the primary serves them when it is not set.
+# Service calls read it through READ_DATABASE_URL, streamed exports through ASYNC_READ_DATABASE_URL
+READ_DATABASE_URL = os.getenv('READ_DATABASE_URL')
+ASYNC_READ_DATABASE_URL = os.getenv('ASYNC_READ_DATABASE_URL')
+
+POOL_SETTINGS = dict(pool_size=int(os.getenv('POOL_SIZE', 5)),
+                     max_overflow=int(os.getenv('POOL_MAX_OVERFLOW', 10)),
+                     pool_timeout=float(os.getenv('POOL_TIMEOUT', 30)),
+                     pool_recycle=int(os.getenv('POOL_RECYCLE', -1)),
+                     pool_pre_ping=os.getenv('POOL_PRE_PING', 'false').lower() == 'true')
+SQL_ECHO = os.getenv('SQL_ECHO', 'false').lower() == 'true'
+
+
+def _connect_args(url: str) -> dict:
+    # Service calls run in a thread pool, so pooled SQLite connections are used by other threads than their creator
+    return {'check_same_thread': False} if url.startswith('sqlite') else {}
+
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, echo=True
+    SQLALCHEMY_DATABASE_URL, echo=SQL_ECHO, poolclass=InstrumentedQueuePool,
+    connect_args=_connect_args(SQLALCHEMY_DATABASE_URL), **POOL_SETTINGS
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions of the service calls run by AsyncAppService, which keep loaded attributes after commit like async ones
+ServiceSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+read_engine = create_engine(
+    READ_DATABASE_URL, echo=SQL_ECHO, poolclass=InstrumentedQueuePool, connect_args=_connect_args(READ_DATABASE_URL),
+    **POOL_SETTINGS
+) if READ_DATABASE_URL else None
+ServiceReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine,
+                                       expire_on_commit=False) if read_engine else None
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, echo=SQL_ECHO, poolclass=InstrumentedAsyncAdaptedQueuePool, **POOL_SETTINGS
+)
+AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=async_engine, class_=AsyncSession,
+                                 expire_on_commit=False)
+
+async_read_engine = create_async_engine(
+    ASYNC_READ_DATABASE_URL, echo=SQL_ECHO, poolclass=InstrumentedAsyncAdaptedQueuePool, **POOL_SETTINGS
+) if ASYNC_READ_DATABASE_URL else None
+AsyncReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=async_read_engine, class_=AsyncSession,
+                                     expire_on_commit=False) if async_read_engine else None
+
+# SQL statements run by each engine
+ENGINE_QUERIES = {'sync': track_queries(engine),
+                  'async': track_queries(async_engine.sync_engine)}
+if read_engine:
+    ENGINE_QUERIES['read'] = track_queries(read_engine)
+if async_read_engine:
+    ENGINE_QUERIES['async_read'] = track_queries(async_read_engine.sync_engine)
 
 Base = declarative_base()
 
@@ -27,3 +81,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,126 @@
+"""SQL statement counting and timing scoped to the current context, shared by every engine, and per engine."""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_statements: ContextVar[Optional[List[str]]] = ContextVar('statements', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """
+    Records the SQL statements executed inside the block, including the ones run by async sessions
+    :return: list that receives each executed statement
+    """
+    statements = []
+    token = _statements.set(statements)
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
+
+
+class QueryStats:
+    """SQL statements executed and seconds spent running them"""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    started = conn.info.get('query_started')
+    if stats is not None and started:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started.pop()
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(exception_context):
+    connection = exception_context.connection
+    started = connection.info.get('query_started') if connection is not None else None
+    if started:
+        started.pop()
+
+
+@contextmanager
+def measure_queries() -> Iterator[QueryStats]:
+    """
+    Counts and times the SQL statements executed inside the block, including the ones run by async sessions
+    :return: stats updated after each statement
+    """
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class EngineQueryStats:
+    """SQL statements executed by an engine since it was created and seconds spent running them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {'queries': self.count,
+                'seconds_total': self.seconds,
+                'seconds_avg': self.seconds / self.count if self.count else 0.0}
+
+
+def track_queries(engine: Engine) -> EngineQueryStats:
+    """
+    Counts and times every SQL statement executed by an engine
+    :param engine: sync engine, or the sync_engine of an async one
+    :return: engine's stats, updated after each statement
+    """
+    stats = EngineQueryStats()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('engine_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop(conn, cursor, statement, parameters, context, executemany):
+        stats.record(time.perf_counter() - conn.info['engine_query_started'].pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def discard(exception_context):
+        connection = exception_context.connection
+        started = connection.info.get('engine_query_started') if connection is not None else None
+        if started:
+            started.pop()
+
+    return stats
@@ -0,0 +1,291 @@
+"""
+Versioned schema bootstrap. The schema_version table records every applied migration, so a bootstrap only
+runs the migrations the database is missing and never drops data.
+
+New databases are created from the models and stamped with the latest version. Databases from before versioning
+are stamped with the baseline version, the schema the app created before any migration existed, and brought up to
+date by every migration. Schema changes register a migration with the next version number:
+
+    @migration(11, 'Add game created_at')
+    def _add_game_created_at(connection):
+        connection.execute(text('ALTER TABLE game ADD COLUMN created_at TIMESTAMP'))
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, MetaData, String, Table, bindparam, func, \
+    inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from api.src.db.models import Base, GameArchiveDB, GameDB, IdempotencyKeyDB, PlayArchiveDB, PlayDB, PlayerDB, \
+    player_game, player_game_archive
+from api.src.engine.board import EMPTY_CELL
+from api.src.engine.move_log import append_move
+from api.src.engine.rating import INITIAL_RATING
+
+logger = logging.getLogger(__name__)
+
+# Schema created by Base.metadata.create_all before versioned migrations existed: player, game, play and
+# player_game with their original columns and no index besides the primary keys
+BASELINE_VERSION = 1
+# Arbitrary key of the PostgreSQL advisory lock that serializes bootstraps of several workers
+_LOCK_KEY = 7357001
+
+schema_version = Table('schema_version', MetaData(),
+                       Column('version', Integer, primary_key=True),
+                       Column('description', String(200), nullable=False),
+                       Column('applied_at', DateTime, nullable=False, server_default=func.now()))
+
+MIGRATIONS: Dict[int, Tuple[str, Callable[[Connection], None]]] = {}
+
+
+def migration(version: int, description: str):
+    """
+    Registers a schema migration
+    :param version: schema version reached after applying it, one more than the previous migration
+    :param description: short description stored in schema_version
+    :return: decorator of the migration function, which receives the connection of the bootstrap transaction
+    """
+    def register(function: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if version <= BASELINE_VERSION or version in MIGRATIONS:
+            raise ValueError('Migration version {} already used'.format(version))
+        MIGRATIONS[version] = (description, function)
+        return function
+    return register
+
+
+def latest_version() -> int:
+    return max(MIGRATIONS, default=BASELINE_VERSION)
+
+
+def current_version(connection: Connection) -> Optional[int]:
+    """
+    Returns the schema version of a database
+    :param connection: database connection
+    :return: highest applied version, None if the database was never bootstrapped
+    """
+    if not inspect(connection).has_table(schema_version.name):
+        return None
+    return connection.execute(select(func.max(schema_version.c.version))).scalar()
+
+
+def _lock(connection: Connection):
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _LOCK_KEY})
+
+
+def _index(table: Table, name: str) -> Index:
+    return next(index for index in table.indexes if index.name == name)
+
+
+def _rebuild_sqlite_table(connection: Connection, table: Table):
+    """
+    Private function that recreates a SQLite table from its model keeping its rows, for the changes SQLite cannot
+    make with ALTER TABLE. Other tables' foreign keys keep pointing to it by name
+    :param connection: connection of the bootstrap transaction
+    :param table: model's table
+    """
+    inspector = inspect(connection)
+    columns = ', '.join('"{}"'.format(column['name']) for column in inspector.get_columns(table.name)
+                        if column['name'] in table.c)
+    for index in inspector.get_indexes(table.name):
+        connection.execute(text('DROP INDEX "{}"'.format(index['name'])))
+    connection.execute(text('PRAGMA legacy_alter_table = ON'))
+    connection.execute(text('ALTER TABLE "{0}" RENAME TO "{0}_rebuilt"'.format(table.name)))
+    connection.execute(text('PRAGMA legacy_alter_table = OFF'))
+    table.create(connection)
+    connection.execute(text('INSERT INTO "{0}" ({1}) SELECT {1} FROM "{0}_rebuilt"'.format(table.name, columns)))
+    connection.execute(text('DROP TABLE "{}_rebuilt"'.format(table.name)))
+
+
+def _stamp(connection: Connection, version: int, description: str):
+    connection.execute(schema_version.insert().values(version=version, description=description))
+
+
+def bootstrap(engine: Engine) -> int:
+    """
+    Brings a database to the latest schema version in one transaction. Empty databases are created from the
+    models, databases from before versioning are stamped with the baseline version
+    :param engine: database engine
+    :return: schema version
+    """
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        # SQLite rewrites or enforces the foreign keys of tables rebuilt while they are on, and only turns them off
+        # outside a transaction
+        foreign_keys = _foreign_keys(connection, False) if connection.dialect.name == 'sqlite' else None
+        try:
+            with connection.begin():
+                version = _migrate(connection, started)
+        finally:
+            if foreign_keys:
+                _foreign_keys(connection, foreign_keys)
+    logger.info('Schema at version %s, checked in %.3fs', version, time.perf_counter() - started)
+    return version
+
+
+def _foreign_keys(connection: Connection, enabled: bool) -> bool:
+    """
+    Private function that turns SQLite foreign key enforcement on or off
+    :param connection: connection outside a transaction
+    :param enabled: whether foreign keys are enforced
+    :return: whether they were enforced before
+    """
+    before = bool(connection.execute(text('PRAGMA foreign_keys')).scalar())
+    connection.execute(text('PRAGMA foreign_keys = {}'.format('ON' if enabled else 'OFF')))
+    return before
+
+
+def _migrate(connection: Connection, started: float) -> int:
+    """
+    Private function that creates, stamps or migrates the schema in the bootstrap transaction
+    :param connection: connection of the bootstrap transaction
+    :param started: when the bootstrap started
+    :return: schema version
+    """
+    _lock(connection)
+    version = current_version(connection)
+    if version is None:
+        tables = set(inspect(connection).get_table_names())
+        schema_version.create(connection)
+        if tables.isdisjoint(Base.metadata.tables):
+            Base.metadata.create_all(connection)
+            _stamp(connection, latest_version(), 'Create schema')
+            logger.info('Schema created at version %s in %.3fs', latest_version(), time.perf_counter() - started)
+            return latest_version()
+        _stamp(connection, BASELINE_VERSION, 'Baseline')
+        version = BASELINE_VERSION
+
+    for number in sorted(number for number in MIGRATIONS if number > version):
+        description, function = MIGRATIONS[number]
+        function(connection)
+        _stamp(connection, number, description)
+        logger.info('Schema migrated to version %s: %s', number, description)
+        version = number
+    if connection.dialect.name == 'sqlite' and connection.execute(text('PRAGMA foreign_key_check')).first():
+        raise RuntimeError('Schema migration to version {} broke foreign keys'.format(version))
+    return version
+
+
+def check(engine: Engine) -> int:
+    """
+    Checks that a database is at the latest schema version without changing it
+    :param engine: database engine
+    :return: schema version
+    :raises RuntimeError: if migrations are missing
+    """
+    with engine.connect() as connection:
+        version = current_version(connection)
+    if version != latest_version():
+        raise RuntimeError('Schema version is {}, expected {}. Run `python -m api.migrate`'.format(
+            version, latest_version()))
+    return version
+
+
+@migration(2, 'Add board dimensions')
+def _add_board_dimensions(connection: Connection):
+    for column in ('rows', 'columns', 'win_length'):
+        connection.execute(text('ALTER TABLE game ADD COLUMN {} INTEGER NOT NULL DEFAULT 3'.format(column)))
+    if connection.dialect.name != 'sqlite':
+        connection.execute(text('ALTER TABLE game ALTER COLUMN board TYPE TEXT'))
+    # Boards were stored as JSON rows with null in empty cells, the engine stores one symbol per cell
+    boards = [{'game_id': game_id, 'board': ''.join(cell or EMPTY_CELL for row in json.loads(board) for cell in row)}
+              for game_id, board in connection.execute(text('SELECT id, board FROM game'))]
+    if boards:
+        connection.execute(text('UPDATE game SET board = :board WHERE id = :game_id'), boards)
+
+
+@migration(3, 'Add game version')
+def _add_game_version(connection: Connection):
+    connection.execute(text('ALTER TABLE game ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+
+
+@migration(4, 'Add listing indexes')
+def _add_listing_indexes(connection: Connection):
+    # Player names became unique later, in migration 8
+    Index('ix_player_name', PlayerDB.__table__.c.name).create(connection)
+    for table, name in ((player_game, 'ix_player_game_game_id'), (GameDB.__table__, 'ix_game_finished_id'),
+                        (PlayDB.__table__, 'ix_play_game_id'), (PlayDB.__table__, 'ix_play_player_id')):
+        _index(table, name).create(connection)
+
+
+@migration(5, 'Add game move log')
+def _add_game_moves(connection: Connection):
+    empty = "X''" if connection.dialect.name == 'sqlite' else "''"
+    connection.execute(text('ALTER TABLE game ADD COLUMN moves {} NOT NULL DEFAULT {}'.format(
+        GameDB.__table__.c.moves.type.compile(dialect=connection.dialect), empty)))
+    # Plays are stored in the order they were made
+    moves = {}
+    for game_id, row, column, rows, columns in connection.execute(text(
+            'SELECT play.game_id, play."row", play."column", game.rows, game.columns FROM play '
+            'JOIN game ON game.id = play.game_id ORDER BY play.game_id, play.id')):
+        moves[game_id] = append_move(moves.get(game_id, b''), row, column, rows, columns)
+    if moves:
+        connection.execute(text('UPDATE game SET moves = :moves WHERE id = :game_id')
+                           .bindparams(bindparam('moves', type_=LargeBinary)),
+                           [{'game_id': game_id, 'moves': log} for game_id, log in moves.items()])
+
+
+@migration(6, 'Add player results and rating')
+def _add_player_stats(connection: Connection):
+    for column, default in (('wins', 0), ('losses', 0), ('draws', 0), ('rating', INITIAL_RATING)):
+        connection.execute(text('ALTER TABLE player ADD COLUMN {} INTEGER NOT NULL DEFAULT {}'.format(
+            column, default)))
+    _index(PlayerDB.__table__, 'ix_player_rating_id').create(connection)
+    # Counters of games finished before they existed. Ratings depend on the order of every game, they start over
+    counts = 'SELECT count(*) FROM player_game JOIN game ON game.id = player_game.game_id ' \
+             'WHERE player_game.player_id = player.id AND game.finished = :finished AND {}'
+    connection.execute(text('UPDATE player SET wins = ({}), losses = ({}), draws = ({})'.format(
+        counts.format('game.winner = player.name'),
+        counts.format('game.winner <> player.name'),
+        counts.format('game.winner IS NULL'))), {'finished': True})
+
+
+@migration(7, 'Add idempotency keys')
+def _add_idempotency_keys(connection: Connection):
+    IdempotencyKeyDB.__table__.create(connection)
+
+
+@migration(8, 'Make player names unique')
+def _unique_player_names(connection: Connection):
+    # Merges players sharing a name into the one created first, with the games, plays and results of all of them
+    first = '(SELECT min(same.id) FROM player same JOIN player dup ON dup.name = same.name WHERE dup.id = {})'
+    for table in ('player_game', 'play'):
+        connection.execute(text('UPDATE {0} SET player_id = {1} WHERE player_id NOT IN '
+                                '(SELECT min(id) FROM player GROUP BY name)'.format(
+                                    table, first.format(table + '.player_id'))))
+    connection.execute(text('UPDATE player SET wins = ({0}), losses = ({1}), draws = ({2}) WHERE id IN '
+                            '(SELECT min(id) FROM player GROUP BY name HAVING count(*) > 1)'.format(
+                                *('SELECT sum(same.{0}) FROM player same WHERE same.name = player.name'.format(column)
+                                  for column in ('wins', 'losses', 'draws')))))
+    connection.execute(text('DELETE FROM player WHERE id NOT IN (SELECT min(id) FROM player GROUP BY name)'))
+    connection.execute(text('DROP INDEX ix_player_name'))
+    _index(PlayerDB.__table__, 'ix_player_name').create(connection)
+
+
+@migration(9, 'Add game archive and last update')
+def _add_game_archive(connection: Connection):
+    if connection.dialect.name == 'sqlite':
+        # Archived games keep their ids, SQLite only stops reusing the highest ids with AUTOINCREMENT
+        _rebuild_sqlite_table(connection, GameDB.__table__)
+    else:
+        connection.execute(text('ALTER TABLE game ADD COLUMN updated_at TIMESTAMP'))
+        _index(GameDB.__table__, 'ix_game_finished_updated_at').create(connection)
+    connection.execute(text('UPDATE game SET updated_at = :now'), {'now': datetime.utcnow()})
+    for table in (GameArchiveDB.__table__, player_game_archive, PlayArchiveDB.__table__):
+        table.create(connection)
+
+
+@migration(10, 'Stop reusing play ids')
+def _add_play_autoincrement(connection: Connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    # Archived plays keep their ids, so new plays must not reuse the ids of the plays moved out of the table
+    _rebuild_sqlite_table(connection, PlayDB.__table__)
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'play'"))
+    connection.execute(text("INSERT INTO sqlite_sequence (name, seq) SELECT 'play', "
+                            "max((SELECT coalesce(max(id), 0) FROM play), "
+                            "(SELECT coalesce(max(id), 0) FROM play_archive))"))
@@ -1,11 +1,15 @@
-from sqlalchemy import String, Column, Integer, CHAR, ForeignKey, Boolean, Table
+from datetime import datetime
+
+from sqlalchemy import String, Column, Integer, CHAR, ForeignKey, Boolean, Table, Text, Index, LargeBinary, DateTime
 from sqlalchemy.orm import relationship
 
 from api.src.db.database import Base
+from api.src.engine.rating import INITIAL_RATING
 
 player_game = Table('player_game', Base.metadata,
                     Column('player_id', ForeignKey('player.id'), primary_key=True),
-                    Column('game_id', ForeignKey('game.id'), primary_key=True)
+                    Column('game_id', ForeignKey('game.id'), primary_key=True),
+                    Index('ix_player_game_game_id', 'game_id')
                     )
 
 
@@ -13,11 +17,19 @@ class PlayerDB(Base):
     __tablename__ = 'player'
 
     id = Column(Integer, primary_key=True)
-    name = Column(String(50), nullable=False)
+    name = Column(String(50), nullable=False, index=True, unique=True)
     symbol = Column(CHAR, nullable=False)
+    # Results of finished games and Elo rating, updated in the transaction that finishes each game
+    wins = Column(Integer, nullable=False, default=0, server_default='0')
+    losses = Column(Integer, nullable=False, default=0, server_default='0')
+    draws = Column(Integer, nullable=False, default=0, server_default='0')
+    rating = Column(Integer, nullable=False, default=INITIAL_RATING, server_default=str(INITIAL_RATING))
 
-    games = relationship('GameDB', cascade='all,delete', secondary=player_game, back_populates='players')
-    plays = relationship('PlayDB')
+    games = relationship('GameDB', secondary=player_game, back_populates='players')
+    plays = relationship('PlayDB', back_populates='player')
+
+    # Scanned backwards by the leaderboard, highest rating first
+    __table_args__ = (Index('ix_player_rating_id', rating, id),)
 
 
 class GameDB(Base):
@@ -25,18 +37,89 @@ class GameDB(Base):
     id = Column(Integer, primary_key=True)
     movements_played = Column(Integer, nullable=False)
     next_turn = Column(String(50))
-    board = Column(String(255), nullable=False)
+    board = Column(Text, nullable=False)
+    rows = Column(Integer, nullable=False, default=3)
+    columns = Column(Integer, nullable=False, default=3)
+    win_length = Column(Integer, nullable=False, default=3)
     winner = Column(String(50))
     finished = Column(Boolean, nullable=False)
+    version = Column(Integer, nullable=False)
+    # Ordered cell indexes of the plays, see api.src.engine.move_log
+    moves = Column(LargeBinary, nullable=False, default=b'')
+    # Last play or creation, abandoned games expire after a while without plays
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    players = relationship('PlayerDB', cascade='all,delete', secondary=player_game, back_populates='games')
+    players = relationship('PlayerDB', secondary=player_game, back_populates='games')
     plays = relationship('PlayDB')
 
+    # Archived games keep their ids, so SQLite must not reuse the ids of rows moved out of this table
+    __table_args__ = (Index('ix_game_finished_id', finished, id),
+                      Index('ix_game_finished_updated_at', finished, updated_at),
+                      {'sqlite_autoincrement': True})
+    # Updates only apply if the version is unchanged since the game was read, otherwise StaleDataError is raised
+    __mapper_args__ = {'version_id_col': version}
+
 
 class PlayDB(Base):
     __tablename__ = 'play'
     id = Column(Integer, primary_key=True)
-    game_id = Column(Integer, ForeignKey('game.id'))
+    game_id = Column(Integer, ForeignKey('game.id'), index=True)
+    player_id = Column(Integer, ForeignKey('player.id'), index=True)
+    row = Column(Integer, nullable=False)
+    column = Column(Integer, nullable=False)
+
+    player = relationship('PlayerDB', back_populates='plays')
+
+    # Archived plays keep their ids, so SQLite must not reuse the ids of rows moved out of this table
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+# Finished games are moved to the archive tables in batches by api.src.services.archive_service, so the tables
+# every play reads and writes only hold games being played. Archived rows keep their ids
+player_game_archive = Table('player_game_archive', Base.metadata,
+                            Column('player_id', ForeignKey('player.id'), primary_key=True),
+                            Column('game_id', ForeignKey('game_archive.id'), primary_key=True),
+                            Index('ix_player_game_archive_game_id', 'game_id')
+                            )
+
+
+class GameArchiveDB(Base):
+    __tablename__ = 'game_archive'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    movements_played = Column(Integer, nullable=False)
+    next_turn = Column(String(50))
+    board = Column(Text, nullable=False)
+    rows = Column(Integer, nullable=False)
+    columns = Column(Integer, nullable=False)
+    win_length = Column(Integer, nullable=False)
+    winner = Column(String(50))
+    finished = Column(Boolean, nullable=False)
+    version = Column(Integer, nullable=False)
+    moves = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime)
+
+    players = relationship('PlayerDB', secondary=player_game_archive)
+    plays = relationship('PlayArchiveDB')
+
+
+class PlayArchiveDB(Base):
+    __tablename__ = 'play_archive'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    game_id = Column(Integer, ForeignKey('game_archive.id'), index=True)
     player_id = Column(Integer, ForeignKey('player.id'))
     row = Column(Integer, nullable=False)
     column = Column(Integer, nullable=False)
+
+    player = relationship('PlayerDB')
+
+
+class IdempotencyKeyDB(Base):
+    __tablename__ = 'idempotency_key'
+    route = Column(String(50), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    # SHA-256 of the request body, a key reused with another request is rejected
+    request_hash = Column(String(64), nullable=False)
+    # Response of the first request, both null while it is being processed
+    status_code = Column(Integer)
+    body = Column(LargeBinary)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
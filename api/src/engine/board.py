@@ -0,0 +1,212 @@
+"""Compact bitboard representation of N x M, k-in-a-row boards."""
+import json
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+ROWS = 3
+COLUMNS = 3
+WIN_LENGTH = 3
+CELLS = ROWS * COLUMNS
+FULL_BOARD = (1 << CELLS) - 1
+MIN_BOARD_SIZE = 3
+MAX_BOARD_SIZE = 19
+# Stored boards have one character per cell, row by row, with players' symbols or EMPTY_CELL
+EMPTY_CELL = '-'
+
+# Row and column steps of the four lines crossing a cell
+_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=None)
+def win_masks(rows: int, columns: int, win_length: int) -> Tuple[int, ...]:
+    """
+    Returns the masks of every line of win_length cells in a board. Bit index of a cell is
+    (row * columns + column), both zero based
+    :param rows: board's rows
+    :param columns: board's columns
+    :param win_length: cells in a row needed to win
+    :return: tuple of masks
+    """
+    masks = []
+    for row in range(rows):
+        for column in range(columns):
+            for d_row, d_column in _DIRECTIONS:
+                last_row = row + d_row * (win_length - 1)
+                last_column = column + d_column * (win_length - 1)
+                if 0 <= last_row < rows and 0 <= last_column < columns:
+                    masks.append(sum(1 << ((row + d_row * step) * columns + column + d_column * step)
+                                     for step in range(win_length)))
+    return tuple(masks)
+
+
+WIN_MASKS = win_masks(ROWS, COLUMNS, WIN_LENGTH)
+
+
+class Board:
+    """
+    Board stored as one occupancy mask per player.
+    Players are identified by their index in the symbols sequence used to decode the board.
+    """
+    __slots__ = ('rows', 'columns', 'win_length', 'masks')
+
+    def __init__(self, masks: Sequence[int] = (0, 0), rows: int = ROWS, columns: int = COLUMNS,
+                 win_length: int = WIN_LENGTH):
+        self.rows = rows
+        self.columns = columns
+        self.win_length = win_length
+        self.masks = list(masks)
+
+    @property
+    def occupied(self) -> int:
+        return self.masks[0] | self.masks[1]
+
+    def cell_mask(self, row: int, column: int) -> int:
+        """
+        Returns the bit of a board cell
+        :param row: board's row, starting at 1
+        :param column: board's column, starting at 1
+        :return: cell's bit
+        """
+        return 1 << ((row - 1) * self.columns + column - 1)
+
+    def contains(self, row: int, column: int) -> bool:
+        return 0 < row <= self.rows and 0 < column <= self.columns
+
+    def is_free(self, row: int, column: int) -> bool:
+        """
+        Checks if a cell has not been played yet
+        :param row: board's row, starting at 1
+        :param column: board's column, starting at 1
+        :return: True if the cell is empty
+        """
+        return not self.occupied & self.cell_mask(row, column)
+
+    def play(self, player: int, row: int, column: int):
+        """
+        Marks a cell as played by a player
+        :param player: player's index
+        :param row: board's row, starting at 1
+        :param column: board's column, starting at 1
+        """
+        self.masks[player] |= self.cell_mask(row, column)
+
+    def is_winning_move(self, player: int, row: int, column: int) -> bool:
+        """
+        Checks if the lines crossing a player's last move have win_length cells in a row. Costs O(win_length)
+        :param player: player's index
+        :param row: row of the last move, starting at 1
+        :param column: column of the last move, starting at 1
+        :return: True if the move wins the game
+        """
+        mask = self.masks[player]
+        for d_row, d_column in _DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                current_row = row - 1 + sign * d_row
+                current_column = column - 1 + sign * d_column
+                while count < self.win_length and 0 <= current_row < self.rows \
+                        and 0 <= current_column < self.columns \
+                        and mask >> (current_row * self.columns + current_column) & 1:
+                    count += 1
+                    current_row += sign * d_row
+                    current_column += sign * d_column
+            if count >= self.win_length:
+                return True
+        return False
+
+    def is_winner(self, player: int) -> bool:
+        """
+        Checks if a player completed any line scanning the whole board
+        :param player: player's index
+        :return: True if the player has won
+        """
+        mask = self.masks[player]
+        for win_mask in win_masks(self.rows, self.columns, self.win_length):
+            if mask & win_mask == win_mask:
+                return True
+        return False
+
+    def winner(self) -> Optional[int]:
+        """
+        Returns the index of the player that completed a line, if any
+        :return: winner's index
+        """
+        for player in (0, 1):
+            if self.is_winner(player):
+                return player
+        return None
+
+    @classmethod
+    def decode(cls, board: str, symbols: Sequence[str], rows: int = ROWS, columns: int = COLUMNS,
+               win_length: int = WIN_LENGTH) -> 'Board':
+        """
+        Builds a board from its stored representation
+        :param board: saved board as str
+        :param symbols: players' symbols, its order defines players' indexes
+        :param rows: board's rows
+        :param columns: board's columns
+        :param win_length: cells in a row needed to win
+        :return: decoded board
+        """
+        reversed_board = board[::-1]
+        masks = []
+        for symbol in symbols:
+            table = {ord(cell): '0' for cell in symbols}
+            table[ord(EMPTY_CELL)] = '0'
+            table[ord(symbol)] = '1'
+            masks.append(int(reversed_board.translate(table), 2))
+        return cls(masks, rows, columns, win_length)
+
+    @classmethod
+    def from_rows(cls, rows: List[list], symbols: Sequence[Optional[str]], win_length: int = WIN_LENGTH) -> 'Board':
+        """
+        Builds a board from a list of rows
+        :param rows: list of rows with symbols or None
+        :param symbols: players' symbols, its order defines players' indexes
+        :param win_length: cells in a row needed to win
+        :return: board
+        """
+        masks = [0, 0]
+        bit = 1
+        for row in rows:
+            for cell in row:
+                if cell is not None:
+                    masks[symbols.index(cell)] |= bit
+                bit <<= 1
+        return cls(masks, len(rows), len(rows[0]) if rows else 0, win_length)
+
+    def encode(self, symbols: Sequence[str]) -> str:
+        """
+        Returns the board's representation to be stored
+        :param symbols: players' symbols, its order defines players' indexes
+        :return: board in str format
+        """
+        cells = [EMPTY_CELL] * (self.rows * self.columns)
+        for symbol, mask in zip(symbols, self.masks):
+            while mask:
+                bit = mask & -mask
+                cells[bit.bit_length() - 1] = symbol
+                mask ^= bit
+        return ''.join(cells)
+
+
+def empty_board(rows: int = ROWS, columns: int = COLUMNS) -> str:
+    """
+    Returns the stored representation of an empty board
+    :param rows: board's rows
+    :param columns: board's columns
+    :return: board in str format
+    """
+    return EMPTY_CELL * (rows * columns)
+
+
+def board_rows(board: str, rows: int = ROWS, columns: int = COLUMNS) -> str:
+    """
+    Returns a stored board as the API shows it, JSON rows of symbols with null in empty cells
+    :param board: stored board
+    :param rows: board's rows
+    :param columns: board's columns
+    :return: board's rows in JSON
+    """
+    return json.dumps([[None if cell == EMPTY_CELL else cell for cell in board[row * columns:(row + 1) * columns]]
+                       for row in range(rows)])
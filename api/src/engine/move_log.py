@@ -0,0 +1,61 @@
+"""Compact ordered move log: each move is its cell index, in one byte or two for boards over 256 cells."""
+from typing import List, Tuple
+
+from api.src.engine.board import Board
+
+
+def move_width(rows: int, columns: int) -> int:
+    """
+    Returns the bytes used by each move of a board
+    :param rows: board's rows
+    :param columns: board's columns
+    :return: bytes per move
+    """
+    return 1 if rows * columns <= 256 else 2
+
+
+def append_move(moves: bytes, row: int, column: int, rows: int, columns: int) -> bytes:
+    """
+    Returns the move log with a new move at its end
+    :param moves: current move log
+    :param row: board's row, starting at 1
+    :param column: board's column, starting at 1
+    :param rows: board's rows
+    :param columns: board's columns
+    :return: new move log
+    """
+    return moves + ((row - 1) * columns + column - 1).to_bytes(move_width(rows, columns), 'big')
+
+
+def decode_moves(moves: bytes, rows: int, columns: int) -> List[Tuple[int, int]]:
+    """
+    Returns the moves of a log in order
+    :param moves: move log
+    :param rows: board's rows
+    :param columns: board's columns
+    :return: list of row and column, starting at 1
+    """
+    width = move_width(rows, columns)
+    cells = moves if width == 1 else [int.from_bytes(moves[start:start + width], 'big')
+                                      for start in range(0, len(moves), width)]
+    return [(cell // columns + 1, cell % columns + 1) for cell in cells]
+
+
+def replay(moves: bytes, first_player: int, at: int, rows: int, columns: int, win_length: int) -> Tuple[Board, bool]:
+    """
+    Rebuilds the board after the first moves of a log. Players alternate starting with first_player
+    :param moves: move log
+    :param first_player: index of the player who made the first move
+    :param at: moves to apply
+    :param rows: board's rows
+    :param columns: board's columns
+    :param win_length: cells in a row needed to win
+    :return: board and whether its last move won the game
+    """
+    board = Board(rows=rows, columns=columns, win_length=win_length)
+    player = first_player
+    row = column = None
+    for row, column in decode_moves(moves[:at * move_width(rows, columns)], rows, columns):
+        board.play(player, row, column)
+        player = 1 - player
+    return board, bool(at) and board.is_winning_move(1 - player, row, column)
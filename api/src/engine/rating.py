@@ -0,0 +1,33 @@
+"""Elo ratings of players, updated after each finished game."""
+from typing import Tuple
+
+INITIAL_RATING = 1500
+# Largest rating change of a single game
+K_FACTOR = 32
+
+# Scores of a game from a player's point of view
+WIN_SCORE = 1.0
+DRAW_SCORE = 0.5
+LOSS_SCORE = 0.0
+
+
+def expected_score(rating: int, opponent_rating: int) -> float:
+    """
+    Returns the expected score of a player against an opponent
+    :param rating: player's rating
+    :param opponent_rating: opponent's rating
+    :return: expected score between 0 and 1
+    """
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def elo(rating: int, opponent_rating: int, score: float) -> Tuple[int, int]:
+    """
+    Returns both players' ratings after a game
+    :param rating: player's rating
+    :param opponent_rating: opponent's rating
+    :param score: player's score, WIN_SCORE, DRAW_SCORE or LOSS_SCORE
+    :return: player's and opponent's new ratings
+    """
+    change = round(K_FACTOR * (score - expected_score(rating, opponent_rating)))
+    return rating + change, opponent_rating - change
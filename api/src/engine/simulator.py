@@ -0,0 +1,214 @@
+"""
+Batched self-play with NumPy: every game of a batch is a row of a cells array and all of them advance one move
+per step. Win lines come from board.win_masks, the same definitions the game rules use.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from api.src.engine.board import COLUMNS, ROWS, WIN_LENGTH, win_masks
+from api.src.engine.solver import WIN, get_solver
+
+RANDOM = 'random'
+# Wins when it can, otherwise blocks the opponent's win, otherwise plays at random
+GREEDY = 'greedy'
+# Perfect play from the solver's table, choosing at random among equally good moves. 3x3 only
+PERFECT = 'perfect'
+POLICIES = (RANDOM, GREEDY, PERFECT)
+
+# Outcomes of a game, from the first player's point of view
+DRAWN, FIRST_WINS, SECOND_WINS = 0, 1, 2
+# Games simulated at once, bounds the arrays' memory
+BATCH_SIZE = 100000
+BITBOARD_CELLS = 63
+
+
+class Lines:
+    """Win lines of a board as cell indexes, and the lines crossing each cell"""
+
+    def __init__(self, rows: int, columns: int, win_length: int):
+        masks = win_masks(rows, columns, win_length)
+        self.cells = rows * columns
+        self.win_length = win_length
+        # One extra line made of an out-of-board cell that never wins, pads the lines crossing each cell
+        self.lines = np.array([[cell for cell in range(self.cells) if mask >> cell & 1] for mask in masks]
+                              + [[self.cells] * win_length], dtype=np.intp)
+        crossing = [[number for number, mask in enumerate(masks) if mask >> cell & 1] for cell in range(self.cells)]
+        width = max(map(len, crossing))
+        self.crossing = np.array([numbers + [len(masks)] * (width - len(numbers)) for numbers in crossing],
+                                 dtype=np.intp)
+        # Boards of up to 63 cells also check wins with the masks themselves, padded with a bit no cell sets
+        self.masks = np.array(masks + (1 << BITBOARD_CELLS,), dtype=np.uint64) \
+            if self.cells <= BITBOARD_CELLS else None
+
+
+@lru_cache(maxsize=None)
+def get_lines(rows: int, columns: int, win_length: int) -> Lines:
+    return Lines(rows, columns, win_length)
+
+
+def _padded(boards: np.ndarray) -> np.ndarray:
+    """Private function that adds the empty out-of-board cell referenced by the padding line"""
+    return np.concatenate([boards, np.zeros((len(boards), 1), dtype=boards.dtype)], axis=1)
+
+
+def _wins(boards: np.ndarray, lines: Lines, player: int, cells: np.ndarray) -> np.ndarray:
+    """
+    Private function that checks the lines crossing each game's last move, like Board.is_winning_move
+    :param boards: games' cells, 0 when empty or the player's number
+    :param lines: board's lines
+    :param player: player that moved
+    :param cells: cell played in each game
+    :return: True for the games the move won
+    """
+    line_cells = lines.lines[lines.crossing[cells]]
+    values = np.take_along_axis(_padded(boards), line_cells.reshape(len(boards), -1), axis=1)
+    return (values.reshape(line_cells.shape) == player).all(axis=2).any(axis=1)
+
+
+def _mask_wins(masks: np.ndarray, lines: Lines, cells: np.ndarray) -> np.ndarray:
+    """
+    Private function with the same check as _wins on the player's occupancy masks, for boards of up to 63 cells
+    :param masks: occupancy mask of the player that moved in each game
+    :param lines: board's lines
+    :param cells: cell played in each game
+    :return: True for the games the move won
+    """
+    win_masks = lines.masks[lines.crossing[cells]]
+    return ((masks[:, None] & win_masks) == win_masks).any(axis=1)
+
+
+def _greedy_scores(boards: np.ndarray, lines: Lines, player: int) -> np.ndarray:
+    """
+    Private function that scores the cells completing a line of the player (100) or of the opponent (10)
+    """
+    values = boards[:, lines.lines[:-1]]
+    empty = values == 0
+    one_missing = empty.sum(axis=2) == 1
+    scores = np.zeros(boards.shape, dtype=np.float32)
+    for owner, weight in ((3 - player, 10), (player, 100)):
+        completes = one_missing & ((values == owner).sum(axis=2) == lines.win_length - 1)
+        games, line, position = np.nonzero(empty & completes[:, :, None])
+        scores[games, lines.lines[line, position]] = weight
+    return scores
+
+
+@lru_cache(maxsize=None)
+def _perfect_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    solver = get_solver()
+    return (np.frombuffer(solver.values, dtype=np.int8), np.frombuffer(solver.distances, dtype=np.int8),
+            3 ** np.arange(ROWS * COLUMNS))
+
+
+def _perfect_scores(boards: np.ndarray, player: int) -> np.ndarray:
+    """
+    Private function that scores each cell with the solver's value after playing it: faster wins and slower
+    losses score higher
+    """
+    values, distances, powers = _perfect_tables()
+    # After the move the opponent is to move: its cells are digit 1 and the player's, with the move, digit 2
+    base = ((boards == 3 - player) + 2 * (boards == player)) @ powers
+    # Occupied cells overflow the table, they are clipped here and discarded by _choose
+    children = np.minimum(base[:, None] + 2 * powers[None, :], len(values) - 1)
+    value = -values[children].astype(np.float32)
+    distance = distances[children].astype(np.float32)
+    return value * 100 + np.where(value == WIN, -distance, distance)
+
+
+def _choose(boards: np.ndarray, lines: Lines, player: int, policy: str, generator: np.random.Generator) -> np.ndarray:
+    """
+    Private function that chooses the cell each game's player moves to
+    :return: cell index per game
+    """
+    scores = generator.random(boards.shape, dtype=np.float32)
+    if policy == GREEDY:
+        scores += _greedy_scores(boards, lines, player)
+    elif policy == PERFECT:
+        scores += _perfect_scores(boards, player)
+    return np.where(boards == 0, scores, -np.inf).argmax(axis=1)
+
+
+def simulate(games: int, first: str = RANDOM, second: str = RANDOM, rows: int = ROWS, columns: int = COLUMNS,
+             win_length: int = WIN_LENGTH, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Plays games between two policies. Openings rotate over every cell, so each one gets the same number of games
+    :param games: games to play
+    :param first: first player's policy
+    :param second: second player's policy
+    :param rows: board's rows
+    :param columns: board's columns
+    :param win_length: cells in a row needed to win
+    :param seed: random seed
+    :return: opening cell, outcome (DRAWN, FIRST_WINS or SECOND_WINS) and moves played of each game
+    """
+    if PERFECT in (first, second) and (rows, columns, win_length) != (ROWS, COLUMNS, WIN_LENGTH):
+        raise ValueError('Perfect play is only available on {}x{} boards'.format(ROWS, COLUMNS))
+    lines = get_lines(rows, columns, win_length)
+    generator = np.random.default_rng(seed)
+    openings = np.arange(games) % lines.cells
+    boards = np.zeros((games, lines.cells), dtype=np.int8)
+    outcomes = np.full(games, DRAWN, dtype=np.int8)
+    moves = np.zeros(games, dtype=np.int16)
+    masks = np.zeros((2, games), dtype=np.uint64) if lines.masks is not None else None
+    active = np.arange(games)
+
+    for step in range(lines.cells):
+        player = 1 + step % 2
+        current = boards[active]
+        cells = openings[active] if step == 0 else \
+            _choose(current, lines, player, first if player == 1 else second, generator)
+        current[np.arange(len(active)), cells] = player
+        boards[active] = current
+        moves[active] += 1
+        if masks is not None:
+            masks[player - 1, active] |= np.left_shift(np.uint64(1), cells.astype(np.uint64))
+        if step + 1 >= 2 * win_length - 1:
+            won = _mask_wins(masks[player - 1, active], lines, cells) if masks is not None \
+                else _wins(current, lines, player, cells)
+            outcomes[active[won]] = player
+            active = active[~won]
+        if not len(active):
+            break
+    return {'openings': openings, 'outcomes': outcomes, 'moves': moves}
+
+
+def opening_counts(games: int, first: str = RANDOM, second: str = RANDOM, rows: int = ROWS, columns: int = COLUMNS,
+                   win_length: int = WIN_LENGTH, seed: Optional[int] = None) -> np.ndarray:
+    """
+    Plays games in batches and counts their results per opening
+    :return: array with a row per cell: games, first player wins, second player wins, draws and moves played
+    """
+    cells = rows * columns
+    counts = np.zeros((cells, 5), dtype=np.int64)
+    seeds = np.random.SeedSequence(seed).spawn((games + BATCH_SIZE - 1) // BATCH_SIZE)
+    for batch, batch_seed in enumerate(seeds):
+        size = min(BATCH_SIZE, games - batch * BATCH_SIZE)
+        result = simulate(size, first, second, rows, columns, win_length, batch_seed)
+        openings, outcomes = result['openings'], result['outcomes']
+        counts[:, 0] += np.bincount(openings, minlength=cells)
+        for column, outcome in ((1, FIRST_WINS), (2, SECOND_WINS), (3, DRAWN)):
+            counts[:, column] += np.bincount(openings[outcomes == outcome], minlength=cells)
+        counts[:, 4] += np.bincount(openings, weights=result['moves'], minlength=cells).astype(np.int64)
+    return counts
+
+
+def parallel_opening_counts(games: int, first: str = RANDOM, second: str = RANDOM, rows: int = ROWS,
+                            columns: int = COLUMNS, win_length: int = WIN_LENGTH, seed: Optional[int] = None,
+                            workers: Optional[int] = None) -> np.ndarray:
+    """
+    Same as opening_counts, splitting the games across a pool of processes
+    :param workers: processes, defaults to the CPU count
+    :return: array with a row per cell: games, first player wins, second player wins, draws and moves played
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or games < 2 * BATCH_SIZE:
+        return opening_counts(games, first, second, rows, columns, win_length, seed)
+    shares = [games // workers + (number < games % workers) for number in range(workers)]
+    seeds = np.random.SeedSequence(seed).generate_state(workers)
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(opening_counts, share, first, second, rows, columns, win_length, int(share_seed))
+                   for share, share_seed in zip(shares, seeds)]
+        return sum(future.result() for future in futures)
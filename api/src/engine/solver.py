@@ -0,0 +1,190 @@
+"""Perfect-play solver backed by a precomputed table of every tic-tac-toe position."""
+import logging
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from api.src.engine.board import CELLS, COLUMNS, FULL_BOARD, WIN_MASKS
+
+logger = logging.getLogger(__name__)
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+UNKNOWN = -128
+
+# Cell permutations of the 8 board symmetries: rotations and their mirrored versions
+_ROTATE = [(COLUMNS - 1 - cell % COLUMNS) * COLUMNS + cell // COLUMNS for cell in range(CELLS)]
+_MIRROR = [(cell // COLUMNS) * COLUMNS + COLUMNS - 1 - cell % COLUMNS for cell in range(CELLS)]
+
+
+def _symmetries() -> List[List[int]]:
+    permutations = []
+    permutation = list(range(CELLS))
+    for _ in range(4):
+        permutations.append(permutation)
+        permutations.append([_MIRROR[cell] for cell in permutation])
+        permutation = [_ROTATE[cell] for cell in permutation]
+    return permutations
+
+
+def _transform_table(permutation: List[int]) -> List[int]:
+    table = []
+    for mask in range(FULL_BOARD + 1):
+        transformed = 0
+        for cell in range(CELLS):
+            if mask >> cell & 1:
+                transformed |= 1 << permutation[cell]
+        table.append(transformed)
+    return table
+
+
+SYMMETRIES = [_transform_table(permutation) for permutation in _symmetries()]
+# Base 3 contribution of each mask, a position's index is _BASE3[mine] + 2 * _BASE3[theirs]
+_BASE3 = [sum(3 ** cell for cell in range(CELLS) if mask >> cell & 1) for mask in range(FULL_BOARD + 1)]
+TABLE_SIZE = 3 ** CELLS
+
+
+def position_index(mine: int, theirs: int) -> int:
+    """
+    Returns the table index of a position
+    :param mine: mask of the player to move
+    :param theirs: mask of the opponent
+    :return: position's index
+    """
+    return _BASE3[mine] + 2 * _BASE3[theirs]
+
+
+def _is_win(mask: int) -> bool:
+    for win_mask in WIN_MASKS:
+        if mask & win_mask == win_mask:
+            return True
+    return False
+
+
+def _better(candidate: Tuple[int, int], best: Optional[Tuple[int, int]]) -> bool:
+    """
+    Private function to compare (value, distance) outcomes: wins as fast as possible, losses as late as possible
+    """
+    if best is None or candidate[0] != best[0]:
+        return best is None or candidate[0] > best[0]
+    return candidate[1] < best[1] if candidate[0] == WIN else candidate[1] > best[1]
+
+
+class Solver:
+    """
+    Table with the game-theoretic value and distance to the end of every reachable position, seen from the
+    player to move. Positions are solved once per symmetry class and then expanded, so a lookup is an index
+    calculation.
+    """
+
+    def __init__(self):
+        started = time.perf_counter()
+        self.values = array('b', [UNKNOWN]) * TABLE_SIZE
+        self.distances = array('b', [0]) * TABLE_SIZE
+        self._solved: Dict[int, Tuple[int, int, Tuple[int, int]]] = {}
+        self._solve(0, 0)
+        self.canonical_positions = len(self._solved)
+        self._expand()
+        del self._solved
+        self.positions = sum(1 for value in self.values if value != UNKNOWN)
+        self.build_seconds = time.perf_counter() - started
+        self.table_bytes = self.values.itemsize * len(self.values) + self.distances.itemsize * len(self.distances)
+
+    def _canonical(self, mine: int, theirs: int) -> int:
+        return min(position_index(symmetry[mine], symmetry[theirs]) for symmetry in SYMMETRIES)
+
+    def _solve(self, mine: int, theirs: int) -> Tuple[int, int]:
+        """
+        Private negamax over canonical positions
+        :param mine: mask of the player to move
+        :param theirs: mask of the opponent
+        :return: value and distance to the end for the player to move
+        """
+        key = self._canonical(mine, theirs)
+        if key in self._solved:
+            return self._solved[key][2]
+
+        if _is_win(theirs):
+            result = (LOSS, 0)
+        elif mine | theirs == FULL_BOARD:
+            result = (DRAW, 0)
+        else:
+            result = None
+            free = FULL_BOARD & ~(mine | theirs)
+            while free:
+                bit = free & -free
+                free ^= bit
+                value, distance = self._solve(theirs, mine | bit)
+                candidate = (-value, distance + 1)
+                if _better(candidate, result):
+                    result = candidate
+
+        self._solved[key] = (mine, theirs, result)
+        return result
+
+    def _expand(self):
+        """
+        Private function that writes every solved position's symmetric images into the lookup table
+        """
+        for mine, theirs, result in self._solved.values():
+            for symmetry in SYMMETRIES:
+                index = position_index(symmetry[mine], symmetry[theirs])
+                self.values[index], self.distances[index] = result
+
+    def lookup(self, mine: int, theirs: int) -> Tuple[int, int]:
+        """
+        Returns the value and distance to the end of a position
+        :param mine: mask of the player to move
+        :param theirs: mask of the opponent
+        :return: value (UNKNOWN if not reachable) and distance
+        """
+        index = _BASE3[mine] + 2 * _BASE3[theirs]
+        return self.values[index], self.distances[index]
+
+    def best_move(self, mine: int, theirs: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Returns the best move of the player to move
+        :param mine: mask of the player to move
+        :param theirs: mask of the opponent
+        :return: row and column starting at 1, value and distance after playing it, None if the game ended
+        """
+        if _is_win(mine) or _is_win(theirs):
+            return None
+
+        best = None
+        best_cell = None
+        for cell in range(CELLS):
+            bit = 1 << cell
+            if (mine | theirs) & bit:
+                continue
+            value, distance = self.lookup(theirs, mine | bit)
+            candidate = (-value, distance + 1)
+            if _better(candidate, best):
+                best, best_cell = candidate, cell
+
+        if best_cell is None:
+            return None
+        return best_cell // COLUMNS + 1, best_cell % COLUMNS + 1, best[0], best[1]
+
+
+_solver: Optional[Solver] = None
+# Requests that arrive while the startup build runs wait for it instead of building the table again
+_solver_lock = threading.Lock()
+
+
+def get_solver() -> Solver:
+    """
+    Returns the shared solver, building its table on first use
+    :return: solver
+    """
+    global _solver
+    if _solver is None:
+        with _solver_lock:
+            if _solver is None:
+                solver = Solver()
+                logger.info('Solver table built in %.3fs: %s positions (%s canonical), %s bytes',
+                            solver.build_seconds, solver.positions, solver.canonical_positions, solver.table_bytes)
+                _solver = solver
+    return _solver
@@ -1,17 +1,39 @@
 from typing import Optional, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, constr, validator
 
-from api.src.entities.schemas import Player
+from api.src.engine.board import COLUMNS, MAX_BOARD_SIZE, MIN_BOARD_SIZE, ROWS, WIN_LENGTH
+from api.src.entities.schemas import Player, symbol_not_empty_cell
 
 
 class GameRequest(BaseModel):
     players: List[Player]
     starting_player: Optional[str] = None
+    rows: int = Field(ROWS, ge=MIN_BOARD_SIZE, le=MAX_BOARD_SIZE)
+    columns: int = Field(COLUMNS, ge=MIN_BOARD_SIZE, le=MAX_BOARD_SIZE)
+    win_length: int = Field(WIN_LENGTH, ge=MIN_BOARD_SIZE, le=MAX_BOARD_SIZE)
 
 
 class SubmitPlay(BaseModel):
     game_id: int
     player_name: str
-    row: int = Field(gt=0, lt=4)
-    column: int = Field(gt=0, lt=4)
+    row: int = Field(gt=0, le=MAX_BOARD_SIZE)
+    column: int = Field(gt=0, le=MAX_BOARD_SIZE)
+
+
+class SubmitPlays(BaseModel):
+    plays: List[SubmitPlay] = Field(min_items=1, max_items=1000)
+
+
+class EvaluateRequest(BaseModel):
+    board: List[List[Optional[constr(max_length=1)]]]
+    next_symbol: constr(min_length=1, max_length=1)
+
+
+class MatchRequest(BaseModel):
+    name: str
+    symbol: Optional[constr(max_length=1)] = None
+    # Seconds to wait for an opponent before giving up
+    max_wait: float = Field(30, gt=0, le=300)
+
+    _symbol = validator('symbol', allow_reuse=True)(symbol_not_empty_cell)
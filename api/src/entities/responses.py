@@ -12,3 +12,78 @@ class GameResponse(BaseModel):
     next_turn: str
     board: List[list]
     winner: Optional[str] = None
+
+
+class BestMoveResponse(BaseModel):
+    row: int
+    column: int
+    result: str
+    moves_to_end: int
+
+
+class EvaluationResponse(BaseModel):
+    result: str
+    moves_to_end: int
+    best_move: Optional[BestMoveResponse] = None
+
+
+class ReplayResponse(BaseModel):
+    game_id: int
+    at: int
+    board: str
+    next_turn: str
+    winner: Optional[str] = None
+
+
+class PlayResult(BaseModel):
+    game_id: int
+    status_code: int
+    detail: Optional[str] = None
+    board: Optional[str] = None
+    movements_played: Optional[int] = None
+    next_turn: Optional[str] = None
+    winner: Optional[str] = None
+    finished: Optional[bool] = None
+
+
+class GameEvent(BaseModel):
+    game_id: int
+    board: str
+    movements_played: int
+    next_turn: str
+    winner: Optional[str] = None
+    finished: bool
+
+
+class OpeningStats(BaseModel):
+    row: int
+    column: int
+    games: int
+    first_wins: int
+    second_wins: int
+    draws: int
+    first_win_rate: float
+    second_win_rate: float
+    draw_rate: float
+    average_moves: float
+
+
+class OpeningStatsResponse(BaseModel):
+    rows: int
+    columns: int
+    win_length: int
+    first_policy: str
+    second_policy: str
+    games: int
+    openings: List[OpeningStats]
+
+
+class PlayerStats(BaseModel):
+    id: int
+    name: str
+    symbol: str
+    wins: int
+    losses: int
+    draws: int
+    games: int
+    rating: int
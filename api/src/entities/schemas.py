@@ -1,12 +1,28 @@
 from typing import Optional, List
 
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, constr, validator
+
+from api.src.engine.board import COLUMNS, EMPTY_CELL, ROWS, WIN_LENGTH, board_rows, empty_board
+
+
+def symbol_not_empty_cell(symbol: Optional[str]) -> Optional[str]:
+    """
+    Validates a player's symbol is not the one boards use for empty cells
+    :param symbol: player's symbol
+    :return: symbol
+    :raises ValueError: if it is the empty cell's symbol
+    """
+    if symbol == EMPTY_CELL:
+        raise ValueError("'{}' is not a valid symbol".format(EMPTY_CELL))
+    return symbol
 
 
 class Player(BaseModel):
     name: str
     symbol: Optional[constr(max_length=1)] = None
 
+    _symbol = validator('symbol', allow_reuse=True)(symbol_not_empty_cell)
+
     class Config:
         orm_mode = True
 
@@ -16,7 +32,11 @@ class Game(BaseModel):
     players: List[Player]
     movements_played: int
     next_turn: str
-    board: str = '[[null, null, null], [null, null, null], [null, null, null]]'
+    # JSON rows of the board, see board_rows. Games being played keep the stored board, see CachedGame
+    board: str = board_rows(empty_board())
+    rows: int = ROWS
+    columns: int = COLUMNS
+    win_length: int = WIN_LENGTH
     winner: Optional[str] = None
 
     class Config:
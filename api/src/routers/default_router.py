@@ -1,8 +1,66 @@
 from fastapi import APIRouter
 
+from api.src.db import database
+from api.src.engine.solver import get_solver
+from api.src.services.archive_service import game_archiver
+from api.src.services.game_cache import game_cache
+from api.src.services.game_snapshots import game_snapshots
+from api.src.services.idempotency import idempotency_store
+from api.src.services.player_service import player_cache
+
 router = APIRouter(prefix='/default', tags=['Default'])
 
 
 @router.get('/', status_code=200, tags=['Default'])
 async def ping() -> dict:
     return {'message': 'pong!'}
+
+
+@router.get('/solver', status_code=200, tags=['Default'])
+async def solver_stats() -> dict:
+    solver = get_solver()
+    return {'build_seconds': solver.build_seconds,
+            'positions': solver.positions,
+            'canonical_positions': solver.canonical_positions,
+            'table_bytes': solver.table_bytes}
+
+
+@router.get('/pool', status_code=200, tags=['Default'])
+async def pool_status() -> dict:
+    pools = {'sync': database.engine.pool.status_dict(),
+             'async': database.async_engine.sync_engine.pool.status_dict()}
+    if database.read_engine:
+        pools['read'] = database.read_engine.pool.status_dict()
+    if database.async_read_engine:
+        pools['async_read'] = database.async_read_engine.sync_engine.pool.status_dict()
+    return pools
+
+
+@router.get('/queries', status_code=200, tags=['Default'])
+async def query_stats() -> dict:
+    return {name: stats.as_dict() for name, stats in database.ENGINE_QUERIES.items()}
+
+
+@router.get('/cache', status_code=200, tags=['Default'])
+async def cache_stats() -> dict:
+    return game_cache.stats()
+
+
+@router.get('/snapshots', status_code=200, tags=['Default'])
+async def snapshots_stats() -> dict:
+    return game_snapshots.stats()
+
+
+@router.get('/idempotency', status_code=200, tags=['Default'])
+async def idempotency_stats() -> dict:
+    return idempotency_store.stats()
+
+
+@router.get('/players', status_code=200, tags=['Default'])
+async def player_cache_stats() -> dict:
+    return player_cache.stats()
+
+
+@router.get('/archive', status_code=200, tags=['Default'])
+async def archive_stats() -> dict:
+    return game_archiver.stats()
@@ -1,42 +1,151 @@
-from typing import List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.src.db.database import get_db
-from api.src.entities.requests import GameRequest, SubmitPlay
+from api.src.db.database import get_async_db
+from api.src.entities.requests import EvaluateRequest, GameRequest, SubmitPlay, SubmitPlays
+from api.src.entities.responses import BestMoveResponse, EvaluationResponse, PlayResult, ReplayResponse
 from api.src.entities.schemas import Game, PlayResponse
-from api.src.services.game_service import GameService
+from api.src.services.events import game_events
+from api.src.services.game_service import AsyncGameService
+from api.src.services.game_snapshots import etag_matches, game_snapshots
+from api.src.services.idempotency import AsyncIdempotencyService, IDEMPOTENT_REPLAYED_HEADER, MAX_KEY_LENGTH
+from api.src.services.pagination import NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix='/game', tags=['Game'])
 
+# Seconds between SSE comments that keep idle connections open through proxies
+KEEP_ALIVE_SECONDS = 15
+
+
+async def _idempotent(db: AsyncSession, route: str, key: Optional[str], request: BaseModel, status_code: int,
+                      call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Private function that runs a request once per Idempotency-Key, retries get the first response back
+    :return: call's result when no key was sent, otherwise the stored response
+    """
+    if key is None:
+        return await call()
+    stored, replayed = await AsyncIdempotencyService(db).execute(route, key, request, status_code, call)
+    return Response(stored.body, status_code=stored.status_code, media_type='application/json',
+                    headers={IDEMPOTENT_REPLAYED_HEADER: str(replayed).lower()})
+
 
 @router.post('/new', response_model=Game, status_code=201)
-async def new_game(game_request: GameRequest, db: Session = Depends(get_db)):
-    return GameService(db).begin_game(game_request)
+async def new_game(game_request: GameRequest, db: AsyncSession = Depends(get_async_db),
+                   idempotency_key: Optional[str] = Header(None, max_length=MAX_KEY_LENGTH)):
+    return await _idempotent(db, 'POST /game/new', idempotency_key, game_request, 201,
+                             lambda: AsyncGameService(db).begin_game(game_request))
 
 
 @router.get('/all', response_model=List[Game], status_code=200)
-async def get_all_games(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
-                        finished: Optional[bool] = None):
-    return GameService(db).get_all_games(skip, limit, finished)
+async def get_all_games(response: Response, skip: int = 0, limit: int = 100,
+                        db: AsyncSession = Depends(get_async_db), finished: Optional[bool] = None,
+                        after: Optional[str] = None):
+    games, cursor = await AsyncGameService(db).get_all_games(skip, limit, finished, after)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return games
+
+
+@router.get('/export', status_code=200)
+async def export_games(finished: Optional[bool] = None, min_id: Optional[int] = None, max_id: Optional[int] = None,
+                       db: AsyncSession = Depends(get_async_db)):
+    return StreamingResponse(AsyncGameService(db).export_games(finished, min_id, max_id),
+                             media_type='application/x-ndjson')
+
+
+@router.post('/evaluate', response_model=EvaluationResponse, status_code=200)
+async def evaluate(evaluate_request: EvaluateRequest, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncGameService(db).evaluate(evaluate_request)
+
+
+@router.get('/{game_id}/best-move', response_model=BestMoveResponse, status_code=200)
+async def get_best_move(game_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncGameService(db).get_best_move(game_id)
+
+
+@router.get('/{game_id}/replay', response_model=ReplayResponse, status_code=200)
+async def replay_game(game_id: int, at: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncGameService(db).replay_game(game_id, at)
+
+
+@router.websocket('/{game_id}/ws')
+async def game_updates_ws(websocket: WebSocket, game_id: int):
+    """Sends the game's new board, turn and winner after each play. Subscribe before reading the game's state"""
+    await websocket.accept()
+    queue = game_events.subscribe(game_id)
+    receiver = asyncio.ensure_future(websocket.receive_text())
+    try:
+        while True:
+            sender = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                sender.cancel()
+                receiver.result()
+                receiver = asyncio.ensure_future(websocket.receive_text())
+                continue
+            await websocket.send_text(sender.result().json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        game_events.unsubscribe(game_id, queue)
+
+
+@router.get('/{game_id}/events', status_code=200)
+async def game_updates_sse(game_id: int, request: Request):
+    """Server-sent events with the game's new board, turn and winner after each play"""
+    queue = game_events.subscribe(game_id)
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield 'data: {}\n\n'.format(event.json())
+        finally:
+            game_events.unsubscribe(game_id, queue)
+
+    return StreamingResponse(stream(), media_type='text/event-stream')
 
 
 @router.get('/{game_id}', response_model=Game, status_code=200)
-async def get_game(game_id: int, db: Session = Depends(get_db)):
-    return GameService(db).get_game(game_id)
+async def get_game(game_id: int, if_none_match: Optional[str] = Header(None),
+                   db: AsyncSession = Depends(get_async_db)):
+    """Answers 304 Not Modified when If-None-Match has the game's current ETag, without reading the game"""
+    snapshot = game_snapshots.get(game_id)
+    if snapshot is None or (snapshot.body is None and not etag_matches(if_none_match, snapshot.etag)):
+        snapshot = await AsyncGameService(db).get_game_snapshot(game_id)
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers={'ETag': snapshot.etag})
+    return Response(snapshot.body, media_type='application/json', headers={'ETag': snapshot.etag})
 
 
 @router.post('/submit-play', response_model=Game, status_code=201)
-async def submit_play(move: SubmitPlay, db: Session = Depends(get_db)):
-    return GameService(db).submit_play(move)
+async def submit_play(move: SubmitPlay, db: AsyncSession = Depends(get_async_db),
+                      idempotency_key: Optional[str] = Header(None, max_length=MAX_KEY_LENGTH)):
+    return await _idempotent(db, 'POST /game/submit-play', idempotency_key, move, 201,
+                             lambda: AsyncGameService(db).submit_play(move))
+
+
+@router.post('/submit-plays', response_model=List[PlayResult], status_code=200)
+async def submit_plays(plays: SubmitPlays, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncGameService(db).submit_plays(plays)
 
 
 @router.get('/movements/{game_id}', response_model=List[PlayResponse], status_code=200)
-async def get_game_movements(game_id: int, db: Session = Depends(get_db)):
-    return GameService(db).get_game_movements(game_id)
+async def get_game_movements(game_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncGameService(db).get_game_movements(game_id)
 
 
 @router.delete('/{game_id}', response_model=Game, status_code=200)
-async def delete_game(game_id: int, db: Session = Depends(get_db)):
-    return GameService(db).delete_game(game_id)
+async def delete_game(game_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncGameService(db).delete_game(game_id)
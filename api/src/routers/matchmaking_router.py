@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Response
+
+from api.src.entities.requests import MatchRequest
+from api.src.entities.schemas import Game
+from api.src.services.matchmaking import matchmaker
+
+router = APIRouter(prefix='/matchmaking', tags=['Matchmaking'])
+
+
+@router.post('/join', response_model=Game, status_code=201)
+async def join(match_request: MatchRequest):
+    return await matchmaker.join(match_request)
+
+
+@router.get('/status', status_code=200)
+async def get_status():
+    return matchmaker.status()
+
+
+@router.delete('/{player_name}', status_code=204)
+async def leave(player_name: str):
+    matchmaker.leave(player_name)
+    return Response(status_code=204)
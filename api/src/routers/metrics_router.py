@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from api.src.services.metrics import metrics_text
+
+router = APIRouter(tags=['Metrics'])
+
+
+@router.get('/metrics', status_code=200)
+async def metrics() -> Response:
+    return Response(metrics_text(), media_type=CONTENT_TYPE_LATEST)
@@ -1,25 +1,41 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, status, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, status, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.src.db.database import get_db
+from api.src.db.database import get_async_db
+from api.src.entities.responses import PlayerStats
 from api.src.entities.schemas import Player
-from api.src.services.player_service import PlayerService
+from api.src.services.pagination import NEXT_CURSOR_HEADER
+from api.src.services.player_service import AsyncPlayerService
 
 router = APIRouter(prefix='/player', tags=['Player'])
 
 
 @router.get('/all', response_model=List[Player], status_code=200)
-async def get_all_players(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return PlayerService(db).get_all_players(skip, limit)
+async def get_all_players(response: Response, skip: int = 0, limit: int = 100,
+                          db: AsyncSession = Depends(get_async_db), after: Optional[str] = None):
+    players, cursor = await AsyncPlayerService(db).get_all_players(skip, limit, after)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return players
+
+
+@router.get('/leaderboard', response_model=List[PlayerStats], status_code=200)
+async def get_leaderboard(limit: int = Query(10, gt=0, le=100), db: AsyncSession = Depends(get_async_db)):
+    return await AsyncPlayerService(db).get_leaderboard(limit)
+
+
+@router.get('/{player_id}/stats', response_model=PlayerStats, status_code=200)
+async def get_player_stats(player_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncPlayerService(db).get_player_stats(player_id)
 
 
 @router.get('/{player_id}')
-async def get_player(player_id: int, db: Session = Depends(get_db)):
-    return PlayerService(db).get_player(player_id)
+async def get_player(player_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncPlayerService(db).get_player(player_id)
 
 
 @router.post('/add', response_model=Player, status_code=status.HTTP_201_CREATED)
-async def create_player(player: Player, db: Session = Depends(get_db)):
-    return PlayerService(db).add_player(player)
+async def create_player(player: Player, db: AsyncSession = Depends(get_async_db)):
+    return await AsyncPlayerService(db).add_player(player)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query, Response
+
+from api.src.engine.board import COLUMNS, MAX_BOARD_SIZE, MIN_BOARD_SIZE, ROWS, WIN_LENGTH
+from api.src.engine.simulator import RANDOM
+from api.src.entities.responses import OpeningStatsResponse
+from api.src.services.stats_service import stats_service
+
+router = APIRouter(prefix='/stats', tags=['Stats'])
+
+
+@router.get('/openings', response_model=OpeningStatsResponse, status_code=200)
+async def get_openings(response: Response, games: int = Query(100000, gt=0, le=1000000),
+                       first: str = RANDOM, second: str = RANDOM,
+                       rows: int = Query(ROWS, ge=MIN_BOARD_SIZE, le=MAX_BOARD_SIZE),
+                       columns: int = Query(COLUMNS, ge=MIN_BOARD_SIZE, le=MAX_BOARD_SIZE),
+                       win_length: int = Query(WIN_LENGTH, ge=MIN_BOARD_SIZE, le=MAX_BOARD_SIZE)):
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return await stats_service.get_openings(games, first, second, rows, columns, win_length)
@@ -0,0 +1,136 @@
+"""
+Background maintenance of the game tables: finished games are moved to the archive tables in batches and
+unfinished games abandoned for longer than ABANDONED_GAME_TTL_HOURS are deleted in batches.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from api.src.db.crud import Crud
+from api.src.db.database import AsyncSessionLocal
+from api.src.services.events import publish_eviction
+from api.src.services.game_cache import game_cache
+from api.src.services.game_snapshots import game_snapshots
+from api.src.services.service_interface import AppService, AsyncAppService
+
+logger = logging.getLogger(__name__)
+
+# Games moved or deleted per transaction
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv('ARCHIVE_INTERVAL_SECONDS', 60))
+# Hours without plays after which unfinished games are deleted, 0 keeps them
+ABANDONED_GAME_TTL = timedelta(hours=float(os.getenv('ABANDONED_GAME_TTL_HOURS', 24)))
+
+
+class ArchiveService(AppService):
+    def __init__(self, db: Session):
+        super().__init__(db)
+        self._crud = Crud(db)
+
+    def archive_finished_games(self, batch_size: int = ARCHIVE_BATCH_SIZE) -> List[int]:
+        """
+        Moves a batch of finished games to the archive tables
+        :param batch_size: max games to move
+        :return: ids of the games archived
+        """
+        return self._crud.archive_finished_games(batch_size)
+
+    def expire_abandoned_games(self, ttl: timedelta = ABANDONED_GAME_TTL,
+                               batch_size: int = ARCHIVE_BATCH_SIZE) -> List[int]:
+        """
+        Deletes a batch of unfinished games without plays for longer than the ttl
+        :param ttl: time without plays
+        :param batch_size: max games to delete
+        :return: ids of the games deleted
+        """
+        game_ids = self._crud.delete_abandoned_games(datetime.utcnow() - ttl, batch_size)
+        for game_id in game_ids:
+            game_cache.evict(game_id)
+            game_snapshots.evict(game_id)
+        return game_ids
+
+
+class AsyncArchiveService(AsyncAppService):
+    service_class = ArchiveService
+
+    async def archive_finished_games(self, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+        game_ids = await self._run(lambda service: service.archive_finished_games(batch_size))
+        await publish_eviction(game_ids)
+        return len(game_ids)
+
+    async def expire_abandoned_games(self, ttl: timedelta = ABANDONED_GAME_TTL,
+                                     batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+        game_ids = await self._run(lambda service: service.expire_abandoned_games(ttl, batch_size))
+        await publish_eviction(game_ids)
+        return len(game_ids)
+
+
+class GameArchiver:
+    """
+    Runs the archive and expiry batches every ARCHIVE_INTERVAL_SECONDS, each batch in its own short transaction
+    so plays are never blocked for long
+    """
+
+    def __init__(self, batch_size: int = ARCHIVE_BATCH_SIZE, ttl: timedelta = ABANDONED_GAME_TTL):
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self._task: Optional[asyncio.Task] = None
+        self.archived = 0
+        self.expired = 0
+        self.last_run_seconds = None
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self._run_periodically())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def run_once(self) -> dict:
+        """
+        Archives every finished game and deletes every abandoned one, in batches
+        :return: games archived and deleted
+        """
+        started = time.perf_counter()
+        archived = expired = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                moved = await AsyncArchiveService(db).archive_finished_games(self.batch_size)
+            archived += moved
+            if moved < self.batch_size:
+                break
+        while self.ttl:
+            async with AsyncSessionLocal() as db:
+                deleted = await AsyncArchiveService(db).expire_abandoned_games(self.ttl, self.batch_size)
+            expired += deleted
+            if deleted < self.batch_size:
+                break
+        self.archived += archived
+        self.expired += expired
+        self.last_run_seconds = time.perf_counter() - started
+        return {'archived': archived, 'expired': expired}
+
+    def stats(self) -> dict:
+        return {'archived': self.archived,
+                'expired': self.expired,
+                'batch_size': self.batch_size,
+                'abandoned_game_ttl_hours': self.ttl.total_seconds() / 3600,
+                'last_run_seconds': self.last_run_seconds}
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                result = await self.run_once()
+                if any(result.values()):
+                    logger.info('Archived %(archived)s finished games, deleted %(expired)s abandoned games', result)
+            except Exception:
+                logger.exception('Could not archive games')
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+
+game_archiver = GameArchiver()
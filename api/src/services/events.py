@@ -0,0 +1,172 @@
+"""
+Publish/subscribe of game updates, fanned out in process to WebSocket and SSE subscribers, and of the games deleted
+or archived, so other workers drop their cached copies.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from api.src.db import database
+from api.src.entities.responses import GameEvent
+from api.src.services.game_cache import game_cache
+from api.src.services.game_snapshots import game_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Events queued per subscriber, the oldest ones are dropped when a subscriber falls behind
+SUBSCRIBER_QUEUE_SIZE = 16
+CHANNEL = 'game_events'
+# Identifies this process' events, so events from other workers can invalidate local caches
+ORIGIN = uuid.uuid4().hex
+# Game ids per eviction notification, PostgreSQL payloads must stay under 8000 bytes
+EVICTION_CHUNK = 500
+
+
+class GameEvents:
+    """In-process fan-out of game events to the queues subscribed to each game"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, game_id: int) -> asyncio.Queue:
+        """
+        Subscribes to a game's events
+        :param game_id: game to follow
+        :return: queue that receives the game's events
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[game_id].add(queue)
+        return queue
+
+    def unsubscribe(self, game_id: int, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(game_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[game_id]
+
+    def subscribers(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def dispatch(self, event: GameEvent, origin: str = ORIGIN):
+        """
+        Delivers an event to the game's local subscribers
+        :param event: game event
+        :param origin: process that published the event
+        """
+        if origin != ORIGIN:
+            game_cache.evict(event.game_id)
+            game_snapshots.evict(event.game_id)
+        for queue in self._subscribers.get(event.game_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @staticmethod
+    def evict(game_ids: List[int], origin: str = ORIGIN):
+        """
+        Drops the cached copies of games deleted or archived by another process
+        :param game_ids: ids of the games
+        :param origin: process that deleted or archived the games, which already evicted them
+        """
+        if origin != ORIGIN:
+            for game_id in game_ids:
+                game_cache.evict(game_id)
+                game_snapshots.evict(game_id)
+
+
+class MemoryBroker:
+    """Broker for a single process, events go straight to the local fan-out"""
+
+    def __init__(self, events: GameEvents):
+        self._events = events
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, event: GameEvent):
+        self._events.dispatch(event)
+
+    async def publish_eviction(self, game_ids: List[int]):
+        self._events.evict(game_ids)
+
+
+class PostgresBroker:
+    """Broker across workers with PostgreSQL LISTEN/NOTIFY, every worker fans out the events it is notified of"""
+
+    def __init__(self, events: GameEvents, dsn: str):
+        self._events = events
+        self._dsn = dsn
+        self._listener = None
+        self._publishers = None
+
+    async def start(self):
+        import asyncpg
+
+        self._listener = await asyncpg.connect(self._dsn)
+        await self._listener.add_listener(CHANNEL, self._notified)
+        self._publishers = await asyncpg.create_pool(self._dsn, min_size=1, max_size=4)
+
+    async def stop(self):
+        if self._listener:
+            await self._listener.close()
+        if self._publishers:
+            await self._publishers.close()
+
+    def _notified(self, connection, pid: int, channel: str, payload: str):
+        message = json.loads(payload)
+        if 'evicted' in message:
+            self._events.evict(message['evicted'], message['origin'])
+        else:
+            self._events.dispatch(GameEvent(**message['event']), message['origin'])
+
+    async def publish(self, event: GameEvent):
+        await self._notify({'origin': ORIGIN, 'event': event.dict()})
+
+    async def publish_eviction(self, game_ids: List[int]):
+        for start in range(0, len(game_ids), EVICTION_CHUNK):
+            await self._notify({'origin': ORIGIN, 'evicted': game_ids[start:start + EVICTION_CHUNK]})
+
+    async def _notify(self, message: dict):
+        async with self._publishers.acquire() as connection:
+            await connection.execute('SELECT pg_notify($1, $2)', CHANNEL, json.dumps(message))
+
+
+def _postgres_dsn() -> str:
+    return database.ASYNC_SQLALCHEMY_DATABASE_URL.replace('postgresql+asyncpg://', 'postgresql://')
+
+
+game_events = GameEvents()
+broker = PostgresBroker(game_events, _postgres_dsn()) if os.getenv('EVENTS_BACKEND', 'memory') == 'postgres' \
+    else MemoryBroker(game_events)
+
+
+async def publish(event: GameEvent):
+    """
+    Publishes a game event, logging instead of failing the request that produced it
+    :param event: game event
+    """
+    try:
+        await broker.publish(event)
+    except Exception:
+        logger.exception('Could not publish event of game %s', event.game_id)
+
+
+async def publish_eviction(game_ids: List[int]):
+    """
+    Tells the other processes to drop their cached copies of deleted or archived games, logging instead of failing
+    :param game_ids: ids of the games
+    """
+    if not game_ids:
+        return
+    try:
+        await broker.publish_eviction(game_ids)
+    except Exception:
+        logger.exception('Could not publish eviction of %s games', len(game_ids))
@@ -0,0 +1,104 @@
+"""Bounded LRU/TTL cache of in-progress games' working state."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from api.src.engine.board import board_rows
+from api.src.entities.schemas import Game, Player
+
+
+class CachedPlayer(Player):
+    id: int
+
+
+class CachedGame(Game):
+    id: int
+    players: List[CachedPlayer]
+    # Stored board, one character per cell
+    board: str
+    finished: bool
+    version: int
+    moves: bytes = b''
+
+    def to_game(self) -> Game:
+        return Game(**self.dict(exclude={'board', 'finished', 'version', 'moves'}),
+                    board=board_rows(self.board, self.rows, self.columns))
+
+
+class GameCache:
+    """
+    In-process cache of games being played. Entries are copied in and out, so callers can modify what they get.
+    Writes go to the database first, guarded by the game's version, so a stale entry only costs a retry.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._games: 'OrderedDict[int, Tuple[float, CachedGame]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, game_id: int) -> Optional[CachedGame]:
+        """
+        Returns a copy of a cached game
+        :param game_id: id of the game to find
+        :return: game found or None
+        """
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, game = entry
+            if expires < time.monotonic():
+                del self._games[game_id]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._games.move_to_end(game_id)
+            self.hits += 1
+        return game.copy(deep=True)
+
+    def put(self, game: CachedGame):
+        """
+        Stores a copy of a game, evicting the least recently used ones beyond max_size
+        :param game: game to cache
+        """
+        if self.max_size <= 0:
+            return
+        game = game.copy(deep=True)
+        with self._lock:
+            self._games[game.id] = (time.monotonic() + self.ttl, game)
+            self._games.move_to_end(game.id)
+            while len(self._games) > self.max_size:
+                self._games.popitem(last=False)
+                self.evictions += 1
+
+    def evict(self, game_id: int):
+        """
+        Removes a game from the cache
+        :param game_id: id of the game to remove
+        """
+        with self._lock:
+            if self._games.pop(game_id, None) is not None:
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._games.clear()
+
+    def stats(self) -> dict:
+        return {'size': len(self._games),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+
+game_cache = GameCache(max_size=int(os.getenv('GAME_CACHE_SIZE', 10000)),
+                       ttl=float(os.getenv('GAME_CACHE_TTL', 60)))
@@ -1,15 +1,32 @@
 import json
-from typing import List, Optional
+from collections import defaultdict
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
 
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
 from api.src.db.crud import Crud
-from api.src.db.models import PlayerDB
-from api.src.entities.requests import GameRequest, SubmitPlay
+from api.src.db.models import GameDB, PlayerDB
+from api.src.engine.board import Board, COLUMNS, ROWS, WIN_LENGTH, board_rows, empty_board
+from api.src.engine.move_log import append_move, replay
+from api.src.engine.solver import DRAW, LOSS, UNKNOWN, WIN, get_solver
+from api.src.entities.requests import EvaluateRequest, GameRequest, SubmitPlay, SubmitPlays
+from api.src.entities.responses import BestMoveResponse, EvaluationResponse, GameEvent, PlayResult, ReplayResponse
 from api.src.entities.schemas import Game, Play, Player, PlayResponse
-from api.src.services.player_service import PlayerService
-from api.src.services.service_interface import AppService
+from api.src.services.events import publish, publish_eviction
+from api.src.services.game_cache import CachedGame, CachedPlayer, game_cache
+from api.src.services.game_snapshots import GameSnapshot, game_snapshots
+from api.src.services.pagination import decode_cursor, next_cursor
+from api.src.services.player_service import PlayerService, player_cache
+from api.src.services.service_interface import AppService, AsyncAppService
+
+RESULTS = {WIN: 'win', DRAW: 'draw', LOSS: 'loss'}
+# Games fetched per server-side cursor round-trip when exporting
+EXPORT_BATCH = 1000
+# Attempts of a play before answering 409 when its game keeps being updated concurrently
+MAX_PLAY_ATTEMPTS = 3
 
 
 class GameService(AppService):
@@ -18,16 +35,31 @@ class GameService(AppService):
         self._crud = Crud(db)
         self.__player_service = PlayerService(db)
 
-    def get_all_games(self, skip: int = 0, limit: int = 100, finished: Optional[bool] = None) -> List[
-        Game]:
+    def get_all_games(self, skip: int = 0, limit: int = 100, finished: Optional[bool] = None,
+                      after: Optional[str] = None) -> List[Game]:
         """
         Returns all saved games from 0 to 100 by default
         :param skip: lower limit
         :param limit: max limit
         :param finished: filter by finished games
+        :param after: cursor of the previous page
         :return: list of games
         """
-        return self._crud.get_games(skip, limit, finished)
+        return [CachedGame.from_orm(game).to_game()
+                for game in self._crud.get_games(skip, limit, finished, decode_cursor(after))]
+
+    def get_games_page(self, skip: int = 0, limit: int = 100, finished: Optional[bool] = None,
+                       after: Optional[str] = None) -> Tuple[List[Game], Optional[str]]:
+        """
+        Returns a page of games and the cursor of the next one
+        :param skip: lower limit
+        :param limit: max limit
+        :param finished: filter by finished games
+        :param after: cursor of the previous page
+        :return: list of games and next page's cursor
+        """
+        games = self.get_all_games(skip, limit, finished, after)
+        return games, next_cursor(games, limit)
 
     def get_game(self, game_id: int) -> Game:
         """
@@ -36,151 +68,350 @@ class GameService(AppService):
         :return: game found
         :raises HTTPException: 404 Game not found
         """
+        return self._game_state(game_id).to_game()
+
+    def get_game_snapshot(self, game_id: int) -> GameSnapshot:
+        """
+        Returns game with the requested id serialized, with its version's ETag, and caches it for the next requests
+        :param game_id: id of the game to find
+        :return: game's snapshot
+        :raises HTTPException: 404 Game not found
+        """
+        game = self._game_state(game_id)
+        return game_snapshots.put(game_id, game.version, game.to_game())
+
+    def _get_game_db(self, game_id: int) -> GameDB:
+        """
+        Private function that returns the stored game with the requested id
+        :param game_id: id of the game to find
+        :return: game found
+        :raises HTTPException: 404 Game not found
+        """
         game = self._crud.get_game(game_id)
         if not game:
             raise HTTPException(status_code=404, detail="Game not found")
         return game
 
+    def _game_state(self, game_id: int) -> CachedGame:
+        """
+        Private function that returns a game's working state, from the cache if it is being played
+        :param game_id: id of the game to find
+        :return: game's state, free to be modified
+        :raises HTTPException: 404 Game not found
+        """
+        game = game_cache.get(game_id)
+        if game is None:
+            game = CachedGame.from_orm(self._get_game_db(game_id))
+            if not game.finished:
+                game_cache.put(game)
+        return game
+
     def delete_game(self, game_id: int) -> Game:
         """
         Delete a Game
         :param game_id: game id to be deleted
         :return: deleted game
         """
-        game = self.get_game(game_id)
-        return self._crud.delete_game(game)
+        game = self._get_game_db(game_id)
+        deleted = CachedGame.from_orm(game).to_game()
+        game_cache.evict(game_id)
+        game_snapshots.evict(game_id)
+        self._crud.delete_game(game)
+        return deleted
 
-    def _create_game(self, new_game: Game, finished: bool) -> Game:
+    def _create_game(self, new_game: Game, players: List[CachedPlayer], finished: bool) -> CachedGame:
         """
         Private function to store a new game
         :param new_game: new game to be stored
+        :param players: game's stored players
         :param finished: finished games
         :return: new game stored
         """
-        return self._crud.create_game(new_game, finished)
+        game_id, version = self._crud.create_game(new_game, [player.id for player in players], finished)
+        return CachedGame(**new_game.dict(exclude={'id', 'players'}), id=game_id, players=players,
+                          finished=finished, version=version)
 
     def begin_game(self, game_request: GameRequest) -> Game:
         """
         Set game's default attributes to begin a new game
         :param game_request: game request with players, symbols and starting player
         :return: new game stored
+        :raises HTTPException: 406 if the request is invalid, 422 if both players were stored with the same symbol
         """
         self.__player_service.validate_players(game_request.players)
         players = self.__player_service.validate_symbol(game_request.players)
+        self._validate_dimensions(game_request)
         players_names = [player.name for player in players]
         next_turn = game_request.starting_player if game_request.starting_player \
                                                     and game_request.starting_player in players_names \
             else players_names[0]
         new_game = Game(**{'players': players,
                            'movements_played': 0,
-                           'next_turn': next_turn})
+                           'next_turn': next_turn,
+                           'board': empty_board(game_request.rows, game_request.columns),
+                           'rows': game_request.rows,
+                           'columns': game_request.columns,
+                           'win_length': game_request.win_length})
         finished = False
-        return self._create_game(new_game, finished)
+        stored_players = self.__player_service.store_players(players)
+        self.__player_service.validate_stored_symbols(stored_players)
+        try:
+            game = self._create_game(new_game, stored_players, finished)
+        except IntegrityError:
+            # Another worker deleted a player this worker had cached
+            self._crud.rollback()
+            player_cache.evict(players_names)
+            stored_players = self.__player_service.store_players(players)
+            self.__player_service.validate_stored_symbols(stored_players)
+            game = self._create_game(new_game, stored_players, finished)
+        game_cache.put(game)
+        return game.to_game()
+
+    def _validate_dimensions(self, game_request: GameRequest):
+        """
+        Private function to validate the line length needed to win fits in the board
+        :param game_request: game request with board dimensions
+        :raises HTTPException: 406
+        """
+        if game_request.win_length > max(game_request.rows, game_request.columns):
+            raise HTTPException(status_code=406, detail="Win length must fit in the board")
 
     def submit_play(self, submit_play: SubmitPlay) -> Game:
         """
         Creates a new play and updates current game being played
         :param submit_play: new play request
         :return: updated game stored
+        :raises HTTPException: 409 if the game kept being updated concurrently
+        """
+        return self._with_retries(lambda: self._submit_play(submit_play))
+
+    def _with_retries(self, play: Callable[[], Any]) -> Any:
+        """
+        Private function that runs a play again, validating it against the game's new state, each time its game
+        was updated by another play since it was read
+        :param play: function that validates and stores plays
+        :return: play's result
+        :raises HTTPException: 409 after MAX_PLAY_ATTEMPTS conflicts
         """
-        game = self.get_game(submit_play.game_id)
-        self._submit_play_validations(game, submit_play)
-        player = self.__player_service.get_player_by_name(submit_play.player_name)
-        self._new_play(game, submit_play, player)
+        for _ in range(MAX_PLAY_ATTEMPTS):
+            try:
+                return play()
+            except StaleDataError:
+                self._crud.rollback()
+        raise HTTPException(status_code=409, detail="Game was updated by another play, try again")
+
+    def _submit_play(self, submit_play: SubmitPlay) -> Game:
+        """
+        Private function that validates and stores a play in one transaction
+        :param submit_play: new play request
+        :return: updated game stored
+        :raises StaleDataError: if the game was updated since it was read
+        """
+        game = self._game_state(submit_play.game_id)
+        symbols = self._symbols(game)
+        board = self._board(game, symbols)
+        self._submit_play_validations(game, board, submit_play)
+        player = self._game_player(game, submit_play.player_name)
+        game.finished = self._apply_play(game, board, submit_play, player)
+        game.board = board.encode(symbols)
+        result = self._game_result(game) if game.finished else None
+        try:
+            self._crud.update_game_state(game, self._new_play(game, submit_play, player), result)
+        except StaleDataError:
+            game_cache.evict(game.id)
+            raise
+        game.version += 1
+        game_snapshots.invalidate(game.id, game.version)
+
+        if game.finished:
+            game_cache.evict(game.id)
+        else:
+            game_cache.put(game)
+        return game.to_game()
+
+    def submit_plays(self, submit_plays: SubmitPlays) -> List[PlayResult]:
+        """
+        Validates and applies an ordered list of plays, of one or many games, storing all of them in one transaction
+        :param submit_plays: new plays requests
+        :return: each play's result, with the game's state after it or the error that rejected it
+        :raises HTTPException: 409 if any of the games kept being updated concurrently
+        """
+        return self._with_retries(lambda: self._submit_plays(submit_plays))
+
+    def _submit_plays(self, submit_plays: SubmitPlays) -> List[PlayResult]:
+        """
+        Private function that validates and stores a list of plays in one transaction
+        :param submit_plays: new plays requests
+        :return: each play's result
+        :raises StaleDataError: if any of the games was updated since it was read
+        """
+        games = {game.id: game for game in
+                 self._crud.get_games_by_ids({submit_play.game_id for submit_play in submit_plays.plays})}
+        boards = {}
+        new_plays = []
+        results = []
+        unfinished = {game.id for game in games.values() if not game.finished}
+        for submit_play in submit_plays.plays:
+            game = games.get(submit_play.game_id)
+            try:
+                if not game:
+                    raise HTTPException(status_code=404, detail="Game not found")
+                if game.id not in boards:
+                    boards[game.id] = self._board(game, self._symbols(game))
+                board = boards[game.id]
+                self._submit_play_validations(game, board, submit_play)
+                player = self._game_player(game, submit_play.player_name)
+                game.finished = self._apply_play(game, board, submit_play, player)
+            except HTTPException as exception:
+                results.append(PlayResult(game_id=submit_play.game_id,
+                                          status_code=exception.status_code,
+                                          detail=exception.detail))
+                continue
+
+            new_plays.append(self._new_play(game, submit_play, player))
+            results.append(PlayResult(game_id=game.id,
+                                      status_code=201,
+                                      board=board_rows(board.encode(self._symbols(game)), game.rows, game.columns),
+                                      movements_played=game.movements_played,
+                                      next_turn=game.next_turn,
+                                      winner=game.winner,
+                                      finished=game.finished))
+
+        for game_id, board in boards.items():
+            games[game_id].board = board.encode(self._symbols(games[game_id]))
+            game_cache.evict(game_id)
+        # Each game with new plays is flushed once, which increments its version
+        versions = {new_play.game_id: games[new_play.game_id].version + 1 for new_play in new_plays}
+        self._crud.save_plays(new_plays, [self._game_result(games[game_id]) for game_id in unfinished
+                                          if games[game_id].finished])
+        for game_id, version in versions.items():
+            game_snapshots.invalidate(game_id, version)
+
+        return results
+
+    def _apply_play(self, game: Game, board: Board, submit_play: SubmitPlay, player: Player) -> bool:
+        """
+        Private function that makes an already validated movement in the board and updates game's turn and winner
+        :param game: current game
+        :param board: current game's decoded board
+        :param submit_play: new play request
+        :param player: current player making the move
+        :return: True if the game finished
+        """
+        player_index = self._player_index(game, player)
+        board.play(player_index, submit_play.row, submit_play.column)
+        game.moves = append_move(game.moves or b'', submit_play.row, submit_play.column, game.rows, game.columns)
+        game.movements_played += 1
         game.next_turn = self._next_turn(game, player)
 
-        finished = True if game.movements_played == 9 else False
-        winner = self._check_winner(game)
-        if game.movements_played >= 5 and winner:
-            game.winner = winner
+        finished = game.movements_played == game.rows * game.columns
+        if game.movements_played >= 2 * game.win_length - 1 \
+                and self._check_winner(board, player_index, submit_play):
+            game.winner = player.name
             finished = True
 
-        return self._crud.update_game(game, finished)
+        return finished
 
-    def _submit_play_validations(self, game: Game, submit_play: SubmitPlay):
+    def _game_result(self, game: Game) -> Tuple[List[int], Optional[int]]:
+        """
+        Private function that returns the result of a finished game to update its players' stats
+        :param game: finished game
+        :return: players' ids and winner's id, None for a draw
+        """
+        player_ids = [player.id for player in game.players]
+        winner_id = next((player.id for player in game.players if player.name == game.winner), None)
+        return player_ids, winner_id
+
+    def _submit_play_validations(self, game: Game, board: Board, submit_play: SubmitPlay):
         """
         Private function to validate current context before each movement is made
         :param game: current game
+        :param board: current game's decoded board
         :param submit_play: new play request
         :raises HTTPException: 406 with each case's message
         """
-        if game.winner or game.movements_played == 9:
+        if game.winner or game.movements_played == game.rows * game.columns:
             raise HTTPException(status_code=406, detail="Game Finished")
 
+        if not board.contains(submit_play.row, submit_play.column):
+            raise HTTPException(status_code=406, detail="Movement out of board")
+
         if game.next_turn != submit_play.player_name:
             raise HTTPException(status_code=406, detail="Not player's turn")
 
-        board = json.loads(game.board)
-        if board[submit_play.row - 1][submit_play.column - 1] is not None:
+        if not board.is_free(submit_play.row, submit_play.column):
             raise HTTPException(status_code=406, detail="Movement already made")
 
-    def _board_play(self, board: str, symbol: str, row: int, column: int) -> str:
+    def _symbols(self, game: Game) -> List[str]:
         """
-        Private function to make a move in the board.
-        :param board: saved board as str
-        :param symbol: current symbol that makes the move
-        :param row: row of the 3x3 board
-        :param column: column of the 3x3 column
-        :return: board in str format
+        Private function that returns game players' symbols, its order defines board's player indexes
+        :param game: current game
+        :return: list of symbols
         """
-        board = json.loads(board)
-        board[row - 1][column - 1] = symbol
-        return json.dumps(board)
+        return [player.symbol for player in game.players]
 
-    def _new_play(self, game: Game, submit_play: SubmitPlay, player: PlayerDB):
+    def _board(self, game: Game, symbols: List[str]) -> Board:
         """
-        Private function to creates and stores a new play and makes board movement
+        Private function to decode a game's stored board
         :param game: current game
-        :param submit_play: new play request
-        :param player: current player making the move
+        :param symbols: players' symbols, its order defines board's player indexes
+        :return: decoded board
         """
-        game.board = self._board_play(game.board, player.symbol, submit_play.row, submit_play.column)
-        game.movements_played += 1
-        new_play = Play(**{'game_id': game.id,
-                           'player_id': player.id,
-                           'row': submit_play.row,
-                           'column': submit_play.column})
-        self._crud.create_play(new_play)
+        return Board.decode(game.board, symbols, game.rows, game.columns, game.win_length)
 
-    def _next_turn(self, game: Game, player: Player) -> str:
+    def _player_index(self, game: Game, player: Player) -> int:
         """
-        Private function that decides who the next player is
+        Private function that returns player's index in the game board
         :param game: current game
-        :param player: current player
-        :return: next player's name
+        :param player: player to look for
+        :return: player's index
         """
-        next_player = list(set(game.players) - {player})
-        return next_player[0].name
+        return [game_player.name for game_player in game.players].index(player.name)
 
-    def _check_winner(self, game: Game) -> Optional[str]:
+    def _game_player(self, game: Game, player_name: str) -> Player:
         """
-        Private function that checks if there is a winner
+        Private function that returns one of the game's players by name
         :param game: current game
-        :return: game's winner
+        :param player_name: name of the player to find
+        :return: player found
+        :raises HTTPException: 404 Player not found
         """
-        board = json.loads(game.board)
-        flatboard = self._flatten(board)
-
         for player in game.players:
-            if flatboard[0] == flatboard[1] == flatboard[2] == player.symbol or \
-                    flatboard[0] == flatboard[3] == flatboard[6] == player.symbol or \
-                    flatboard[0] == flatboard[4] == flatboard[8] == player.symbol or \
-                    flatboard[1] == flatboard[4] == flatboard[7] == player.symbol or \
-                    flatboard[2] == flatboard[4] == flatboard[6] == player.symbol or \
-                    flatboard[2] == flatboard[5] == flatboard[8] == player.symbol or \
-                    flatboard[3] == flatboard[4] == flatboard[5] == player.symbol or \
-                    flatboard[6] == flatboard[7] == flatboard[8] == player.symbol:
-                return player.name
+            if player.name == player_name:
+                return player
+        raise HTTPException(status_code=404, detail="Player not found")
 
-        return None
+    def _new_play(self, game: Game, submit_play: SubmitPlay, player: PlayerDB) -> Play:
+        """
+        Private function to create a new play of a game
+        :param game: current game
+        :param submit_play: new play request
+        :param player: current player making the move
+        :return: new play
+        """
+        return Play(**{'game_id': game.id,
+                       'player_id': player.id,
+                       'row': submit_play.row,
+                       'column': submit_play.column})
 
-    def _flatten(self, nested_list: list) -> list:
+    def _next_turn(self, game: Game, player: Player) -> str:
         """
-        Private function to flat a nested list to one dimension list
-        :param nested_list: list of lists
-        :return: one dimension list
+        Private function that decides who the next player is
+        :param game: current game
+        :param player: current player
+        :return: next player's name
+        """
+        return next(game_player.name for game_player in game.players if game_player.name != player.name)
+
+    def _check_winner(self, board: Board, player_index: int, submit_play: SubmitPlay) -> bool:
+        """
+        Private function that checks if the last move completed a line
+        :param board: current game's board
+        :param player_index: index of the player who made the last move
+        :param submit_play: last move
+        :return: True if the player has won
         """
-        return [item for sublist in nested_list for item in sublist]
+        return board.is_winning_move(player_index, submit_play.row, submit_play.column)
 
     def get_game_movements(self, game_id) -> List[PlayResponse]:
         """
@@ -193,11 +424,167 @@ class GameService(AppService):
         if not movements:
             raise HTTPException(status_code=404, detail="No movements found for {}".format(game_id))
 
-        for movement in movements:
-            player = self.__player_service.get_player(movement.player_id)
-            movements[movements.index(movement)] = PlayResponse(game_id=movement.game_id,
-                                                                player=player,
-                                                                row=movement.row,
-                                                                column=movement.column)
+        return [PlayResponse(game_id=movement.game_id,
+                             player=movement.player,
+                             row=movement.row,
+                             column=movement.column) for movement in movements]
+
+    def replay_game(self, game_id: int, at: Optional[int] = None) -> ReplayResponse:
+        """
+        Rebuilds a game's board after its first moves from the game's move log
+        :param game_id: game to replay
+        :param at: moves to replay, all of them by default
+        :return: board, turn and winner after those moves
+        :raises HTTPException: 406 if the game has fewer moves
+        """
+        game = self._game_state(game_id)
+        at = game.movements_played if at is None else at
+        if not 0 <= at <= game.movements_played:
+            raise HTTPException(status_code=406, detail="Game has {} movements".format(game.movements_played))
+
+        names = [player.name for player in game.players]
+        next_player = names.index(game.next_turn)
+        first_player = next_player if game.movements_played % 2 == 0 else 1 - next_player
+        board, won = replay(game.moves, first_player, at, game.rows, game.columns, game.win_length)
+        player_to_move = first_player if at % 2 == 0 else 1 - first_player
+        return ReplayResponse(game_id=game.id,
+                              at=at,
+                              board=board_rows(board.encode(self._symbols(game)), game.rows, game.columns),
+                              next_turn=names[player_to_move],
+                              winner=names[1 - player_to_move] if won else None)
+
+    def get_best_move(self, game_id: int) -> BestMoveResponse:
+        """
+        Returns the perfect-play move for the player whose turn it is
+        :param game_id: game to look the move for
+        :return: best move and its expected result
+        :raises HTTPException: 406 Game Finished
+        """
+        game = self._game_state(game_id)
+        if game.finished:
+            raise HTTPException(status_code=406, detail="Game Finished")
+
+        if (game.rows, game.columns, game.win_length) != (ROWS, COLUMNS, WIN_LENGTH):
+            raise HTTPException(status_code=406, detail="Best move is only available for {}x{} games".format(
+                ROWS, COLUMNS))
+
+        board = self._board(game, self._symbols(game))
+        mover = [player.name for player in game.players].index(game.next_turn)
+        best_move = get_solver().best_move(board.masks[mover], board.masks[1 - mover])
+        if best_move is None:
+            raise HTTPException(status_code=406, detail="Game Finished")
+
+        return self._best_move_response(best_move)
+
+    def evaluate(self, evaluate_request: EvaluateRequest) -> EvaluationResponse:
+        """
+        Evaluates a board with perfect play from both players
+        :param evaluate_request: board and symbol of the player to move
+        :return: expected result for the player to move and its best move
+        :raises HTTPException: 406 if the board is not a reachable 3x3 position
+        """
+        rows = evaluate_request.board
+        if len(rows) != ROWS or any(len(row) != COLUMNS for row in rows):
+            raise HTTPException(status_code=406, detail="Board must be {}x{}".format(ROWS, COLUMNS))
+
+        opponents = {cell for row in rows for cell in row if cell is not None} - {evaluate_request.next_symbol}
+        if len(opponents) > 1:
+            raise HTTPException(status_code=406, detail="Board must have two symbols at most")
+
+        symbols = [evaluate_request.next_symbol, opponents.pop() if opponents else None]
+        board = Board.from_rows(rows, symbols)
+        solver = get_solver()
+        result, moves_to_end = solver.lookup(*board.masks)
+        if result == UNKNOWN:
+            raise HTTPException(status_code=406, detail="Unreachable board")
+
+        best_move = solver.best_move(*board.masks)
+        return EvaluationResponse(result=RESULTS[result],
+                                  moves_to_end=moves_to_end,
+                                  best_move=self._best_move_response(best_move) if best_move else None)
+
+    def _best_move_response(self, best_move: tuple) -> BestMoveResponse:
+        """
+        Private function to build a best move response from the solver's move
+        :param best_move: row, column, result and distance to the end
+        :return: best move response
+        """
+        row, column, result, moves_to_end = best_move
+        return BestMoveResponse(row=row, column=column, result=RESULTS[result], moves_to_end=moves_to_end)
+
+
+class AsyncGameService(AsyncAppService):
+    service_class = GameService
+
+    async def get_all_games(self, skip: int = 0, limit: int = 100, finished: Optional[bool] = None,
+                            after: Optional[str] = None) -> Tuple[List[Game], Optional[str]]:
+        return await self._read(lambda service: service.get_games_page(skip, limit, finished, after),
+                                Tuple[List[Game], Optional[str]])
+
+    async def get_game(self, game_id: int) -> Game:
+        return await self._run(lambda service: service.get_game(game_id), Game)
+
+    async def get_game_snapshot(self, game_id: int) -> GameSnapshot:
+        return await self._run(lambda service: service.get_game_snapshot(game_id))
+
+    async def delete_game(self, game_id: int) -> Game:
+        game = await self._run(lambda service: service.delete_game(game_id), Game)
+        await publish_eviction([game_id])
+        return game
+
+    async def begin_game(self, game_request: GameRequest) -> Game:
+        return await self._run(lambda service: service.begin_game(game_request), Game)
+
+    async def submit_play(self, submit_play: SubmitPlay) -> Game:
+        game = await self._run(lambda service: service.submit_play(submit_play), Game)
+        await publish(GameEvent(game_id=game.id,
+                                board=game.board,
+                                movements_played=game.movements_played,
+                                next_turn=game.next_turn,
+                                winner=game.winner,
+                                finished=bool(game.winner) or game.movements_played == game.rows * game.columns))
+        return game
+
+    async def submit_plays(self, submit_plays: SubmitPlays) -> List[PlayResult]:
+        results = await self._run(lambda service: service.submit_plays(submit_plays))
+        last_results = {result.game_id: result for result in results if result.board is not None}
+        for result in last_results.values():
+            await publish(GameEvent(**result.dict(exclude={'status_code', 'detail'})))
+        return results
+
+    async def get_game_movements(self, game_id: int) -> List[PlayResponse]:
+        return await self._read(lambda service: service.get_game_movements(game_id), List[PlayResponse])
+
+    async def replay_game(self, game_id: int, at: Optional[int] = None) -> ReplayResponse:
+        return await self._run(lambda service: service.replay_game(game_id, at))
+
+    async def get_best_move(self, game_id: int) -> BestMoveResponse:
+        return await self._run(lambda service: service.get_best_move(game_id))
+
+    async def evaluate(self, evaluate_request: EvaluateRequest) -> EvaluationResponse:
+        return await self._run(lambda service: service.evaluate(evaluate_request))
+
+    async def export_games(self, finished: Optional[bool] = None, min_id: Optional[int] = None,
+                           max_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Streams games with their players and plays as newline-delimited JSON. Games are read with a server-side
+        cursor and their players and plays are fetched once per batch, so memory does not grow with the export
+        :param finished: to filter finished games
+        :param min_id: lowest game id
+        :param max_id: highest game id
+        :return: iterator of JSON lines
+        """
+        async with self._read_session() as db:
+            result = await db.stream(Crud.export_games_statement(finished, min_id, max_id)
+                                     .execution_options(yield_per=EXPORT_BATCH))
+            async for games in result.mappings().partitions(EXPORT_BATCH):
+                game_ids = [game['id'] for game in games]
+                players = defaultdict(list)
+                for game_id, name, symbol in await db.execute(Crud.games_players_statement(game_ids)):
+                    players[game_id].append({'name': name, 'symbol': symbol})
+                plays = defaultdict(list)
+                for game_id, name, row, column in await db.execute(Crud.games_plays_statement(game_ids)):
+                    plays[game_id].append({'player': name, 'row': row, 'column': column})
 
-        return movements
+                yield ''.join(json.dumps({**game, 'players': players[game['id']], 'plays': plays[game['id']]})
+                              + '\n' for game in games).encode()
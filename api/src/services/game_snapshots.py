@@ -0,0 +1,117 @@
+"""Bounded LRU/TTL cache of games' serialized JSON bodies and ETags, by game and version."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from api.src.entities.schemas import Game
+
+
+class GameSnapshot(NamedTuple):
+    version: int
+    etag: str
+    # Serialized Game, None while only the version is known
+    body: Optional[bytes]
+
+
+def etag(game_id: int, version: int) -> str:
+    return '"{}.{}"'.format(game_id, version)
+
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    """
+    Checks an If-None-Match header against the current ETag, with the weak comparison GET requests use
+    :param if_none_match: header's value, a list of ETags or *
+    :param current: game's current ETag
+    :return: True if the client already has the current version
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == current for tag in tags)
+
+
+class GameSnapshots:
+    """
+    In-process cache of the response body of each game's latest version. Writes record the game's new version
+    before anything serializes it, so a read that started before a write cannot store an older body over it.
+    Other workers' writes evict entries through their game events, and the TTL bounds staleness otherwise
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._snapshots: 'OrderedDict[int, Tuple[float, GameSnapshot]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, game_id: int) -> Optional[GameSnapshot]:
+        """
+        Returns a game's latest known version, with its body if it was serialized
+        :param game_id: id of the game to find
+        :return: snapshot found or None
+        """
+        with self._lock:
+            entry = self._snapshots.get(game_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._snapshots.pop(game_id, None)
+                self.misses += 1
+                return None
+            self._snapshots.move_to_end(game_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, game_id: int, version: int, game: Game) -> GameSnapshot:
+        """
+        Serializes a game's version, storing it unless a newer version is known
+        :param game_id: game's id
+        :param version: version the game was read at
+        :param game: game to serialize
+        :return: snapshot of the game's version
+        """
+        snapshot = GameSnapshot(version, etag(game_id, version), game.json(separators=(',', ':')).encode())
+        self._store(game_id, snapshot)
+        return snapshot
+
+    def invalidate(self, game_id: int, version: int):
+        """
+        Records a game's new version after a write, dropping the body of older versions
+        :param game_id: game's id
+        :param version: version the write stored
+        """
+        self._store(game_id, GameSnapshot(version, etag(game_id, version), None))
+
+    def evict(self, game_id: int):
+        with self._lock:
+            self._snapshots.pop(game_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+    def _store(self, game_id: int, snapshot: GameSnapshot):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            entry = self._snapshots.get(game_id)
+            if entry is not None and entry[1].version > snapshot.version:
+                return
+            if entry is not None and entry[1].version == snapshot.version and snapshot.body is None:
+                return
+            self._snapshots[game_id] = (time.monotonic() + self.ttl, snapshot)
+            self._snapshots.move_to_end(game_id)
+            while len(self._snapshots) > self.max_size:
+                self._snapshots.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {'size': len(self._snapshots),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+game_snapshots = GameSnapshots(max_size=int(os.getenv('GAME_SNAPSHOTS_SIZE', 10000)),
+                               ttl=float(os.getenv('GAME_SNAPSHOTS_TTL', 60)))
@@ -0,0 +1,228 @@
+"""
+Idempotency-Key handling: the first request with a key runs and its response is stored, retries with the same key
+get that response back without running it again. Keys are stored in the database, so they survive restarts and
+are shared by workers, and the most recent responses are also kept in memory to replay them without a query.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from api.src.db.crud import Crud
+from api.src.db.database import AsyncSessionLocal
+from api.src.services.service_interface import AppService, AsyncAppService
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+IDEMPOTENT_REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 100
+# Hours a key is replayed for, afterwards it can be used again
+KEY_TTL = timedelta(hours=float(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24)))
+# Seconds after which a key whose request never completed, because its worker stopped, can run again
+PENDING_TIMEOUT = timedelta(seconds=float(os.getenv('IDEMPOTENCY_PENDING_SECONDS', 60)))
+# Seconds between deletions of expired keys
+PURGE_SECONDS = float(os.getenv('IDEMPOTENCY_PURGE_SECONDS', 3600))
+# Client errors that depend on the moment the request ran, so a retry runs the request again
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: bytes
+
+
+def request_hash(request: BaseModel) -> str:
+    return hashlib.sha256(request.json(sort_keys=True).encode()).hexdigest()
+
+
+def _body(result: Any) -> bytes:
+    return json.dumps(jsonable_encoder(result), separators=(',', ':')).encode()
+
+
+class IdempotencyStore:
+    """
+    Bounded LRU of the latest stored responses by route and key, and the requests with a key being processed in
+    this worker, so concurrent retries wait for the first one instead of querying the database
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._responses: 'OrderedDict[Tuple[str, str], StoredResponse]' = OrderedDict()
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, route: str, key: str) -> Optional[StoredResponse]:
+        stored = self._responses.get((route, key))
+        if stored is None:
+            self.misses += 1
+            return None
+        self._responses.move_to_end((route, key))
+        self.hits += 1
+        return stored
+
+    def put(self, route: str, key: str, stored: StoredResponse):
+        if self.max_size <= 0:
+            return
+        self._responses[(route, key)] = stored
+        self._responses.move_to_end((route, key))
+        while len(self._responses) > self.max_size:
+            self._responses.popitem(last=False)
+
+    def clear(self):
+        self._responses.clear()
+
+    def begin(self, route: str, key: str) -> Optional[asyncio.Future]:
+        """
+        Marks a key's request as being processed in this worker, unless another request with the key already is
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :return: None if the request was marked, the future of the request being processed otherwise
+        """
+        pending = self._pending.get((route, key))
+        if pending is None:
+            self._pending[(route, key)] = asyncio.get_event_loop().create_future()
+        return pending
+
+    def end(self, route: str, key: str, stored: Optional[StoredResponse]):
+        """
+        Stores a key's response and wakes up the requests waiting for it
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :param stored: response, None if the request failed and can run again
+        """
+        if stored is not None:
+            self.put(route, key, stored)
+        pending = self._pending.pop((route, key), None)
+        if pending is not None and not pending.done():
+            pending.set_result(stored)
+
+    def stats(self) -> dict:
+        return {'size': len(self._responses),
+                'max_size': self.max_size,
+                'pending': len(self._pending),
+                'hits': self.hits,
+                'misses': self.misses}
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self._purge_expired())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _purge_expired(self):
+        while True:
+            await asyncio.sleep(PURGE_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    deleted = await AsyncIdempotencyService(db).delete_expired()
+                logger.info('Deleted %s expired idempotency keys', deleted)
+            except Exception:
+                logger.exception('Could not delete expired idempotency keys')
+
+
+class IdempotencyService(AppService):
+
+    def __init__(self, db: Session):
+        super().__init__(db)
+        self._crud = Crud(db)
+
+    def reserve(self, route: str, key: str, hash_: str) -> Optional[StoredResponse]:
+        """
+        Claims a key for a request
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :param hash_: hash of the request's body
+        :return: None if the request can run, the stored response if the key was already used
+        :raises HTTPException: 409 if the key's first request is still being processed,
+                               422 if the key was used with another request
+        """
+        now = datetime.utcnow()
+        if self._crud.create_idempotency_key(route, key, hash_, now - KEY_TTL, now - PENDING_TIMEOUT):
+            return None
+        stored = self._crud.get_idempotency_key(route, key)
+        if stored is None:
+            raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is being processed")
+        if stored.request_hash != hash_:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was used with another request")
+        if stored.status_code is None:
+            raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is being processed")
+        return StoredResponse(stored.request_hash, stored.status_code, stored.body)
+
+    def complete(self, route: str, key: str, stored: StoredResponse):
+        self._crud.complete_idempotency_key(route, key, stored.status_code, stored.body)
+
+    def release(self, route: str, key: str):
+        self._crud.delete_idempotency_key(route, key)
+
+    def delete_expired(self) -> int:
+        return self._crud.delete_expired_idempotency_keys(datetime.utcnow() - KEY_TTL)
+
+
+class AsyncIdempotencyService(AsyncAppService):
+    service_class = IdempotencyService
+
+    async def execute(self, route: str, key: str, request: BaseModel, status_code: int,
+                      call: Callable[[], Awaitable[Any]]) -> Tuple[StoredResponse, bool]:
+        """
+        Runs a request once per key, replaying its response to the requests that reuse the key
+        :param route: route the key was sent to
+        :param key: client's idempotency key
+        :param request: request's body
+        :param status_code: status code of successful responses
+        :param call: runs the request and returns its result
+        :return: response and whether it was replayed
+        :raises HTTPException: errors of the request the first time it runs, 409 if the key's first request is
+                               still being processed, 422 if the key was used with another request
+        """
+        hash_ = request_hash(request)
+        while True:
+            stored = idempotency_store.get(route, key)
+            if stored is None:
+                pending = idempotency_store.begin(route, key)
+                if pending is None:
+                    break
+                # A failed first request leaves no response, the waiters try to run it again one at a time
+                stored = await asyncio.shield(pending)
+                if stored is None:
+                    continue
+            if stored.request_hash != hash_:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was used with another request")
+            return stored, True
+
+        try:
+            stored = await self._run(lambda service: service.reserve(route, key, hash_))
+            if stored is not None:
+                return stored, True
+            try:
+                stored = StoredResponse(hash_, status_code, _body(await call()))
+            except HTTPException as exception:
+                if exception.status_code in RETRYABLE_STATUS_CODES:
+                    await self._run(lambda service: service.release(route, key))
+                    raise
+                stored = StoredResponse(hash_, exception.status_code, _body({'detail': exception.detail}))
+                await self._run(lambda service: service.complete(route, key, stored))
+                raise
+            except BaseException:
+                await self._run(lambda service: service.release(route, key))
+                raise
+            await self._run(lambda service: service.complete(route, key, stored))
+            return stored, False
+        finally:
+            idempotency_store.end(route, key, stored)
+
+
+idempotency_store = IdempotencyStore(max_size=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000)))
@@ -0,0 +1,239 @@
+"""
+Matchmaking queue: players wait in buckets by rating and symbol preference until an opponent within their skill
+window joins, then their game is created with GameService.begin_game. Windows widen the longer players wait.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from api.src.db.database import AsyncSessionLocal
+from api.src.entities.requests import GameRequest, MatchRequest
+from api.src.entities.schemas import Game, Player
+from api.src.services.metrics import MATCHES, MATCH_QUEUE_DEPTH, MATCH_TIMEOUTS, TIME_TO_MATCH
+
+logger = logging.getLogger(__name__)
+
+# Rating difference accepted as soon as a player joins
+SKILL_WINDOW = int(os.getenv('MATCH_SKILL_WINDOW', 100))
+# Rating difference added to the window per second waited, up to MAX_SKILL_WINDOW
+WINDOW_GROWTH = float(os.getenv('MATCH_WINDOW_GROWTH', 50))
+MAX_SKILL_WINDOW = int(os.getenv('MATCH_MAX_SKILL_WINDOW', 1000))
+# Seconds between retries of the players still waiting, with their widened windows
+TICK_SECONDS = float(os.getenv('MATCH_TICK_SECONDS', 0.5))
+BUCKET_WIDTH = 100
+DEFAULT_SYMBOLS = ('X', 'O')
+
+
+class Waiter:
+    """Player waiting for an opponent"""
+    __slots__ = ('name', 'symbol', 'rating', 'joined', 'match')
+
+    def __init__(self, name: str, symbol: Optional[str], rating: int):
+        self.name = name
+        self.symbol = symbol
+        self.rating = rating
+        self.joined = time.monotonic()
+        self.match: asyncio.Future = asyncio.get_event_loop().create_future()
+
+    def window(self, now: float) -> float:
+        return min(SKILL_WINDOW + WINDOW_GROWTH * (now - self.joined), MAX_SKILL_WINDOW)
+
+    @property
+    def bucket(self) -> Tuple[int, str]:
+        return self.rating // BUCKET_WIDTH, (self.symbol or '').lower()
+
+    def accepts(self, other: 'Waiter', now: float) -> bool:
+        """
+        Checks if an opponent's rating is within the wider of both players' windows, so players who waited longer
+        get matched sooner
+        """
+        return abs(self.rating - other.rating) <= max(self.window(now), other.window(now))
+
+
+async def _begin_game(game_request: GameRequest) -> Game:
+    from api.src.services.game_service import AsyncGameService
+
+    async with AsyncSessionLocal() as db:
+        return await AsyncGameService(db).begin_game(game_request)
+
+
+async def _get_match_profile(name: str) -> Tuple[int, Optional[str]]:
+    from api.src.services.player_service import AsyncPlayerService
+
+    async with AsyncSessionLocal() as db:
+        return await AsyncPlayerService(db).get_match_profile(name)
+
+
+class Matchmaker:
+    """
+    Pairs waiting players. Joining looks for an opponent right away, and a background task retries the players
+    still waiting every TICK_SECONDS. Everything runs on the event loop, so the queue needs no locks
+    """
+
+    def __init__(self, begin_game: Callable[[GameRequest], Awaitable[Game]] = _begin_game,
+                 get_match_profile: Callable[[str], Awaitable[Tuple[int, Optional[str]]]] = _get_match_profile):
+        self._begin_game = begin_game
+        self._get_match_profile = get_match_profile
+        # Waiters by rating bucket, then by preferred symbol ('' for any) in the order they joined
+        self._buckets: Dict[int, Dict[str, 'OrderedDict[str, Waiter]']] = {}
+        self._waiters: 'OrderedDict[str, Waiter]' = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.matched = 0
+        self.timeouts = 0
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self._retry_waiting())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        for waiter in list(self._waiters.values()):
+            self._remove(waiter)
+            if not waiter.match.done():
+                waiter.match.set_exception(HTTPException(status_code=503, detail="Matchmaking stopped"))
+
+    async def join(self, match_request: MatchRequest) -> Game:
+        """
+        Waits for an opponent and returns the game created for both players
+        :param match_request: player's name, preferred symbol and seconds to wait
+        :return: new game
+        :raises HTTPException: 406 if the player is already waiting or asks for a symbol other than its stored one,
+                               408 if no opponent was found in time
+        """
+        if match_request.name in self._waiters:
+            raise HTTPException(status_code=406, detail="Player already waiting")
+        rating, symbol = await self._get_match_profile(match_request.name)
+        if symbol and match_request.symbol and symbol != match_request.symbol:
+            raise HTTPException(status_code=406, detail="Player's symbol is {}".format(symbol))
+        if match_request.name in self._waiters:
+            raise HTTPException(status_code=406, detail="Player already waiting")
+
+        waiter = Waiter(match_request.name, symbol or match_request.symbol, rating)
+        self._add(waiter)
+        self._match(waiter, waiter.joined)
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.match), match_request.max_wait)
+        except asyncio.TimeoutError:
+            if not self._remove(waiter):
+                return await waiter.match
+            self.timeouts += 1
+            MATCH_TIMEOUTS.inc()
+            raise HTTPException(status_code=408, detail="No opponent found")
+        finally:
+            self._remove(waiter)
+
+    def leave(self, name: str):
+        """
+        Removes a player from the queue
+        :param name: player's name
+        :raises HTTPException: 404 if the player is not waiting
+        """
+        waiter = self._waiters.get(name)
+        if not waiter or not self._remove(waiter):
+            raise HTTPException(status_code=404, detail="Player not waiting")
+        waiter.match.set_exception(HTTPException(status_code=410, detail="Player left the queue"))
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        return {'waiting': len(self._waiters),
+                'buckets': {bucket * BUCKET_WIDTH: sum(map(len, symbols.values()))
+                            for bucket, symbols in sorted(self._buckets.items())},
+                'oldest_wait_seconds': now - next(iter(self._waiters.values())).joined if self._waiters else 0,
+                'matched': self.matched,
+                'timeouts': self.timeouts}
+
+    def _add(self, waiter: Waiter):
+        rating_bucket, symbol = waiter.bucket
+        self._waiters[waiter.name] = waiter
+        MATCH_QUEUE_DEPTH.inc()
+        self._buckets.setdefault(rating_bucket, {}).setdefault(symbol, OrderedDict())[waiter.name] = waiter
+
+    def _remove(self, waiter: Waiter) -> bool:
+        """
+        Private function that takes a player out of the queue
+        :param waiter: waiting player
+        :return: False if the player was not in the queue anymore
+        """
+        if self._waiters.get(waiter.name) is not waiter:
+            return False
+        del self._waiters[waiter.name]
+        MATCH_QUEUE_DEPTH.dec()
+        rating_bucket, symbol = waiter.bucket
+        symbols = self._buckets[rating_bucket]
+        del symbols[symbol][waiter.name]
+        if not symbols[symbol]:
+            del symbols[symbol]
+            if not symbols:
+                del self._buckets[rating_bucket]
+        return True
+
+    def _match(self, waiter: Waiter, now: float) -> bool:
+        """
+        Private function that pairs a player with the longest waiting acceptable opponent of the closest buckets.
+        Opponents preferring the same symbol are skipped by bucket
+        :param waiter: waiting player
+        :param now: current monotonic time
+        :return: True if an opponent was found
+        """
+        rating_bucket, symbol = waiter.bucket
+        # Opponents' windows may be wider than the player's, up to MAX_SKILL_WINDOW
+        for distance in range(MAX_SKILL_WINDOW // BUCKET_WIDTH + 2):
+            for current in {rating_bucket - distance, rating_bucket + distance}:
+                for opponent_symbol, opponents in self._buckets.get(current, {}).items():
+                    if symbol and opponent_symbol == symbol:
+                        continue
+                    for opponent in opponents.values():
+                        if opponent is not waiter and waiter.accepts(opponent, now):
+                            self._pair(opponent, waiter, now)
+                            return True
+        return False
+
+    def _pair(self, first: Waiter, second: Waiter, now: float):
+        """
+        Private function that takes both players out of the queue and creates their game in the background
+        :param first: longest waiting player, moves first
+        :param second: other player
+        :param now: current monotonic time
+        """
+        self._remove(first)
+        self._remove(second)
+        self.matched += 1
+        MATCHES.inc()
+        for waiter in (first, second):
+            TIME_TO_MATCH.observe(now - waiter.joined)
+        asyncio.ensure_future(self._create_game(first, second))
+
+    async def _create_game(self, first: Waiter, second: Waiter):
+        symbols = [first.symbol, second.symbol]
+        for index, symbol in enumerate(symbols):
+            if not symbol:
+                other = (symbols[1 - index] or '').lower()
+                symbols[index] = next(default for default in DEFAULT_SYMBOLS if default.lower() != other)
+        try:
+            game = await self._begin_game(GameRequest(players=[Player(name=first.name, symbol=symbols[0]),
+                                                               Player(name=second.name, symbol=symbols[1])]))
+        except Exception as exception:
+            logger.exception('Could not create the game of %s and %s', first.name, second.name)
+            for waiter in (first, second):
+                if not waiter.match.done():
+                    waiter.match.set_exception(exception)
+            return
+        for waiter in (first, second):
+            if not waiter.match.done():
+                waiter.match.set_result(game)
+
+    async def _retry_waiting(self):
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            now = time.monotonic()
+            for waiter in list(self._waiters.values()):
+                if self._waiters.get(waiter.name) is waiter:
+                    self._match(waiter, now)
+
+
+matchmaker = Matchmaker()
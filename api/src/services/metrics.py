@@ -0,0 +1,110 @@
+"""Prometheus metrics of the app and the ASGI middleware that records them for each request."""
+import os
+import time
+from typing import Callable, Dict, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+from api.src.db.instrumentation import measure_queries
+
+# Requests that match no route share one label, so unknown paths cannot grow the metrics without bound
+UNMATCHED_ROUTE = 'unmatched'
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by route',
+                            ('method', 'route', 'status'),
+                            buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+REQUESTS_IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being served', ('method',),
+                             multiprocess_mode='livesum')
+REQUEST_QUERIES = Histogram('http_request_db_queries', 'SQL statements per request', ('method', 'route'),
+                            buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+REQUEST_QUERY_SECONDS = Histogram('http_request_db_seconds', 'Seconds spent running SQL statements per request',
+                                  ('method', 'route'),
+                                  buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+REQUEST_ERRORS = Counter('http_request_exceptions', 'Requests that raised an unhandled exception',
+                         ('method', 'route'))
+
+MATCH_QUEUE_DEPTH = Gauge('matchmaking_queue_depth', 'Players waiting for an opponent', multiprocess_mode='livesum')
+TIME_TO_MATCH = Histogram('matchmaking_time_to_match_seconds', 'Seconds players waited until they were paired',
+                          buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+MATCHES = Counter('matchmaking_matches', 'Pairs of players matched')
+MATCH_TIMEOUTS = Counter('matchmaking_timeouts', 'Players that left without an opponent after waiting max_wait')
+
+
+def metrics_text() -> bytes:
+    """
+    Returns the metrics in Prometheus text format, aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set
+    :return: metrics
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records latency, in-flight requests and SQL statements per route template.
+    Written as a plain ASGI app instead of BaseHTTPMiddleware to keep its overhead to a few microseconds
+    """
+
+    def __init__(self, app: Callable, routes: Callable[[], list]):
+        self.app = app
+        self._routes = routes
+        self._paths: Dict[Callable, str] = {}
+        # Labelled metrics by method, route and status, labels() costs more than observing
+        self._children: Dict[Tuple[str, str, int], tuple] = {}
+
+    def _route(self, scope: dict) -> str:
+        """
+        Private function that returns the route template of a routed request
+        :param scope: ASGI scope, updated by the router with the matched endpoint
+        :return: route's path template
+        """
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._paths.get(endpoint)
+        if path is None:
+            self._paths = {route.endpoint: route.path for route in self._routes() if hasattr(route, 'endpoint')}
+            path = self._paths.setdefault(endpoint, UNMATCHED_ROUTE)
+        return path
+
+    def _labelled(self, method: str, route: str, status: int) -> tuple:
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (REQUEST_LATENCY.labels(method, route, str(status)),
+                                              REQUEST_QUERIES.labels(method, route),
+                                              REQUEST_QUERY_SECONDS.labels(method, route))
+        return children
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status = [500]
+
+        async def send_with_status(message: dict):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        with measure_queries() as queries:
+            try:
+                await self.app(scope, receive, send_with_status)
+            except Exception:
+                REQUEST_ERRORS.labels(method, self._route(scope)).inc()
+                raise
+            finally:
+                in_progress.dec()
+                latency, statements, statements_seconds = self._labelled(method, self._route(scope), status[0])
+                latency.observe(time.perf_counter() - started)
+                statements.observe(queries.count)
+                statements_seconds.observe(queries.seconds)
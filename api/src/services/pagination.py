@@ -0,0 +1,45 @@
+"""Opaque cursors for keyset pagination of listings ordered by id."""
+import base64
+import binascii
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from api.src.db.database import Base
+
+# Response header with the cursor to send as `after` to get the next page
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def encode_cursor(entity_id: int) -> str:
+    """
+    Returns the cursor that points right after an entity
+    :param entity_id: last entity's id of a page
+    :return: cursor
+    """
+    return base64.urlsafe_b64encode(str(entity_id).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Returns the entity id a cursor points after
+    :param cursor: cursor received
+    :return: entity's id or None without cursor
+    :raises HTTPException: 400 Invalid cursor
+    """
+    if cursor is None:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(entities: List[Base], limit: int) -> Optional[str]:
+    """
+    Returns the cursor of the next page, if the current one is full
+    :param entities: current page
+    :param limit: page's max size
+    :return: cursor or None if there are no more entities
+    """
+    return encode_cursor(entities[-1].id) if entities and len(entities) == limit else None
@@ -1,11 +1,81 @@
-from typing import List
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from api.src.db.crud import Crud
+from api.src.db.models import PlayerDB
+from api.src.engine.board import EMPTY_CELL
+from api.src.engine.rating import INITIAL_RATING
+from api.src.entities.responses import PlayerStats
 from api.src.entities.schemas import Player
-from api.src.services.service_interface import AppService
+from api.src.services.game_cache import CachedPlayer
+from api.src.services.pagination import decode_cursor, next_cursor
+from api.src.services.service_interface import AppService, AsyncAppService
+
+
+class PlayerCache:
+    """
+    Bounded LRU of stored players' ids and symbols by name, which do not change while the player exists. Deleting
+    a player evicts it, a stale entry left by another worker only costs a retry
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._players: 'OrderedDict[str, CachedPlayer]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, CachedPlayer]:
+        """
+        Returns the cached players among a list of names
+        :param names: players' names
+        :return: players found by name
+        """
+        found = {}
+        with self._lock:
+            for name in names:
+                player = self._players.get(name)
+                if player is None:
+                    self.misses += 1
+                    continue
+                self._players.move_to_end(name)
+                self.hits += 1
+                found[name] = player
+        return found
+
+    def put_many(self, players: Iterable[CachedPlayer]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for player in players:
+                self._players[player.name] = player
+                self._players.move_to_end(player.name)
+            while len(self._players) > self.max_size:
+                self._players.popitem(last=False)
+
+    def evict(self, names: Iterable[str]):
+        with self._lock:
+            for name in names:
+                self._players.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._players.clear()
+
+    def stats(self) -> dict:
+        return {'size': len(self._players),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+player_cache = PlayerCache(max_size=int(os.getenv('PLAYER_CACHE_SIZE', 100000)))
 
 
 class PlayerService(AppService):
@@ -13,14 +83,27 @@ class PlayerService(AppService):
         super().__init__(db)
         self._crud = Crud(db)
 
-    def get_all_players(self, skip: int = 0, limit: int = 100) -> List[Player]:
+    def get_all_players(self, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> List[Player]:
         """
         Returns all saved players from 0 to 100 by default
         :param skip: lower limit
         :param limit: max limit
+        :param after: cursor of the previous page
         :return: list of players
         """
-        return self._crud.get_players(skip, limit)
+        return self._crud.get_players(skip, limit, decode_cursor(after))
+
+    def get_players_page(self, skip: int = 0, limit: int = 100,
+                         after: Optional[str] = None) -> Tuple[List[Player], Optional[str]]:
+        """
+        Returns a page of players and the cursor of the next one
+        :param skip: lower limit
+        :param limit: max limit
+        :param after: cursor of the previous page
+        :return: list of players and next page's cursor
+        """
+        players = self.get_all_players(skip, limit, after)
+        return players, next_cursor(players, limit)
 
     def get_player(self, player_id: int) -> Player:
         """
@@ -34,6 +117,47 @@ class PlayerService(AppService):
             raise HTTPException(status_code=404, detail="Player not found")
         return player
 
+    def get_player_stats(self, player_id: int) -> PlayerStats:
+        """
+        Returns a player's results and rating
+        :param player_id: id of the player to find
+        :return: player's stats
+        :raises HTTPException: 404 Player not found
+        """
+        return self._player_stats(self.get_player(player_id))
+
+    def get_leaderboard(self, limit: int = 10) -> List[PlayerStats]:
+        """
+        Returns the players with the highest ratings
+        :param limit: max players
+        :return: list of players' stats, highest rating first
+        """
+        return [self._player_stats(player) for player in self._crud.get_leaderboard(limit)]
+
+    def _player_stats(self, player: PlayerDB) -> PlayerStats:
+        """
+        Private function that builds a player's stats from its stored counters
+        :param player: stored player
+        :return: player's stats
+        """
+        return PlayerStats(id=player.id,
+                           name=player.name,
+                           symbol=player.symbol,
+                           wins=player.wins,
+                           losses=player.losses,
+                           draws=player.draws,
+                           games=player.wins + player.losses + player.draws,
+                           rating=player.rating)
+
+    def get_match_profile(self, player_name: str) -> Tuple[int, Optional[str]]:
+        """
+        Returns what matchmaking needs of a player, defaults for players not stored yet
+        :param player_name: player's name
+        :return: rating and stored symbol
+        """
+        player = self._crud.get_player_by_name(player_name)
+        return (player.rating, player.symbol) if player else (INITIAL_RATING, None)
+
     def get_player_by_name(self, player_name: str) -> Player:
         """
         Returns player the first player with the requested name
@@ -51,8 +175,44 @@ class PlayerService(AppService):
         Creates and stores a new player
         :param new_player: new player to store
         :return: stored new player
+        :raises HTTPException: 406 if a player with the same name exists, 422 if the player has no symbol
+        """
+        if not new_player.symbol:
+            raise HTTPException(status_code=422, detail="Player's symbol required")
+        try:
+            player = self._crud.create_player(new_player)
+        except IntegrityError:
+            self._crud.rollback()
+            if self._crud.get_player_by_name(new_player.name):
+                raise HTTPException(status_code=406, detail="Player already exists")
+            raise
+        player_cache.put_many([CachedPlayer(id=player.id, name=player.name, symbol=player.symbol)])
+        return player
+
+    def store_players(self, players: List[Player]) -> List[CachedPlayer]:
+        """
+        Returns the stored players with the requested names, storing the missing ones. Stored players keep their
+        symbol
+        :param players: players with their names and symbols
+        :return: stored players, in the same order
+        """
+        found = player_cache.get_many(player.name for player in players)
+        missing = [player for player in players if player.name not in found]
+        if missing:
+            stored = [CachedPlayer(id=player_id, name=name, symbol=symbol)
+                      for player_id, name, symbol in self._crud.upsert_players(missing)]
+            player_cache.put_many(stored)
+            found.update((player.name, player) for player in stored)
+        return [found[player.name] for player in players]
+
+    def validate_stored_symbols(self, players: List[CachedPlayer]):
+        """
+        Validates that stored players, which keep the symbol they were created with, have different symbols
+        :param players: game's stored players
+        :raises HTTPException: 422 if both players were stored with the same symbol
         """
-        return self._crud.create_player(new_player)
+        if players[0].symbol.lower() == players[1].symbol.lower():
+            raise HTTPException(status_code=422, detail="Players' stored symbols must be different")
 
     def validate_players(self, players: List[Player]):
         """
@@ -80,4 +240,31 @@ class PlayerService(AppService):
         if players[0].symbol.lower() == players[1].symbol.lower():
             raise HTTPException(status_code=406, detail="Players' symbols must be different")
 
+        if EMPTY_CELL in (players[0].symbol, players[1].symbol):
+            raise HTTPException(status_code=406, detail="'{}' is not a valid symbol".format(EMPTY_CELL))
+
         return players
+
+
+class AsyncPlayerService(AsyncAppService):
+    service_class = PlayerService
+
+    async def get_all_players(self, skip: int = 0, limit: int = 100,
+                              after: Optional[str] = None) -> Tuple[List[Player], Optional[str]]:
+        return await self._read(lambda service: service.get_players_page(skip, limit, after),
+                                Tuple[List[Player], Optional[str]])
+
+    async def get_player(self, player_id: int) -> Player:
+        return await self._read(lambda service: service.get_player(player_id))
+
+    async def get_player_stats(self, player_id: int) -> PlayerStats:
+        return await self._read(lambda service: service.get_player_stats(player_id))
+
+    async def get_leaderboard(self, limit: int = 10) -> List[PlayerStats]:
+        return await self._read(lambda service: service.get_leaderboard(limit))
+
+    async def get_match_profile(self, player_name: str) -> Tuple[int, Optional[str]]:
+        return await self._run(lambda service: service.get_match_profile(player_name))
+
+    async def add_player(self, new_player: Player) -> Player:
+        return await self._run(lambda service: service.add_player(new_player), Player)
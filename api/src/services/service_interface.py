@@ -1,4 +1,20 @@
-from sqlalchemy.orm import Session
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional
+
+from pydantic import parse_obj_as
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.src.db import database
+
+# Threads running service calls, one per connection the sync pool can open by default
+SERVICE_THREADS = int(os.getenv('SERVICE_THREADS', database.POOL_SETTINGS['pool_size'] +
+                                database.POOL_SETTINGS['max_overflow']))
+service_executor = ThreadPoolExecutor(max_workers=SERVICE_THREADS, thread_name_prefix='service')
 
 
 class DBSession:
@@ -12,3 +28,62 @@ class AppService(DBSession):
 
 class AppCRUD(DBSession):
     pass
+
+
+class AsyncAppService:
+    """
+    Async facade of an AppService. Service and CRUD code runs unchanged in a sync session on a worker thread, so
+    neither its round-trips nor its ORM and serialization work block the event loop, and concurrent requests run
+    their calls in parallel up to SERVICE_THREADS.
+    Read-only calls that tolerate replication lag run through _read, on the read replica when one is configured.
+    The async session serves the statements streamed on the event loop, like exports
+    """
+    service_class = AppService
+
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def _run(self, call: Callable[[AppService], Any], response_model: Optional[Any] = None) -> Any:
+        """
+        Private function to run a service call in a session on the primary
+        :param call: function receiving the sync service
+        :param response_model: model the result is converted to before leaving the session, so no lazy load
+                               happens outside of it
+        :return: call's result
+        """
+        return await self._run_in(database.ServiceSessionLocal, call, response_model)
+
+    async def _read(self, call: Callable[[AppService], Any], response_model: Optional[Any] = None) -> Any:
+        """
+        Private function to run a read-only service call in a session on the read replica. Calls whose result is
+        cached or used to write must use _run, the replica may not have the latest writes yet
+        :param call: function receiving the sync service
+        :param response_model: model the result is converted to before leaving the session
+        :return: call's result
+        """
+        return await self._run_in(database.ServiceReadSessionLocal or database.ServiceSessionLocal, call,
+                                  response_model)
+
+    @asynccontextmanager
+    async def _read_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Private function that opens an async session on the read replica, or returns this service's session when
+        there is no replica
+        :return: session for read-only statements
+        """
+        if database.AsyncReadSessionLocal is None:
+            yield self._db
+            return
+        async with database.AsyncReadSessionLocal() as db:
+            yield db
+
+    async def _run_in(self, session_factory: sessionmaker, call: Callable[[AppService], Any],
+                      response_model: Optional[Any] = None) -> Any:
+        def run() -> Any:
+            with session_factory() as session:
+                result = call(self.service_class(session))
+                return parse_obj_as(response_model, result) if response_model else result
+
+        # The caller's context goes along, so statements are counted and timed for the request that ran them
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(service_executor, context.run, run)
@@ -0,0 +1,98 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Tuple
+
+from fastapi import HTTPException
+
+from api.src.engine import simulator
+from api.src.engine.board import COLUMNS, ROWS, WIN_LENGTH
+from api.src.entities.responses import OpeningStats, OpeningStatsResponse
+
+# Processes simulating each request, 1 runs them in a thread of the app's process
+STATS_WORKERS = int(os.getenv('STATS_WORKERS', 1))
+# Bound of games times board cells per request, keeps large boards from running for minutes
+MAX_SIMULATED_CELLS = 10000000
+STATS_CACHE_SIZE = 128
+# Fixed so results are reproducible and can be cached
+SEED = 0
+
+
+class StatsService:
+    """
+    Opening statistics from simulated games. Results never change for the same parameters, so they are kept in
+    a bounded cache and concurrent requests for the same parameters share one simulation
+    """
+
+    def __init__(self):
+        self._results: 'OrderedDict[Tuple, asyncio.Future]' = OrderedDict()
+
+    async def get_openings(self, games: int, first: str, second: str, rows: int, columns: int,
+                           win_length: int) -> OpeningStatsResponse:
+        """
+        Returns the win, loss and draw rates of each opening move
+        :param games: games to simulate
+        :param first: first player's policy
+        :param second: second player's policy
+        :param rows: board's rows
+        :param columns: board's columns
+        :param win_length: cells in a row needed to win
+        :return: statistics per opening
+        :raises HTTPException: 406 with invalid parameters
+        """
+        self._validate(games, first, second, rows, columns, win_length)
+        key = (games, first, second, rows, columns, win_length)
+        result = self._results.get(key)
+        if result is None:
+            result = asyncio.get_event_loop().run_in_executor(None, self._simulate, *key)
+            self._results[key] = result
+            while len(self._results) > STATS_CACHE_SIZE:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+        try:
+            return await asyncio.shield(result)
+        except Exception:
+            if self._results.get(key) is result:
+                del self._results[key]
+            raise
+
+    def clear(self):
+        self._results.clear()
+
+    @staticmethod
+    def _validate(games: int, first: str, second: str, rows: int, columns: int, win_length: int):
+        """
+        Private function to validate the simulation's parameters
+        :raises HTTPException: 406
+        """
+        if first not in simulator.POLICIES or second not in simulator.POLICIES:
+            raise HTTPException(status_code=406, detail="Policy must be one of {}".format(
+                ', '.join(simulator.POLICIES)))
+        if win_length > max(rows, columns):
+            raise HTTPException(status_code=406, detail="Win length must fit in the board")
+        if simulator.PERFECT in (first, second) and (rows, columns, win_length) != (ROWS, COLUMNS, WIN_LENGTH):
+            raise HTTPException(status_code=406, detail="Perfect policy only plays on 3x3 boards")
+        if games * rows * columns > MAX_SIMULATED_CELLS:
+            raise HTTPException(status_code=406, detail="Too many games for the board size, at most {}".format(
+                MAX_SIMULATED_CELLS // (rows * columns)))
+
+    @staticmethod
+    def _simulate(games: int, first: str, second: str, rows: int, columns: int,
+                  win_length: int) -> OpeningStatsResponse:
+        counts = simulator.parallel_opening_counts(games, first, second, rows, columns, win_length, SEED,
+                                                   STATS_WORKERS)
+        openings = []
+        for cell, (played, first_wins, second_wins, draws, moves) in enumerate(counts.tolist()):
+            played_or_one = played or 1
+            openings.append(OpeningStats(row=cell // columns + 1, column=cell % columns + 1, games=played,
+                                         first_wins=first_wins, second_wins=second_wins, draws=draws,
+                                         first_win_rate=first_wins / played_or_one,
+                                         second_win_rate=second_wins / played_or_one,
+                                         draw_rate=draws / played_or_one,
+                                         average_moves=moves / played_or_one))
+        return OpeningStatsResponse(rows=rows, columns=columns, win_length=win_length, first_policy=first,
+                                    second_policy=second, games=games, openings=openings)
+
+
+stats_service = StatsService()
@@ -0,0 +1,65 @@
+"""
+Tests run the app in-process against a fresh SQLite database, or the one in DATABASE_URL and ASYNC_DATABASE_URL.
+Run them from the repository root: `python -m pytest api/tests`
+Needs pytest, aiosqlite and httpx.
+"""
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api.benchmarks.common import api_client, use_sqlite
+
+use_sqlite('tests')
+
+
+@event.listens_for(Engine, 'connect')
+def _foreign_keys(dbapi_connection, connection_record):
+    """SQLite checks foreign keys only when asked to, tests check them as PostgreSQL does"""
+    if 'sqlite' in type(dbapi_connection).__module__:
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def schema() -> int:
+    """
+    Brings the tests' database to the latest schema version
+    :return: schema version
+    """
+    from api.src.db import database
+    from api.src.db.migrations import bootstrap
+
+    return bootstrap(database.engine)
+
+
+@pytest.fixture
+def call_api() -> Callable[[Callable[[Any], Awaitable[Any]]], Any]:
+    """
+    Runs a coroutine function with an HTTP client of the app, in its own event loop
+    :return: function receiving the coroutine function and returning its result
+    """
+    from api.app import app
+
+    def run(test: Callable[[Any], Awaitable[Any]]) -> Any:
+        async def main():
+            async with api_client(app) as client:
+                return await test(client)
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def names() -> Callable[[int], list]:
+    """
+    Player names not used by other tests, tests share the database
+    :return: function receiving how many names to return
+    """
+    prefix = uuid.uuid4().hex[:8]
+    return lambda count: ['{}-{}'.format(prefix, number) for number in range(count)]
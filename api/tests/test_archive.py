@@ -0,0 +1,106 @@
+"""Reads of games moved to the archive tables: listings page across both tiers, games keep answering by id."""
+import json
+
+from api.src.services.archive_service import game_archiver
+from api.src.services.game_cache import game_cache
+from api.src.services.game_snapshots import game_snapshots
+from api.src.services.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+WINNING_MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+PAGES = ((0, 3), (2, 3), (4, 5), (7, 100), (0, 100))
+
+
+async def _new_game(client, players: list, moves: tuple = ()) -> int:
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    game_id = response.json()['id']
+    for turn, (row, column) in enumerate(moves):
+        play = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+    return game_id
+
+
+async def _ids(client, **params) -> list:
+    response = await client.get('/game/all', params={'limit': 100000, **params})
+    assert response.status_code == 200, response.text
+    return [game['id'] for game in response.json()]
+
+
+def test_pages_span_both_tiers(call_api, names):
+    a, b = names(2)
+
+    async def pages(client):
+        game_ids = []
+        for number in range(8):
+            game_ids.append(await _new_game(client, [a, b], WINNING_MOVES if number % 2 else WINNING_MOVES[:2]))
+            if number == 4:
+                await game_archiver.run_once()
+        listed = {}
+        for finished in (None, True):
+            params = {} if finished is None else {'finished': finished}
+            listed[finished] = await _ids(client, **params), [
+                await _ids(client, skip=skip, limit=limit, **params) for skip, limit in PAGES]
+        return game_ids, listed, await _ids(client, finished=False)
+
+    game_ids, listed, unfinished = call_api(pages)
+    for finished, (every_game, pages_) in listed.items():
+        assert every_game == sorted(every_game)
+        assert [every_game[skip:skip + limit] for skip, limit in PAGES] == pages_
+    assert set(game_ids) <= set(listed[None][0])
+    assert set(game_ids[1::2]) <= set(listed[True][0])
+    assert set(game_ids[0::2]) <= set(unfinished)
+    assert set(game_ids[1::2]).isdisjoint(unfinished)
+
+
+def test_archived_games_are_read_by_id(call_api, names):
+    a, b = names(2)
+
+    async def read(client):
+        game_id = await _new_game(client, [a, b], WINNING_MOVES)
+        before = (await client.get('/game/{}'.format(game_id))).json()
+        archived = await game_archiver.run_once()
+        game_cache.clear()
+        game_snapshots.clear()
+        return (game_id, before, archived, (await client.get('/game/{}'.format(game_id))).json(),
+                (await client.get('/game/movements/{}'.format(game_id))).json(),
+                (await client.get('/game/{}/replay'.format(game_id))).json())
+
+    game_id, before, archived, after, movements, replay = call_api(read)
+    assert archived['archived'] >= 1
+    assert after == before
+    assert after['winner'] == a
+    assert [(movement['row'], movement['column']) for movement in movements] == list(WINNING_MOVES)
+    assert replay['board'] == after['board']
+
+
+def test_export_spans_both_tiers(call_api, names):
+    a, b = names(2)
+
+    async def export(client):
+        game_ids = [await _new_game(client, [a, b], WINNING_MOVES)]
+        await game_archiver.run_once()
+        game_ids.append(await _new_game(client, [a, b], WINNING_MOVES[:2]))
+        response = await client.get('/game/export', params={'min_id': game_ids[0], 'max_id': game_ids[-1]})
+        return game_ids, [json.loads(line) for line in response.text.splitlines()]
+
+    game_ids, exported = call_api(export)
+    assert [game['id'] for game in exported] == game_ids
+    for game, moves in zip(exported, (WINNING_MOVES, WINNING_MOVES[:2])):
+        assert [player['name'] for player in game['players']] == [a, b]
+        assert [(play['player'], play['row'], play['column']) for play in game['plays']] == \
+            [([a, b][turn % 2], row, column) for turn, (row, column) in enumerate(moves)]
+    assert exported[0]['winner'] == a
+
+
+def test_cursor_survives_archiving_between_pages(call_api, names):
+    a, b = names(2)
+
+    async def walk(client):
+        game_ids = [await _new_game(client, [a, b], WINNING_MOVES) for _ in range(4)]
+        first = await client.get('/game/all', params={'limit': 2, 'after': encode_cursor(game_ids[0] - 1)})
+        await game_archiver.run_once()
+        game_cache.clear()
+        second = await client.get('/game/all', params={'limit': 2, 'after': first.headers[NEXT_CURSOR_HEADER]})
+        return game_ids, [game['id'] for game in first.json() + second.json()]
+
+    game_ids, walked = call_api(walk)
+    assert walked == game_ids
@@ -0,0 +1,120 @@
+"""N x M, k-in-a-row boards: the bitboard engine and games played on boards of every size through the API."""
+import json
+import random
+
+import pytest
+
+from api.src.engine.board import Board, board_rows, empty_board, win_masks
+
+SIZES = ((3, 3, 3), (4, 5, 4), (5, 4, 3), (6, 7, 4), (19, 19, 5), (3, 8, 3))
+
+
+@pytest.mark.parametrize('rows, columns, win_length, lines', [(3, 3, 3, 8), (4, 5, 4, 17), (4, 4, 3, 24)])
+def test_win_masks_cover_every_line(rows, columns, win_length, lines):
+    masks = win_masks(rows, columns, win_length)
+    assert len(masks) == len(set(masks)) == lines
+    assert all(bin(mask).count('1') == win_length for mask in masks)
+
+
+@pytest.mark.parametrize('rows, columns, win_length', SIZES)
+def test_last_move_detects_the_same_wins_as_a_board_scan(rows, columns, win_length):
+    generator = random.Random(rows * 100 + columns * 10 + win_length)
+    cells = [(row, column) for row in range(1, rows + 1) for column in range(1, columns + 1)]
+    for _ in range(50):
+        board = Board(rows=rows, columns=columns, win_length=win_length)
+        for turn, (row, column) in enumerate(generator.sample(cells, len(cells))):
+            player = turn % 2
+            assert board.is_free(row, column)
+            board.play(player, row, column)
+            assert not board.is_free(row, column)
+            won = board.is_winning_move(player, row, column)
+            assert won == board.is_winner(player)
+            if won:
+                assert board.winner() == player
+                break
+        else:
+            assert board.winner() is None
+
+
+@pytest.mark.parametrize('rows, columns, win_length', SIZES)
+def test_encode_decode_round_trip(rows, columns, win_length):
+    generator = random.Random(rows + columns)
+    cells = generator.sample(range(rows * columns), rows * columns // 2)
+    stored = ''.join('XO'[cells.index(cell) % 2] if cell in cells else '-' for cell in range(rows * columns))
+
+    board = Board.decode(stored, ['X', 'O'], rows, columns, win_length)
+
+    assert board.encode(['X', 'O']) == stored
+    assert Board.decode(stored, ['O', 'X'], rows, columns).masks == board.masks[::-1]
+    assert Board.from_rows(json.loads(board_rows(stored, rows, columns)), ['X', 'O'], win_length).masks == board.masks
+    assert board.contains(rows, columns) and not board.contains(rows + 1, columns) \
+        and not board.contains(rows, columns + 1)
+
+
+def test_board_rows():
+    assert json.loads(board_rows('X-O---', 2, 3)) == [['X', None, 'O'], [None, None, None]]
+    assert json.loads(board_rows(empty_board(3, 4), 3, 4)) == [[None] * 4] * 3
+
+
+async def _play(client, players: list, moves: list, **dimensions) -> list:
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players], **dimensions})
+    assert response.status_code == 201, response.text
+    game_id = response.json()['id']
+    responses = [response]
+    for turn, (row, column) in enumerate(moves):
+        play = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        responses.append(await client.post('/game/submit-play', json=play))
+    return responses
+
+
+def test_k_in_a_row_on_a_rectangular_board(call_api, names):
+    a, b = names(2)
+    # a plays a diagonal of 4 on a 4 x 5 board, b plays the first row
+    moves = [(1, 2), (1, 1), (2, 3), (1, 3), (3, 4), (1, 4), (4, 5)]
+
+    responses = call_api(lambda client: _play(client, [a, b], moves, rows=4, columns=5, win_length=4))
+
+    assert [response.status_code for response in responses] == [201] * len(responses)
+    created = responses[0].json()
+    assert (created['rows'], created['columns'], created['win_length']) == (4, 5, 4)
+    assert json.loads(created['board']) == [[None] * 5] * 4
+    assert [response.json()['winner'] for response in responses[1:]] == [None] * 6 + [a]
+    board = json.loads(responses[-1].json()['board'])
+    assert [board[index][index + 1] for index in range(4)] == ['X'] * 4
+    assert board[0] == ['O', 'X', 'O', 'O', None]
+
+
+def test_full_board_without_a_line_is_a_draw(call_api, names):
+    a, b = names(2)
+    moves = [(1, 1), (1, 2), (1, 3), (2, 2), (2, 1), (2, 3), (3, 2), (3, 1), (3, 3)]
+
+    responses = call_api(lambda client: _play(client, [a, b], moves + [(1, 1)]))
+
+    assert [response.status_code for response in responses[:-1]] == [201] * (len(moves) + 1)
+    assert responses[-2].json()['winner'] is None
+    assert responses[-2].json()['movements_played'] == 9
+    assert responses[-1].status_code == 406
+
+
+@pytest.mark.parametrize('dimensions, status_code', [({'rows': 3, 'columns': 4, 'win_length': 5}, 406),
+                                                     ({'rows': 20}, 422),
+                                                     ({'columns': 2}, 422),
+                                                     ({'win_length': 2}, 422)])
+def test_invalid_dimensions_are_rejected(call_api, names, dimensions, status_code):
+    players = [{'name': name} for name in names(2)]
+
+    response = call_api(lambda client: client.post('/game/new', json={'players': players, **dimensions}))
+
+    assert response.status_code == status_code
+
+
+def test_moves_out_of_a_rectangular_board_are_rejected(call_api, names):
+    a, b = names(2)
+
+    async def play(client):
+        return [(await _play(client, [a, b], [move], rows=4, columns=5))[-1] for move in ((4, 5), (5, 1), (1, 6))]
+
+    responses = call_api(play)
+
+    assert [response.status_code for response in responses] == [201, 406, 406]
+    assert [response.json()['detail'] for response in responses[1:]] == ['Movement out of board'] * 2
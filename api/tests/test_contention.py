@@ -0,0 +1,58 @@
+"""
+Concurrent plays against the same game: of the clients sending the same move at once exactly one must be stored,
+and the game must end up with every move applied once.
+"""
+import asyncio
+import json
+from collections import Counter
+
+from api.app import app
+from api.benchmarks.common import api_client
+
+CLIENTS = 8
+GAMES = 5
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (3, 3), (3, 1), (1, 3))
+
+
+async def _play_game(client, number: int) -> dict:
+    """
+    Plays a game sending every move CLIENTS times at once
+    :return: status codes of each move, final game, its movements and its replay
+    """
+    players = ['contention-a{}'.format(number), 'contention-b{}'.format(number)]
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    assert response.status_code == 201, response.text
+    game_id = response.json()['id']
+    statuses = []
+    for turn, (row, column) in enumerate(MOVES):
+        move = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        responses = await asyncio.gather(*(client.post('/game/submit-play', json=move) for _ in range(CLIENTS)))
+        statuses.append(Counter(response.status_code for response in responses))
+
+    return {'players': players,
+            'statuses': statuses,
+            'game': (await client.get('/game/{}'.format(game_id))).json(),
+            'movements': (await client.get('/game/movements/{}'.format(game_id))).json(),
+            'replay': (await client.get('/game/{}/replay'.format(game_id))).json()}
+
+
+async def _play_games() -> list:
+    async with api_client(app) as client:
+        return await asyncio.gather(*(_play_game(client, number) for number in range(GAMES)))
+
+
+def test_concurrent_moves_are_applied_once():
+    for result in asyncio.run(_play_games()):
+        for codes in result['statuses']:
+            assert codes[201] == 1, codes
+            assert set(codes) <= {201, 406, 409}, codes
+
+        game = result['game']
+        assert game['movements_played'] == len(MOVES)
+        assert game['winner'] == result['players'][0]
+        assert [(movement['player']['name'], movement['row'], movement['column'])
+                for movement in result['movements']] == [(result['players'][turn % 2], row, column)
+                                                         for turn, (row, column) in enumerate(MOVES)]
+        board = json.loads(game['board'])
+        assert sum(cell is not None for cells in board for cell in cells) == len(MOVES)
+        assert result['replay']['board'] == game['board']
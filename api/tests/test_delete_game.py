@@ -0,0 +1,70 @@
+"""Deleting a game removes it with its plays and players' links, and nothing else."""
+from sqlalchemy import func, select
+
+from api.src.db import database
+from api.src.db.models import GameArchiveDB, PlayArchiveDB, PlayDB, PlayerDB, player_game, player_game_archive
+from api.src.services.archive_service import game_archiver
+
+WINNING_MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+async def _new_game(client, players: list) -> int:
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+async def _finished_game(client, players: list) -> int:
+    game_id = await _new_game(client, players)
+    for turn, (row, column) in enumerate(WINNING_MOVES):
+        play = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+    return game_id
+
+
+def _count(statement) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(statement).scalar()
+
+
+def test_delete_game_keeps_the_players_other_games(call_api, names):
+    a, b, c, d, e = names(5)
+
+    async def delete(client):
+        game_ids = [await _new_game(client, players) for players in ([a, b], [a, c], [d, e])]
+        play = {'game_id': game_ids[0], 'player_name': a, 'row': 1, 'column': 1}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+        await client.get('/game/{}'.format(game_ids[1]))
+        deleted = await client.delete('/game/{}'.format(game_ids[0]))
+        return game_ids, deleted, [await client.get('/game/{}'.format(game_id)) for game_id in game_ids]
+
+    game_ids, deleted, games = call_api(delete)
+    assert deleted.status_code == 200
+    assert deleted.json()['id'] == game_ids[0]
+    assert [game.status_code for game in games] == [404, 200, 200]
+    assert [player['name'] for player in games[1].json()['players']] == [a, c]
+    assert _count(select(func.count()).where(PlayerDB.name.in_([a, b, c, d, e]))) == 5
+    assert _count(select(func.count()).where(PlayDB.game_id == game_ids[0])) == 0
+    assert _count(select(func.count()).select_from(player_game).where(player_game.c.game_id == game_ids[0])) == 0
+
+
+def test_delete_games_of_players_with_archived_games(call_api, names):
+    a, b = names(2)
+
+    async def delete(client):
+        archived_id = await _finished_game(client, [a, b])
+        await game_archiver.run_once()
+        live_id = await _new_game(client, [a, b])
+        game_ids = (live_id, archived_id)
+        deleted = [await client.delete('/game/{}'.format(game_id)) for game_id in game_ids]
+        return archived_id, deleted, [await client.get('/game/{}'.format(game_id)) for game_id in game_ids]
+
+    archived_id, deleted, games = call_api(delete)
+    assert [response.status_code for response in deleted] == [200, 200]
+    assert deleted[1].json()['winner'] == a
+    assert [game.status_code for game in games] == [404, 404]
+    assert _count(select(func.count()).where(PlayerDB.name.in_([a, b]))) == 2
+    assert _count(select(func.count()).where(GameArchiveDB.id == archived_id)) == 0
+    assert _count(select(func.count()).where(PlayArchiveDB.game_id == archived_id)) == 0
+    assert _count(select(func.count()).select_from(player_game_archive)
+                  .where(player_game_archive.c.game_id == archived_id)) == 0
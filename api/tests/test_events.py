@@ -0,0 +1,79 @@
+"""Games deleted, archived or expired are evicted from the caches of the other workers."""
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from api.src.db import database
+from api.src.db.models import GameDB
+from api.src.services import events
+from api.src.services.archive_service import game_archiver
+from api.src.services.events import CHANNEL, PostgresBroker, game_events
+from api.src.services.game_cache import game_cache
+from api.src.services.game_snapshots import game_snapshots
+
+WINNING_MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+class RecordingBroker(events.MemoryBroker):
+    def __init__(self):
+        super().__init__(game_events)
+        self.evicted = []
+
+    async def publish_eviction(self, game_ids):
+        self.evicted.extend(game_ids)
+        await super().publish_eviction(game_ids)
+
+
+async def _new_game(client, players: list, moves: tuple = ()) -> int:
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    game_id = response.json()['id']
+    for turn, (row, column) in enumerate(moves):
+        play = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+    return game_id
+
+
+def _abandon(game_id: int):
+    with database.engine.begin() as connection:
+        connection.execute(update(GameDB).where(GameDB.id == game_id)
+                           .values(updated_at=datetime.utcnow() - game_archiver.ttl - timedelta(hours=1)))
+
+
+def test_removed_games_are_published(call_api, names, monkeypatch):
+    broker = RecordingBroker()
+    monkeypatch.setattr(events, 'broker', broker)
+    a, b = names(2)
+
+    async def remove(client):
+        deleted_id = await _new_game(client, [a, b])
+        finished_id = await _new_game(client, [a, b], WINNING_MOVES)
+        abandoned_id = await _new_game(client, [a, b])
+        await client.delete('/game/{}'.format(deleted_id))
+        _abandon(abandoned_id)
+        await game_archiver.run_once()
+        return deleted_id, finished_id, abandoned_id
+
+    game_ids = call_api(remove)
+    assert set(game_ids) <= set(broker.evicted)
+
+
+def test_evictions_of_other_workers_drop_cached_games(call_api, names):
+    a, b = names(2)
+
+    async def cache(client):
+        game_id = await _new_game(client, [a, b], WINNING_MOVES[:1])
+        assert (await client.get('/game/{}'.format(game_id))).status_code == 200
+        return game_id
+
+    game_id = call_api(cache)
+    assert game_snapshots.get(game_id) is not None
+    assert game_cache.get(game_id) is not None
+    broker = PostgresBroker(game_events, 'postgresql://unused')
+
+    broker._notified(None, 0, CHANNEL, json.dumps({'origin': events.ORIGIN, 'evicted': [game_id]}))
+    assert game_snapshots.get(game_id) is not None
+
+    broker._notified(None, 0, CHANNEL, json.dumps({'origin': 'other worker', 'evicted': [game_id]}))
+    assert game_snapshots.get(game_id) is None
+    assert game_cache.get(game_id) is None
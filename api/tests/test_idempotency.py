@@ -0,0 +1,108 @@
+"""
+Retry storms with an Idempotency-Key: concurrent and later retries of a request must run it once, store a single
+response for the key and replay that same response to every retry.
+"""
+import asyncio
+import uuid
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import func, select
+
+from api.app import app
+from api.benchmarks.common import api_client
+from api.src.db import database
+from api.src.db.database import AsyncSessionLocal
+from api.src.db.models import IdempotencyKeyDB
+from api.src.services.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENT_REPLAYED_HEADER, AsyncIdempotencyService
+
+RETRIES = 8
+
+
+async def _retry(client, url: str, body: dict, key: str) -> list:
+    """
+    Sends a request RETRIES times at once and RETRIES more times after they answered
+    :return: responses
+    """
+    headers = {IDEMPOTENCY_KEY_HEADER: key}
+    responses = list(await asyncio.gather(*(client.post(url, json=body, headers=headers) for _ in range(RETRIES))))
+    responses += [await client.post(url, json=body, headers=headers) for _ in range(RETRIES)]
+    return responses
+
+
+def _stored_keys(key: str) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(select(func.count()).where(IdempotencyKeyDB.key == key)).scalar()
+
+
+def _assert_replayed(responses: list, status_code: int):
+    assert [response.status_code for response in responses] == [status_code] * len(responses)
+    assert len({response.content for response in responses}) == 1
+    # The request that ran answers errors without the header
+    assert sorted(response.headers.get(IDEMPOTENT_REPLAYED_HEADER, 'false') for response in responses) == \
+        ['false'] + ['true'] * (len(responses) - 1)
+
+
+def test_concurrent_retries_run_once():
+    players = ['idempotency-a', 'idempotency-b']
+    new_game_key, play_key = uuid.uuid4().hex, uuid.uuid4().hex
+
+    async def storm():
+        async with api_client(app) as client:
+            games = await _retry(client, '/game/new', {'players': [{'name': name} for name in players]},
+                                 new_game_key)
+            game_id = games[0].json()['id']
+            plays = await _retry(client, '/game/submit-play', {'game_id': game_id, 'player_name': players[0],
+                                                               'row': 1, 'column': 1}, play_key)
+            listed = (await client.get('/game/all', params={'limit': 100000})).json()
+            return games, plays, [game for game in listed if game['players'][0]['name'] == players[0]]
+
+    games, plays, created = asyncio.run(storm())
+    _assert_replayed(games, 201)
+    _assert_replayed(plays, 201)
+    assert len(created) == 1
+    assert created[0]['movements_played'] == 1
+    assert _stored_keys(new_game_key) == _stored_keys(play_key) == 1
+
+
+def test_concurrent_retries_of_a_failed_request_replay_the_error():
+    key = uuid.uuid4().hex
+
+    async def storm():
+        async with api_client(app) as client:
+            return await _retry(client, '/game/submit-play', {'game_id': 999999, 'player_name': 'nobody',
+                                                              'row': 1, 'column': 1}, key)
+
+    _assert_replayed(asyncio.run(storm()), 404)
+    assert _stored_keys(key) == 1
+
+
+class _Request(BaseModel):
+    value: int
+
+
+def test_waiters_of_a_retryable_failure_run_again_once():
+    key = uuid.uuid4().hex
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        await asyncio.sleep(0.05)
+        if len(calls) == 1:
+            raise HTTPException(status_code=409, detail='Conflict')
+        return {'calls': len(calls)}
+
+    async def execute():
+        async with AsyncSessionLocal() as db:
+            return await AsyncIdempotencyService(db).execute('test', key, _Request(value=1), 201, call)
+
+    async def storm():
+        async with api_client(app):
+            return await asyncio.gather(*(execute() for _ in range(RETRIES)), return_exceptions=True)
+
+    results = asyncio.run(storm())
+    failed = [result for result in results if isinstance(result, BaseException)]
+    assert [exception.status_code for exception in failed] == [409]
+    assert len(calls) == 2
+    assert len({result[0] for result in results if result not in failed}) == 1
+    assert _stored_keys(key) == 1
@@ -0,0 +1,72 @@
+"""Bulk import: malformed records are rejected one by one, valid ones around them are stored."""
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from api.import_games import RejectedRecord, import_games, replay
+from api.src.db import database
+from api.src.db.models import GameDB, PlayerDB, player_game
+
+PLAYERS = [{'name': 'a', 'symbol': 'X'}, {'name': 'b', 'symbol': 'O'}]
+PLAYS = [{'player': 'a', 'row': 1, 'column': 1}, {'player': 'b', 'row': 2, 'column': 2}]
+
+
+@pytest.mark.parametrize('record', [
+    [],
+    {'players': ['a', 'b']},
+    {'players': 'ab'},
+    {'players': [{'name': 'a'}, {'name': 1}]},
+    {'players': [{'name': 'a'}, {'name': 'b' * 51}]},
+    {'players': [{'name': 'a'}, {'name': 'a'}]},
+    {'players': [{'name': 'a', 'symbol': 1}, {'name': 'b'}]},
+    {'players': [{'name': 'a', 'symbol': 'XO'}, {'name': 'b'}]},
+    {'players': [{'name': 'a', 'symbol': 'x'}, {'name': 'b', 'symbol': 'X'}]},
+    {'players': [{'name': 'a', 'symbol': '-'}, {'name': 'b'}]},
+    {'players': PLAYERS, 'plays': 'x'},
+    {'players': PLAYERS, 'plays': ['x']},
+    {'players': PLAYERS, 'plays': [{'player': 'c', 'row': 1, 'column': 1}]},
+    {'players': PLAYERS, 'plays': [{'player': 'a', 'row': '1', 'column': 1}]},
+    {'players': PLAYERS, 'plays': [{'player': 'a', 'row': 4, 'column': 1}]},
+    {'players': PLAYERS, 'plays': [PLAYS[0], {'player': 'b', 'row': 1, 'column': 1}]},
+    {'players': PLAYERS, 'plays': [PLAYS[0], PLAYS[0]]},
+    {'players': PLAYERS, 'plays': PLAYS, 'starting_player': 'b'},
+    {'players': PLAYERS, 'rows': 1},
+    {'players': PLAYERS, 'rows': 3, 'columns': 3, 'win_length': 4},
+])
+def test_malformed_records_are_rejected(record):
+    with pytest.raises(RejectedRecord):
+        replay(record)
+
+
+def test_starting_player_makes_the_first_play():
+    game = replay({'players': PLAYERS, 'plays': PLAYS[::-1], 'starting_player': 'b'})
+    assert game.game['next_turn'] == 'b'
+    assert game.game['board'] == 'X---O----'
+    assert replay({'players': PLAYERS, 'plays': PLAYS[::-1]}).game['next_turn'] == 'b'
+    assert replay({'players': PLAYERS, 'starting_player': 'b'}).game['next_turn'] == 'b'
+    assert replay({'players': PLAYERS}).game['next_turn'] == 'a'
+
+
+def test_import_stores_the_valid_records_around_malformed_ones(names):
+    a, b, c = names(3)
+    players = [{'name': a, 'symbol': 'X'}, {'name': b, 'symbol': 'O'}]
+    lines = [{'players': players, 'plays': [{'player': a, 'row': 1, 'column': 1}]},
+             {'players': [a, b]},
+             {'players': [{'name': a, 'symbol': 1}, {'name': c}]},
+             {'players': players, 'plays': ['x']},
+             {'players': [{'name': c, 'symbol': 'Z'}, {'name': b}]}]
+    rejects = io.StringIO()
+
+    report = import_games(enumerate(lines, 1), 2, rejects)
+
+    assert (report['imported'], report['rejected']) == (2, 3)
+    assert [json.loads(line)['record'] for line in rejects.getvalue().splitlines()] == [2, 3, 4]
+    with database.engine.connect() as connection:
+        stored = connection.execute(select(PlayerDB.name, func.count(GameDB.id))
+                                    .join(player_game, player_game.c.player_id == PlayerDB.id)
+                                    .join(GameDB, GameDB.id == player_game.c.game_id)
+                                    .where(PlayerDB.name.in_([a, b, c]))
+                                    .group_by(PlayerDB.name)).all()
+    assert dict(stored) == {a: 1, b: 2, c: 1}
@@ -0,0 +1,121 @@
+"""Migrations bring a database created by the app before versioning to the latest schema, keeping its games."""
+import json
+
+import pytest
+from sqlalchemy import Boolean, CHAR, Column, ForeignKey, Integer, MetaData, String, Table, create_engine, inspect, \
+    text
+
+from api import app
+from api.src.db.migrations import BASELINE_VERSION, bootstrap, check, current_version, latest_version
+from api.src.engine.move_log import decode_moves
+from api.src.engine.rating import INITIAL_RATING
+
+# Tables created by the app before the first migration
+baseline = MetaData()
+Table('player', baseline,
+      Column('id', Integer, primary_key=True),
+      Column('name', String(50), nullable=False),
+      Column('symbol', CHAR, nullable=False))
+Table('game', baseline,
+      Column('id', Integer, primary_key=True),
+      Column('movements_played', Integer, nullable=False),
+      Column('next_turn', String(50)),
+      Column('board', String(255), nullable=False),
+      Column('winner', String(50)),
+      Column('finished', Boolean, nullable=False))
+Table('player_game', baseline,
+      Column('player_id', ForeignKey('player.id'), primary_key=True),
+      Column('game_id', ForeignKey('game.id'), primary_key=True))
+Table('play', baseline,
+      Column('id', Integer, primary_key=True),
+      Column('game_id', Integer, ForeignKey('game.id')),
+      Column('player_id', Integer, ForeignKey('player.id')),
+      Column('row', Integer, nullable=False),
+      Column('column', Integer, nullable=False))
+
+WON_PLAYS = ((1, 1, 1), (2, 2, 1), (1, 1, 2), (2, 2, 2), (1, 1, 3))
+OPEN_PLAYS = ((3, 1, 1), (4, 2, 2))
+
+
+def _rows(cells: list) -> str:
+    return json.dumps([cells[start:start + 3] for start in (0, 3, 6)])
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    """Database as the app created it before versioning: two games, and two players both named ann"""
+    engine = create_engine('sqlite:///{}'.format(tmp_path / 'baseline.db'))
+    baseline.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO player (id, name, symbol) VALUES "
+                                "(1, 'ann', 'X'), (2, 'bob', 'O'), (3, 'ann', 'X'), (4, 'cid', 'O')"))
+        connection.execute(text('INSERT INTO game (id, movements_played, next_turn, board, winner, finished) '
+                                'VALUES (:id, :movements, :next_turn, :board, :winner, :finished)'), [
+            {'id': 1, 'movements': 5, 'next_turn': 'bob', 'winner': 'ann', 'finished': True,
+             'board': _rows(['X', 'X', 'X', 'O', 'O', None, None, None, None])},
+            {'id': 2, 'movements': 2, 'next_turn': 'ann', 'winner': None, 'finished': False,
+             'board': _rows(['X', None, None, None, 'O', None, None, None, None])}])
+        connection.execute(text('INSERT INTO player_game VALUES (1, 1), (2, 1), (3, 2), (4, 2)'))
+        connection.execute(text('INSERT INTO play (game_id, player_id, "row", "column") VALUES '
+                                '(:game_id, :player_id, :row, :column)'),
+                           [{'game_id': game_id, 'player_id': player_id, 'row': row, 'column': column}
+                            for game_id, plays in ((1, WON_PLAYS), (2, OPEN_PLAYS))
+                            for player_id, row, column in plays])
+    yield engine
+    engine.dispose()
+
+
+def test_baseline_database_is_migrated(baseline_engine):
+    assert bootstrap(baseline_engine) == latest_version()
+
+    with baseline_engine.connect() as connection:
+        versions = [row[0] for row in connection.execute(text('SELECT version FROM schema_version ORDER BY 1'))]
+        games = {row.id: row for row in connection.execute(text('SELECT * FROM game'))}
+        players = {row.name: row for row in connection.execute(text('SELECT * FROM player'))}
+        plays = connection.execute(text('SELECT game_id, player_id FROM play ORDER BY id')).fetchall()
+        play_sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE name = 'play'")).scalar()
+        sequence = connection.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'play'")).scalar()
+        tables = set(inspect(connection).get_table_names())
+
+    assert versions == list(range(BASELINE_VERSION, latest_version() + 1))
+    assert (games[1].board, games[2].board) == ('XXXOO----', 'X---O----')
+    assert (games[1].rows, games[1].columns, games[1].win_length, games[1].version) == (3, 3, 3, 1)
+    assert decode_moves(games[1].moves, 3, 3) == [(row, column) for _, row, column in WON_PLAYS]
+    assert decode_moves(games[2].moves, 3, 3) == [(row, column) for _, row, column in OPEN_PLAYS]
+    assert all(game.updated_at is not None for game in games.values())
+
+    # The second ann is merged into the first, with her game, plays and results
+    assert sorted(players) == ['ann', 'bob', 'cid']
+    assert players['ann'].id == 1
+    assert (players['ann'].wins, players['ann'].losses, players['ann'].draws) == (1, 0, 0)
+    assert (players['bob'].wins, players['bob'].losses, players['bob'].draws) == (0, 1, 0)
+    assert {player.rating for player in players.values()} == {INITIAL_RATING}
+    assert [player_id for game_id, player_id in plays if game_id == 2] == [1, 4]
+
+    assert {'game_archive', 'player_game_archive', 'play_archive', 'idempotency_key'} <= tables
+    assert 'AUTOINCREMENT' in play_sql
+    assert sequence == len(WON_PLAYS) + len(OPEN_PLAYS)
+
+
+def test_bootstrap_only_applies_missing_migrations(baseline_engine):
+    bootstrap(baseline_engine)
+    with baseline_engine.connect() as connection:
+        applied = connection.execute(text('SELECT count(*) FROM schema_version')).scalar()
+
+    assert bootstrap(baseline_engine) == latest_version()
+    with baseline_engine.connect() as connection:
+        assert connection.execute(text('SELECT count(*) FROM schema_version')).scalar() == applied
+    assert check(baseline_engine) == latest_version()
+
+
+def test_check_rejects_outdated_schema(baseline_engine):
+    with baseline_engine.connect() as connection:
+        assert current_version(connection) is None
+    with pytest.raises(RuntimeError, match='Schema version is None'):
+        check(baseline_engine)
+
+
+def test_unknown_bootstrap_mode_is_rejected(monkeypatch):
+    monkeypatch.setattr(app, 'SCHEMA_BOOTSTRAP', 'upgrade')
+    with pytest.raises(RuntimeError, match="Unknown SCHEMA_BOOTSTRAP 'upgrade'"):
+        app.bootstrap_schema()
@@ -0,0 +1,93 @@
+"""Keyset pagination: following the next-page cursor walks a listing once, in id order, without gaps."""
+import pytest
+
+from api.src.services.archive_service import game_archiver
+from api.src.services.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+LIMIT = 7
+WINNING_MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+async def _new_game(client, players: list, moves: tuple = ()) -> int:
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    game_id = response.json()['id']
+    for turn, (row, column) in enumerate(moves):
+        play = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+    return game_id
+
+
+async def _walk(client, url: str, key: str, **params) -> list:
+    """
+    Follows the next-page cursors of a listing until its last page
+    :return: key of every listed entity, page by page
+    """
+    pages = []
+    cursor = None
+    while True:
+        response = await client.get(url, params={'limit': LIMIT, **params,
+                                                 **({'after': cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        pages.append([entity[key] for entity in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            assert len(pages[-1]) < LIMIT
+            return pages
+        assert len(pages[-1]) == LIMIT
+
+
+async def _listing(client, url: str, key: str, **params) -> list:
+    return [entity[key] for entity in (await client.get(url, params={'limit': 100000, **params})).json()]
+
+
+@pytest.mark.parametrize('params', [{}, {'finished': True}, {'finished': False}])
+def test_game_pages_walk_every_game_once(call_api, names, params):
+    players = names(2)
+
+    async def walk(client):
+        for number in range(2 * LIMIT):
+            await _new_game(client, players, WINNING_MOVES if number % 3 == 0 else ())
+            if number == LIMIT:
+                await game_archiver.run_once()
+        return await _walk(client, '/game/all', 'id', **params), await _listing(client, '/game/all', 'id', **params)
+
+    pages, listing = call_api(walk)
+    walked = [game_id for page in pages for game_id in page]
+    assert walked == listing == sorted(set(walked))
+
+
+def test_player_pages_walk_every_player_once(call_api, names):
+    async def walk(client):
+        for name in names(2 * LIMIT):
+            assert (await client.post('/player/add', json={'name': name, 'symbol': name[-1]})).status_code == 201
+        return await _walk(client, '/player/all', 'name'), await _listing(client, '/player/all', 'name')
+
+    pages, listing = call_api(walk)
+    assert [name for page in pages for name in page] == listing
+
+
+def test_games_created_while_walking_are_listed_after_the_cursor(call_api, names):
+    players = names(2)
+
+    async def walk(client):
+        first_id = await _new_game(client, players)
+        for _ in range(LIMIT):
+            await _new_game(client, players)
+        response = await client.get('/game/all', params={'limit': LIMIT, 'after': encode_cursor(first_id - 1)})
+        new_id = await _new_game(client, players)
+        rest = await client.get('/game/all', params={'limit': 100000,
+                                                     'after': response.headers[NEXT_CURSOR_HEADER]})
+        return first_id, new_id, [game['id'] for game in response.json()], [game['id'] for game in rest.json()]
+
+    first_id, new_id, page, rest = call_api(walk)
+    assert page == list(range(first_id, first_id + LIMIT))
+    assert rest == [first_id + LIMIT, new_id]
+
+
+def test_invalid_cursors_are_rejected(call_api):
+    async def request(client):
+        return [(await client.get(url, params={'after': 'not a cursor'})).status_code
+                for url in ('/game/all', '/player/all')]
+
+    assert call_api(request) == [400, 400]
+    assert decode_cursor(encode_cursor(12345)) == 12345
@@ -0,0 +1,81 @@
+"""Listing and history endpoints run a fixed number of SQL statements whatever the result size."""
+from sqlalchemy import select
+
+from api.src.db import database
+from api.src.db.instrumentation import count_queries
+from api.src.db.models import PlayerDB
+from api.src.services.archive_service import game_archiver
+from api.src.services.game_cache import game_cache
+from api.src.services.game_snapshots import game_snapshots
+
+# Maximum statements per request: the page's game ids and its games with their players from each tier, unfinished
+# games with their players, a game with its players or its plays with their players from each tier, players and
+# their stats from the player table alone
+BOUNDS = {'/game/all?limit={size}': 5,
+          '/game/all?limit={size}&finished=false': 2,
+          '/game/{game_id}': 1,
+          '/game/{finished_id}': 2,
+          '/game/movements/{game_id}': 1,
+          '/game/movements/{finished_id}': 2,
+          '/player/all?limit={size}': 1,
+          '/player/leaderboard?limit={size}': 1,
+          '/player/{player_id}/stats': 1}
+MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (3, 3), (3, 1), (1, 3))
+SIZES = (1, 10, 50)
+
+
+async def request_queries(client, url: str) -> int:
+    """
+    Returns how many SQL statements a GET request ran
+    :param client: app's client
+    :param url: url to request
+    :return: statements count
+    """
+    with count_queries() as statements:
+        response = await client.get(url)
+    assert response.status_code == 200, (url, response.status_code, response.text)
+    return len(statements)
+
+
+async def _seed(client, players: list, games: int, moves: int = 0) -> int:
+    """
+    Stores games between the same players, with 2 to 6 plays unless the number of moves is given. Seven moves win
+    :return: id of the last game
+    """
+    game_id = None
+    for number in range(games):
+        response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+        game_id = response.json()['id']
+        for turn, (row, column) in enumerate(MOVES[:moves or 2 + number % 5]):
+            await client.post('/game/submit-play', json={'game_id': game_id, 'player_name': players[turn % 2],
+                                                         'row': row, 'column': column})
+    return game_id
+
+
+def _player_id(name: str) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(select(PlayerDB.id).where(PlayerDB.name == name)).scalar()
+
+
+def test_statements_do_not_grow_with_the_result(call_api, names):
+    players = names(2)
+
+    async def measure(client):
+        queries = []
+        for size in SIZES:
+            finished_id = await _seed(client, players, 1, len(MOVES))
+            game_id = await _seed(client, players, size)
+            for archived in (False, True):
+                if archived:
+                    await game_archiver.run_once()
+                game_cache.clear()
+                game_snapshots.clear()
+                for url, bound in BOUNDS.items():
+                    count = await request_queries(client, url.format(size=size, game_id=game_id,
+                                                                     finished_id=finished_id,
+                                                                     player_id=_player_id(players[0])))
+                    queries.append((url, size, archived, count, bound))
+        return queries
+
+    over_bound = [query for query in call_api(measure) if query[3] > query[4]]
+    assert not over_bound
@@ -0,0 +1,63 @@
+"""Replays rebuild each board of a game from its move log, matching the boards the game went through."""
+import pytest
+
+WINNING_MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+
+
+async def _play_recording(client, players: list, starting_player: str, moves: tuple) -> tuple:
+    """
+    Plays a game, recording its board and turn before the first move and after every move
+    :return: game id and the board, next turn and winner of the game at every move
+    """
+    request = {'players': [{'name': name} for name in players], 'starting_player': starting_player}
+    game = (await client.post('/game/new', json=request)).json()
+    states = [(game['board'], game['next_turn'], None)]
+    player = players.index(starting_player)
+    for row, column in moves:
+        play = {'game_id': game['id'], 'player_name': players[player], 'row': row, 'column': column}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+        state = (await client.get('/game/{}'.format(game['id']))).json()
+        states.append((state['board'], state['next_turn'], state['winner']))
+        player = 1 - player
+    return game['id'], states
+
+
+@pytest.mark.parametrize('starter', [0, 1])
+@pytest.mark.parametrize('moves', [WINNING_MOVES, WINNING_MOVES[:3]])
+def test_replay_matches_every_move(call_api, names, starter, moves):
+    players = names(2)
+
+    async def replay(client):
+        game_id, states = await _play_recording(client, players, players[starter], moves)
+        replays = [(await client.get('/game/{}/replay'.format(game_id), params={'at': at})).json()
+                   for at in range(len(moves) + 1)]
+        return game_id, states, replays, (await client.get('/game/{}/replay'.format(game_id))).json()
+
+    game_id, states, replays, latest = call_api(replay)
+    for at, (replayed, (board, next_turn, winner)) in enumerate(zip(replays, states)):
+        assert replayed == {'game_id': game_id, 'at': at, 'board': board,
+                            'next_turn': players[(starter + at) % 2], 'winner': winner}
+        if winner is None:
+            assert replayed['next_turn'] == next_turn
+    assert latest == replays[-1]
+    assert (replays[-1]['winner'] == players[starter]) == (moves == WINNING_MOVES)
+
+
+@pytest.mark.parametrize('at', [-1, 4])
+def test_replay_beyond_the_moves_played_is_rejected(call_api, names, at):
+    players = names(2)
+
+    async def replay(client):
+        game_id, _ = await _play_recording(client, players, players[0], WINNING_MOVES[:3])
+        return await client.get('/game/{}/replay'.format(game_id), params={'at': at})
+
+    response = call_api(replay)
+    assert response.status_code == 406
+    assert response.json()['detail'] == 'Game has 3 movements'
+
+
+def test_replay_of_unknown_game_is_not_found(call_api):
+    async def replay(client):
+        return (await client.get('/game/999999999/replay')).status_code
+
+    assert call_api(replay) == 404
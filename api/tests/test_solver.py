@@ -0,0 +1,36 @@
+"""The solver table is built once per process, however many requests need it while it is being built."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.src.engine import solver
+
+
+class SlowSolver:
+    builds = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        with SlowSolver.lock:
+            SlowSolver.builds += 1
+        time.sleep(0.2)
+        self.build_seconds, self.positions, self.canonical_positions, self.table_bytes = 0.2, 0, 0, 0
+
+
+def test_concurrent_first_uses_build_one_table(monkeypatch):
+    monkeypatch.setattr(solver, 'Solver', SlowSolver)
+    monkeypatch.setattr(solver, '_solver', None)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        solvers = list(executor.map(lambda _: solver.get_solver(), range(8)))
+
+    assert SlowSolver.builds == 1
+    assert all(built is solvers[0] for built in solvers)
+    assert isinstance(solvers[0], SlowSolver)
+
+
+def test_best_move_completes_a_line():
+    # X on the first two cells of the top row, O on two cells of the middle row
+    mine, theirs = 0b000000011, 0b000011000
+    row, column, value, _ = solver.get_solver().best_move(mine, theirs)
+    assert (row, column, value) == (1, 3, solver.WIN)
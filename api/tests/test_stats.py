@@ -0,0 +1,76 @@
+"""Players' results and ratings follow the games they finish, the leaderboard lists the highest ratings first."""
+from sqlalchemy import select
+
+from api.src.db import database
+from api.src.db.models import PlayerDB
+from api.src.engine.rating import DRAW_SCORE, INITIAL_RATING, WIN_SCORE, elo
+
+WINNING_MOVES = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3))
+DRAW_MOVES = ((1, 1), (1, 2), (1, 3), (2, 2), (2, 1), (2, 3), (3, 2), (3, 1), (3, 3))
+
+
+async def _play(client, players: list, moves: tuple):
+    request = {'players': [{'name': name} for name in players], 'starting_player': players[0]}
+    game_id = (await client.post('/game/new', json=request)).json()['id']
+    for turn, (row, column) in enumerate(moves):
+        play = {'game_id': game_id, 'player_name': players[turn % 2], 'row': row, 'column': column}
+        assert (await client.post('/game/submit-play', json=play)).status_code == 201
+
+
+def _player_id(name: str) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(select(PlayerDB.id).where(PlayerDB.name == name)).scalar_one()
+
+
+def test_stats_count_finished_games(call_api, names):
+    a, b = names(2)
+
+    async def play(client):
+        await _play(client, [a, b], WINNING_MOVES)
+        await _play(client, [b, a], DRAW_MOVES)
+        await _play(client, [a, b], WINNING_MOVES[:3])
+        return [(await client.get('/player/{}/stats'.format(_player_id(name)))).json() for name in (a, b)]
+
+    stats_a, stats_b = call_api(play)
+    rating_a, rating_b = elo(INITIAL_RATING, INITIAL_RATING, WIN_SCORE)
+    rating_a, rating_b = elo(rating_a, rating_b, DRAW_SCORE)
+    assert {key: stats_a[key] for key in ('name', 'wins', 'losses', 'draws', 'games', 'rating')} == \
+        {'name': a, 'wins': 1, 'losses': 0, 'draws': 1, 'games': 2, 'rating': rating_a}
+    assert {key: stats_b[key] for key in ('name', 'wins', 'losses', 'draws', 'games', 'rating')} == \
+        {'name': b, 'wins': 0, 'losses': 1, 'draws': 1, 'games': 2, 'rating': rating_b}
+
+
+def test_leaderboard_lists_highest_ratings_first(call_api, names):
+    players = names(4)
+
+    async def play(client):
+        await _play(client, players[:2], WINNING_MOVES)
+        await _play(client, players[2:], WINNING_MOVES)
+        return [(await client.get('/player/leaderboard', params={'limit': limit})).json() for limit in (3, 100)]
+
+    top, leaderboard = call_api(play)
+    assert len(top) == 3
+    assert top == leaderboard[:3]
+    assert [(player['rating'], player['id']) for player in leaderboard] == \
+        sorted(((player['rating'], player['id']) for player in leaderboard), reverse=True)
+    listed = [player['name'] for player in leaderboard]
+    ranked = [name for name in listed if name in players]
+    if len(leaderboard) < 100:
+        assert sorted(ranked) == sorted(players)
+    # Winners of equal ratings rank above the losers, the latest players first among equals
+    assert ranked[:2] == [players[2], players[0]][:len(ranked[:2])]
+
+
+def test_leaderboard_limit_is_bounded(call_api):
+    async def request(client):
+        return [(await client.get('/player/leaderboard', params={'limit': limit})).status_code
+                for limit in (0, 1, 100, 101)]
+
+    assert call_api(request) == [422, 200, 200, 422]
+
+
+def test_stats_of_unknown_player_are_not_found(call_api):
+    async def request(client):
+        return (await client.get('/player/999999999/stats')).status_code
+
+    assert call_api(request) == 404
@@ -0,0 +1,92 @@
+"""Batch play submission: plays of one or many games are validated in order and stored in one transaction."""
+import json
+
+from sqlalchemy import func, select
+
+from api.src.db import database
+from api.src.db.models import PlayDB, PlayerDB
+
+
+async def _new_game(client, players: list) -> int:
+    response = await client.post('/game/new', json={'players': [{'name': name} for name in players]})
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+
+def _play(game_id: int, player: str, row: int, column: int) -> dict:
+    return {'game_id': game_id, 'player_name': player, 'row': row, 'column': column}
+
+
+def _stored_plays(game_id: int) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(select(func.count()).where(PlayDB.game_id == game_id)).scalar()
+
+
+def _player_id(name: str) -> int:
+    with database.engine.connect() as connection:
+        return connection.execute(select(PlayerDB.id).where(PlayerDB.name == name)).scalar()
+
+
+def test_plays_of_many_games_in_one_batch(call_api, names):
+    a, b, c, d = names(4)
+
+    async def submit(client):
+        first, second = await _new_game(client, [a, b]), await _new_game(client, [c, d])
+        plays = [_play(first, a, 1, 1), _play(second, c, 2, 2), _play(first, b, 2, 1),
+                 _play(first, b, 3, 1), _play(second, d, 2, 2), _play(first, a, 1, 2), _play(999999, a, 1, 1),
+                 _play(second, d, 1, 1)]
+        response = await client.post('/game/submit-plays', json={'plays': plays})
+        games = [(await client.get('/game/{}'.format(game_id))).json() for game_id in (first, second)]
+        movements = [(await client.get('/game/movements/{}'.format(game_id))).json() for game_id in (first, second)]
+        return first, second, response, games, movements
+
+    first, second, response, games, movements = call_api(submit)
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [(result['game_id'], result['status_code']) for result in results] == [
+        (first, 201), (second, 201), (first, 201), (first, 406), (second, 406), (first, 201), (999999, 404),
+        (second, 201)]
+    assert [results[index]['detail'] for index in (3, 4, 6)] == ["Not player's turn", 'Movement already made',
+                                                                 'Game not found']
+    assert results[5]['movements_played'] == 3
+    assert results[5]['next_turn'] == b
+    assert json.loads(results[5]['board'])[:2] == [['X', 'X', None], ['O', None, None]]
+    assert [game['movements_played'] for game in games] == [3, 2]
+    assert games[0]['board'] == results[5]['board']
+    assert games[1]['board'] == results[7]['board']
+    assert [[(movement['row'], movement['column']) for movement in game] for game in movements] == [
+        [(1, 1), (2, 1), (1, 2)], [(2, 2), (1, 1)]]
+    assert (_stored_plays(first), _stored_plays(second)) == (3, 2)
+
+
+def test_batch_that_finishes_a_game(call_api, names):
+    a, b = names(2)
+
+    async def submit(client):
+        game_id = await _new_game(client, [a, b])
+        moves = ((1, 1), (2, 1), (1, 2), (2, 2), (1, 3), (3, 3))
+        plays = [_play(game_id, (a, b)[turn % 2], row, column) for turn, (row, column) in enumerate(moves)]
+        response = await client.post('/game/submit-plays', json={'plays': plays})
+        game = (await client.get('/game/{}'.format(game_id))).json()
+        stats = [(await client.get('/player/{}/stats'.format(_player_id(name)))).json() for name in (a, b)]
+        return game_id, response.json(), game, stats
+
+    game_id, results, game, stats = call_api(submit)
+
+    assert [result['status_code'] for result in results] == [201] * 5 + [406]
+    assert results[4]['winner'] == a and results[4]['finished']
+    assert results[5]['detail'] == 'Game Finished'
+    assert game['winner'] == a
+    assert _stored_plays(game_id) == 5
+    assert [(player['wins'], player['losses'], player['games']) for player in stats] == [(1, 0, 1), (0, 1, 1)]
+
+
+def test_batch_size_is_bounded(call_api, names):
+    a, _ = names(2)
+
+    async def submit(client):
+        return [await client.post('/game/submit-plays', json={'plays': plays})
+                for plays in ([], [_play(1, a, 1, 1)] * 1001)]
+
+    assert [response.status_code for response in call_api(submit)] == [422, 422]